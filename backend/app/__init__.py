@@ -35,8 +35,9 @@ def create_app(config_class=None):
     # Registrar blueprints (rutas)
     register_blueprints(app)
     
-    # Inicializar scheduler de entrenamientos (solo en producción/desarrollo, no en tests)
-    if not app.config.get('TESTING', False):
+    # Inicializar scheduler de entrenamientos (solo en producción/desarrollo, no en tests;
+    # con gunicorn en modo preload se inicia en cada worker desde post_fork)
+    if not app.config.get('TESTING', False) and not app.config.get('TRAINING_SCHEDULER_POST_FORK', False):
         from app.scheduler import training_scheduler
         training_scheduler.init_app(app)
     
@@ -47,6 +48,30 @@ def create_app(config_class=None):
         os.makedirs(models_path, exist_ok=True)
         print(f"✅ Carpeta de modelos ML creada: {models_path}")
     
+    # Registro central de modelos ML: precarga y recarga en caliente de versiones activas
+    from app.ml.model_registry import model_registry
+    from app.ml.prediction_cache import prediction_cache
+    from app.ml.delay_stats import delay_stats_store
+    from app.ml.prediction_audit import prediction_audit
+    from app.ml.graph_centrality import centrality_service
+    from app.ml.analysis_cache import analysis_cache
+    from app.services.graph_store import graph_store
+    from app.services.critical_path import critical_path_service
+    from app.services.schedule_simulation import schedule_simulator
+    from app.services.schedule_propagation import schedule_propagator
+    from app.services.project_stats import project_stats_service
+    prediction_cache.init_app(app)
+    delay_stats_store.init_app(app)
+    prediction_audit.init_app(app)
+    centrality_service.init_app(app)
+    analysis_cache.init_app(app)
+    graph_store.init_app(app)
+    critical_path_service.init_app(app)
+    schedule_simulator.init_app(app)
+    schedule_propagator.init_app(app)
+    project_stats_service.init_app(app)
+    model_registry.init_app(app)
+    
     # Manejadores de errores globales
     register_error_handlers(app)
     
@@ -0,0 +1,93 @@
+"""
+Caché de Análisis de Process Mining
+Resultado completo del análisis de cuellos de botella por proyecto
+
+Cada entrada guarda el DataFrame ya predicho (y las aristas del grafo) de un
+proyecto, o de todos si project_id es None, junto con la versión con la que se
+calculó: la versión de los datos (conteo, última modificación y checksum de
+web_tasks y web_task_dependencies) y el token del modelo cargado en el registro.
+Mientras la versión no cambie, /analyze y /stats-by-area comparten el mismo
+resultado sin volver a consultar la BD ni a ejecutar el modelo. Las rutas que
+escriben tareas o dependencias además invalidan la entrada del proyecto en este
+worker.
+"""
+import threading
+from collections import OrderedDict
+
+
+class AnalysisCache:
+    """
+    Diccionario LRU acotado {project_id: (versión, resultado)}
+    """
+    
+    def __init__(self, app=None, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Tomar el tamaño de la configuración de la app
+        """
+        with self._lock:
+            self.max_entries = app.config.get('ML_ANALYSIS_CACHE_SIZE', self.max_entries)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def get(self, project_id, version):
+        """
+        Resultado guardado para el proyecto si se calculó con la misma versión (None si no)
+        """
+        with self._lock:
+            item = self._entries.get(project_id)
+            if item is None or item[0] != version:
+                self._stats['misses'] += 1
+                return None
+            
+            self._entries.move_to_end(project_id)
+            self._stats['hits'] += 1
+            return item[1]
+    
+    def put(self, project_id, version, result):
+        """
+        Guardar el resultado de un proyecto (reemplaza el de una versión anterior)
+        """
+        with self._lock:
+            self._entries[project_id] = (version, result)
+            self._entries.move_to_end(project_id)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+    
+    def invalidate(self, project_id=None):
+        """
+        Eliminar el resultado de un proyecto (y el global, que lo incluye) o todos
+        """
+        with self._lock:
+            if project_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(project_id, None)
+                self._entries.pop(None, None)
+            self._stats['invalidations'] += 1
+    
+    def stats(self):
+        """
+        Estadísticas de la caché con tasa de aciertos
+        """
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                hit_rate=round(self._stats['hits'] / lookups, 4) if lookups else 0,
+                entries=len(self._entries),
+                max_entries=self.max_entries
+            )
+
+
+# Instancia global
+analysis_cache = AnalysisCache()
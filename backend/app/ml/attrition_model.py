@@ -4,7 +4,6 @@ Predice la probabilidad de que un empleado renuncie
 """
 import os
 import json
-import joblib
 import numpy as np
 from flask import current_app
 
@@ -12,43 +11,88 @@ from app.extensions import db
 from app.models.person import Person
 
 
-_model = None
-_columns = None
+from app.ml.model_registry import model_registry, get_models_path
+from app.ml.prediction_cache import cached_predict
+from app.ml.feature_schema import FeatureSchema, model_input
+from app.ml.native_models import load_catboost_model
+
+
+# Orden de features (columns_performance.json) si el archivo de columnas no existe
+FEATURE_COLUMNS = [
+    'person_area', 'role', 'experience_years', 'availability_hours', 'current_load',
+    'performance_index', 'rework_rate', 'total_tasks', 'avg_delay_ratio',
+    'success_rate', 'avg_task_complexity', 'load_ratio'
+]
 
 
 def load_attrition_model():
     """
-    Cargar modelo de predicción de desempeño/renuncia
+    Obtener el modelo de predicción de desempeño/renuncia desde el registro central
+    """
+    return model_registry.get_model('attrition')
+
+
+def load_artifacts(model_file=None):
     """
-    global _model, _columns
+    Cargar modelo de predicción de desempeño/renuncia
     
-    if _model is not None:
-        return _model
+    Args:
+        model_file: ruta de una versión específica (None → artefacto por defecto)
     
+    Returns:
+        dict {model, config, schema, metrics, model_file}
+    """
     try:
         # Ruta al modelo
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        model_path = os.path.join(base_path, 'ml', 'models', 'attrition')
+        model_path = os.path.join(get_models_path(), 'attrition')
         
-        model_file = os.path.join(model_path, 'model_performance_predictor_best.pkl')
+        model_file = model_file or os.path.join(model_path, 'model_performance_predictor_best.pkl')
         columns_file = os.path.join(model_path, 'columns_performance.json')
         
-        if os.path.exists(model_file):
-            _model = joblib.load(model_file)
+        columns = None
+        
+        # El mejor modelo actual es XGBoost (pickle); si se exporta uno CatBoost a .cbm se carga nativo
+        model, loaded_file = load_catboost_model(model_file)
+        if model is not None:
+            model_file = loaded_file
             print(f"✓ Modelo de performance cargado: {model_file}")
         
         if os.path.exists(columns_file):
             with open(columns_file, 'r') as f:
-                _columns = json.load(f)
-            print(f"✓ Columnas cargadas: {len(_columns.get('feature_columns', []))} features")
+                columns = json.load(f)
+            print(f"✓ Columnas cargadas: {len(columns.get('feature_columns', []))} features")
         
-        return _model
+        # Orden de columnas de columns_performance.json (el modelo no es CatBoost: entrada DataFrame)
+        schema = FeatureSchema.from_config(columns, 'feature_columns', model=model, default_columns=FEATURE_COLUMNS)
+        
+        return {'model': model, 'config': columns, 'schema': schema, 'metrics': None, 'model_file': model_file}
         
     except Exception as e:
         print(f"✗ Error al cargar modelo de performance: {str(e)}")
         return None
 
 
+def warm_up(artifacts):
+    """
+    Inferencia de calentamiento con un perfil promedio (sin tocar la BD)
+    """
+    features = artifacts['schema'].rows([{
+        'person_area': 'Unknown',
+        'role': 'Unknown',
+        'experience_years': 2.0,
+        'availability_hours': 40.0,
+        'current_load': 0.0,
+        'performance_index': 75.0,
+        'rework_rate': 0.05,
+        'total_tasks': 0,
+        'avg_delay_ratio': 0.0,
+        'success_rate': 0.0,
+        'avg_task_complexity': 2.0,
+        'load_ratio': 0.0
+    }])
+    artifacts['model'].predict_proba(model_input(features))
+
+
 def prepare_attrition_features(person):
     """
     Preparar features para predicción de performance/renuncia
@@ -73,30 +117,66 @@ def prepare_attrition_features(person):
     Returns:
         dict: Features preparadas para el modelo
     """
+    from app.models.task import Assignee
+    
+    # Calcular métricas agregadas de tareas
+    aggregates = _aggregate_query().filter(
+        Assignee.person_id == person.person_id
+    ).first()
+    
+    return build_attrition_features(person, aggregates)
+
+
+def _aggregate_query(*group_columns):
+    """
+    Consulta de métricas de tareas por persona (total, atraso medio, éxito, complejidad)
+    """
     from app.models.task import Task, Assignee
     from sqlalchemy import func
     
-    # Calcular métricas agregadas de tareas
-    assignee_stats = db.session.query(
+    # Mismas definiciones que el entrenamiento (train_performance_predictor_fixed.py):
+    # atraso = duration_real / duration_est y complejidad = complexity_level numérico
+    return db.session.query(
+        *group_columns,
         func.count(Assignee.task_id).label('total_tasks'),
-        func.avg(Task.delay_ratio).label('avg_delay_ratio'),
+        func.avg(Task.duration_real / func.nullif(Task.duration_est, 0)).label('avg_delay_ratio'),
         func.avg(
             db.case(
                 (Task.status == 'completed', 1),
                 else_=0
             )
         ).label('success_rate'),
-        func.avg(Task.complexity_numeric).label('avg_task_complexity')
+        func.avg(db.cast(Task.complexity_level, db.Numeric(10, 2))).label('avg_task_complexity')
     ).join(
         Task, Task.task_id == Assignee.task_id
-    ).filter(
-        Assignee.person_id == person.person_id
-    ).first()
+    )
+
+
+def get_attrition_aggregates():
+    """
+    Métricas de tareas de todas las personas en una sola consulta agrupada
     
-    total_tasks = assignee_stats.total_tasks or 0
-    avg_delay_ratio = float(assignee_stats.avg_delay_ratio or 0)
-    success_rate = float(assignee_stats.success_rate or 0)
-    avg_task_complexity = float(assignee_stats.avg_task_complexity or 2)
+    Returns:
+        dict {person_id: fila con total_tasks, avg_delay_ratio, success_rate, avg_task_complexity}
+    """
+    from app.models.task import Assignee
+    
+    rows = _aggregate_query(Assignee.person_id).group_by(Assignee.person_id).all()
+    return {row.person_id: row for row in rows}
+
+
+def build_attrition_features(person, aggregates=None):
+    """
+    Diccionario de features a partir de la persona y sus métricas de tareas
+    
+    Args:
+        person: Person (o fila con las mismas columnas)
+        aggregates: fila de _aggregate_query (None si la persona no tiene tareas)
+    """
+    total_tasks = getattr(aggregates, 'total_tasks', None) or 0
+    avg_delay_ratio = float(getattr(aggregates, 'avg_delay_ratio', None) or 0)
+    success_rate = float(getattr(aggregates, 'success_rate', None) or 0)
+    avg_task_complexity = float(getattr(aggregates, 'avg_task_complexity', None) or 2)
     
     # Calcular load_ratio
     availability_hours = float(person.availability_hours_week or 40)
@@ -121,6 +201,17 @@ def prepare_attrition_features(person):
     return features
 
 
+def classify_attrition_risk(attrition_probability):
+    """
+    Nivel de riesgo de renuncia (bajo/medio/alto) según la probabilidad de resignation_risk
+    """
+    if attrition_probability < 0.15:
+        return 'bajo'
+    elif attrition_probability < 0.50:
+        return 'medio'
+    return 'alto'
+
+
 def predict_attrition(data):
     """
     Predecir clase de performance (at_risk, high_performer, resignation_risk)
@@ -162,13 +253,12 @@ def predict_attrition(data):
         # Preparar features
         features_dict = prepare_attrition_features(person)
         
-        # Convertir a DataFrame para CatBoost/XGBoost
-        import pandas as pd
-        features_df = pd.DataFrame([features_dict])
+        # Filas en el orden de columns_performance.json (esquema compilado al cargar el modelo)
+        features = model_registry.get_schema('attrition').rows([features_dict])
         
-        # Predicción
-        prediction = model.predict(features_df)[0]
-        probas = model.predict_proba(features_df)[0]
+        # Predicción (una sola llamada; la clase es la de mayor probabilidad)
+        probas = cached_predict('attrition', model, features)[0]
+        prediction = int(np.argmax(probas))
         
         # Clases: ['at_risk', 'high_performer', 'resignation_risk']
         class_names = ['at_risk', 'high_performer', 'resignation_risk']
@@ -182,12 +272,7 @@ def predict_attrition(data):
         attrition_probability = probabilities['resignation_risk']
         
         # Clasificar riesgo de renuncia
-        if attrition_probability < 0.15:
-            risk = 'bajo'
-        elif attrition_probability < 0.50:
-            risk = 'medio'
-        else:
-            risk = 'alto'
+        risk = classify_attrition_risk(attrition_probability)
         
         # Analizar factores
         factors = analyze_attrition_factors(person, performance_class, probabilities)
@@ -368,3 +453,162 @@ def analyze_attrition_factors(person, performance_class, probabilities):
         })
     
     return factors[:5]  # Top 5 factores
+
+
+def predict_attrition_bulk(persons=None):
+    """
+    Predecir el riesgo de renuncia de toda la plantilla en una sola pasada
+    
+    Una consulta para las personas, una consulta agrupada para las métricas de
+    tareas y una sola llamada al modelo con la matriz completa (sin caché ni
+    micro-batching: cada fila es distinta y la llamada ya es por lotes).
+    
+    Args:
+        persons: filas/objetos Person a evaluar (None → todas las personas)
+    
+    Returns:
+        tuple (lista de dicts por persona, nombre del modelo usado)
+    """
+    if persons is None:
+        # Solo las columnas necesarias, sin materializar objetos ORM
+        persons = db.session.query(
+            Person.person_id, Person.area, Person.role, Person.experience_years,
+            Person.availability_hours_week, Person.current_load,
+            Person.performance_index, Person.rework_rate
+        ).all()
+    
+    if not persons:
+        return [], None
+    
+    aggregates = get_attrition_aggregates()
+    feature_dicts = [build_attrition_features(person, aggregates.get(person.person_id)) for person in persons]
+    
+    model = load_attrition_model()
+    predictions = None
+    model_used = 'heuristic'
+    
+    if model is not None:
+        try:
+            features = model_registry.get_schema('attrition').rows(feature_dicts)
+            probas = np.asarray(model.predict_proba(model_input(features)))
+            
+            class_names = ['at_risk', 'high_performer', 'resignation_risk']
+            predictions = []
+            for row in probas:
+                probabilities = {class_names[i]: float(row[i]) for i in range(len(class_names))}
+                attrition_probability = probabilities['resignation_risk']
+                predictions.append({
+                    'performance_class': class_names[int(np.argmax(row))],
+                    'probabilities': probabilities,
+                    'attrition_probability': round(attrition_probability, 4),
+                    'attrition_risk': classify_attrition_risk(attrition_probability)
+                })
+            model_used = type(model).__name__[:50]
+            
+        except Exception as e:
+            print(f"✗ Error en predicción masiva de performance: {str(e)}")
+            predictions = None
+    
+    # Sin modelo (o si falló) se usa la heurística, que no consulta la BD
+    if predictions is None:
+        predictions = [predict_attrition_heuristic(person) for person in persons]
+    
+    results = []
+    for person, features_dict, prediction in zip(persons, feature_dicts, predictions):
+        results.append({
+            'person_id': person.person_id,
+            'area': person.area,
+            'role': person.role,
+            'performance_class': prediction['performance_class'],
+            'probabilities': prediction['probabilities'],
+            'attrition_probability': prediction['attrition_probability'],
+            'attrition_risk': prediction['attrition_risk'],
+            'total_tasks': features_dict['total_tasks'],
+            'avg_delay_ratio': features_dict['avg_delay_ratio'],
+            'success_rate': features_dict['success_rate']
+        })
+    
+    return results, model_used
+
+
+def run_attrition_sweep():
+    """
+    Barrido de riesgo de renuncia de toda la plantilla guardado en ml_attrition_snapshots
+    
+    Todas las filas de la corrida comparten run_id y scored_at. Si
+    ML_ATTRITION_SNAPSHOT_RETENTION_DAYS > 0 se eliminan las corridas más antiguas.
+    
+    Returns:
+        dict: resumen de la corrida (run_id, personas, conteo por riesgo, tiempo)
+    """
+    import time
+    import uuid
+    from datetime import datetime, timedelta
+    from app.models.ml_models import MLAttritionSnapshot
+    
+    started = time.perf_counter()
+    run_id = uuid.uuid4().hex
+    scored_at = datetime.utcnow()
+    
+    results, model_used = predict_attrition_bulk()
+    
+    rows = [{
+        'run_id': run_id,
+        'person_id': result['person_id'],
+        'area': result['area'],
+        'role': result['role'],
+        'performance_class': result['performance_class'],
+        'prob_at_risk': result['probabilities'].get('at_risk'),
+        'prob_high_performer': result['probabilities'].get('high_performer'),
+        'prob_resignation_risk': result['probabilities'].get('resignation_risk'),
+        'attrition_probability': result['attrition_probability'],
+        'attrition_risk': result['attrition_risk'],
+        'total_tasks': result['total_tasks'],
+        'avg_delay_ratio': round(result['avg_delay_ratio'], 4),
+        'success_rate': round(result['success_rate'], 4),
+        'model_used': model_used,
+        'scored_at': scored_at
+    } for result in results]
+    
+    # INSERT de varias filas por bloque
+    chunk_size = current_app.config.get('ML_ATTRITION_SWEEP_CHUNK_SIZE', 1000)
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(MLAttritionSnapshot.__table__.insert(), rows[start:start + chunk_size])
+    
+    deleted = 0
+    retention_days = current_app.config.get('ML_ATTRITION_SNAPSHOT_RETENTION_DAYS', 90)
+    if retention_days and retention_days > 0:
+        deleted = MLAttritionSnapshot.query.filter(
+            MLAttritionSnapshot.scored_at < scored_at - timedelta(days=retention_days)
+        ).delete(synchronize_session=False)
+    
+    db.session.commit()
+    
+    by_risk = {'bajo': 0, 'medio': 0, 'alto': 0}
+    for row in rows:
+        by_risk[row['attrition_risk']] += 1
+    
+    elapsed = time.perf_counter() - started
+    print(f"✅ Barrido de renuncia {run_id}: {len(rows)} personas en {elapsed:.2f}s ({model_used})")
+    
+    return {
+        'run_id': run_id,
+        'scored_at': scored_at.isoformat(),
+        'total_persons': len(rows),
+        'by_risk': by_risk,
+        'model_used': model_used,
+        'deleted_snapshots': deleted,
+        'elapsed_seconds': round(elapsed, 3)
+    }
+
+
+def get_latest_attrition_run_id():
+    """
+    run_id de la corrida más reciente (None si nunca se ejecutó el barrido)
+    """
+    from app.models.ml_models import MLAttritionSnapshot
+    
+    latest = db.session.query(MLAttritionSnapshot.run_id).order_by(
+        MLAttritionSnapshot.scored_at.desc(), MLAttritionSnapshot.id.desc()
+    ).first()
+    return latest.run_id if latest else None
@@ -0,0 +1,397 @@
+"""
+Estadísticas de Retraso Incrementales
+Media, desviación y mediana del retraso por área, tipo de tarea y complejidad
+
+Reemplaza los promedios fijos que usaba risk_model.build_feature_dict. Cada vez
+que una tarea de web_tasks pasa a 'completada' se actualiza una fila por
+dimensión en ml_delay_stats:
+- media y varianza con momentos acumulados (Welford), O(1) por tarea
+- mediana con el estimador P² (5 marcadores), O(1) en tiempo y memoria
+
+La preparación de features solo lee un snapshot en memoria (un dict inmutable
+que se reemplaza completo), sin consultar la BD por predicción. El snapshot se
+recarga cada ML_DELAY_STATS_REFRESH_SECONDS para ver lo registrado por otros
+workers. Con pocas muestras el valor se combina con el prior histórico
+(peso n / (n + ML_DELAY_STATS_PRIOR_WEIGHT)).
+
+El retraso se mide en días: actual_hours (días calendario) - estimated_hours / 8.
+"""
+import time
+import threading
+
+from flask import has_app_context
+
+
+# Priors históricos (los valores que antes estaban fijos en risk_model)
+AREA_PRIORS = {
+    'TI': (15.2, 8.3, 12.1),  # (avg_delay, std_delay, median_delay)
+    'Marketing': (8.5, 5.2, 7.0),
+    'Operaciones': (12.0, 6.8, 10.5),
+    'RRHH': (6.3, 3.9, 5.5),
+    'Ventas': (9.8, 5.5, 8.2)
+}
+
+TYPE_PRIORS = {
+    'Desarrollo': (18.5, 9.2),  # (avg_delay, std_delay)
+    'Diseño': (10.2, 5.8),
+    'Testing': (7.5, 4.1),
+    'Análisis': (8.9, 5.0),
+    'Documentación': (5.2, 2.8),
+    'Soporte': (6.8, 3.5)
+}
+
+COMPLEXITY_PRIORS = {
+    'Baja': (5.5, 3.2),
+    'Media': (10.8, 5.9),
+    'Alta': (20.3, 10.5)
+}
+
+DEFAULT_AREA_PRIOR = (10.0, 6.0, 8.5)
+DEFAULT_PRIOR = (10.0, 6.0)
+
+# web_tasks no registra tipo de tarea (igual que build_task_data_from_web_tasks)
+DEFAULT_WEB_TASK_TYPE = 'Desarrollo'
+
+# Cuantil que sigue el estimador P²
+MEDIAN_QUANTILE = 0.5
+
+
+def normalize_value(dimension, value):
+    """
+    Clave de una dimensión ('Alta' y 'alta' son la misma complejidad)
+    """
+    value = str(value)
+    return value.capitalize() if dimension == 'complexity' else value
+
+
+def get_prior(dimension, value):
+    """
+    Prior (avg, std, median) de una dimensión; la mediana cae en la media si no hay prior
+    """
+    if dimension == 'area':
+        return AREA_PRIORS.get(value, DEFAULT_AREA_PRIOR)
+    
+    priors = TYPE_PRIORS if dimension == 'task_type' else COMPLEXITY_PRIORS
+    avg, std = priors.get(value, DEFAULT_PRIOR)
+    return (avg, std, avg)
+
+
+def welford_update(count, mean, m2, value):
+    """
+    Agregar un valor a los momentos acumulados (count, mean, m2)
+    """
+    count += 1
+    delta = value - mean
+    mean += delta / count
+    m2 += delta * (value - mean)
+    return count, mean, m2
+
+
+def p2_update(state, value, p=MEDIAN_QUANTILE):
+    """
+    Agregar un valor al estimador P² (Jain & Chlamtac) de un cuantil
+    
+    state es un dict serializable a JSON: guarda los primeros 5 valores y a
+    partir de ahí solo las alturas (q), posiciones (n) y posiciones deseadas
+    (np) de los 5 marcadores.
+    
+    Returns:
+        nuevo state
+    """
+    state = dict(state or {})
+    
+    if 'q' not in state:
+        values = sorted(list(state.get('values', [])) + [value])
+        if len(values) < 5:
+            return {'values': values}
+        return {
+            'q': values,
+            'n': [1, 2, 3, 4, 5],
+            'np': [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        }
+    
+    q = list(state['q'])
+    n = list(state['n'])
+    desired = list(state['np'])
+    increments = [0, p / 2, p, (1 + p) / 2, 1]
+    
+    # Celda en la que cae el valor
+    if value < q[0]:
+        q[0] = value
+        k = 0
+    elif value >= q[4]:
+        q[4] = value
+        k = 3
+    else:
+        k = next(i for i in range(4) if q[i] <= value < q[i + 1])
+    
+    for i in range(k + 1, 5):
+        n[i] += 1
+    for i in range(5):
+        desired[i] += increments[i]
+    
+    # Ajustar los marcadores centrales
+    for i in range(1, 4):
+        d = desired[i] - n[i]
+        if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+            d = 1 if d > 0 else -1
+            parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+            )
+            if q[i - 1] < parabolic < q[i + 1]:
+                q[i] = parabolic
+            else:
+                q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+            n[i] += d
+    
+    return {'q': q, 'n': n, 'np': desired}
+
+
+def p2_estimate(state):
+    """
+    Mediana estimada por el estado P² (exacta con menos de 5 valores)
+    """
+    if not state:
+        return None
+    if 'q' in state:
+        return state['q'][2]
+    
+    values = state.get('values', [])
+    if not values:
+        return None
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def task_delay_dimensions(task):
+    """
+    Retraso (días) y valores de dimensión de una tarea completada de web_tasks
+    
+    Returns:
+        (delay, [(dimension, value), ...]) o (None, []) si faltan horas
+    """
+    from app.ml.risk_model import complexity_level_from_score
+    
+    if task.actual_hours is None or not task.estimated_hours:
+        return None, []
+    
+    delay = float(task.actual_hours) - float(task.estimated_hours) / 8
+    dimensions = [
+        ('area', task.area or 'TI'),
+        ('task_type', DEFAULT_WEB_TASK_TYPE),
+        ('complexity', complexity_level_from_score(task.complexity_score))
+    ]
+    return delay, dimensions
+
+
+class DelayStatsStore:
+    """
+    Snapshot en memoria de ml_delay_stats + actualización incremental
+    """
+    
+    def __init__(self, app=None):
+        self.refresh_seconds = 60
+        self.prior_weight = 20
+        self._snapshot = {}
+        self._loaded_at = None
+        self._refresh_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Tomar la configuración de la app
+        """
+        self.refresh_seconds = app.config.get('ML_DELAY_STATS_REFRESH_SECONDS', self.refresh_seconds)
+        self.prior_weight = app.config.get('ML_DELAY_STATS_PRIOR_WEIGHT', self.prior_weight)
+    
+    def get_stats(self, dimension, value):
+        """
+        (avg, std, median) del retraso para una dimensión, combinado con el prior
+        
+        Args:
+            dimension: 'area', 'task_type' o 'complexity'
+            value: valor de la dimensión (p.ej. 'TI', 'Desarrollo', 'Alta')
+        
+        Returns:
+            tuple (avg_delay, std_delay, median_delay)
+        """
+        self._refresh_if_stale()
+        
+        value = normalize_value(dimension, value)
+        prior = get_prior(dimension, value)
+        observed = self._snapshot.get((dimension, value))
+        
+        if observed is None:
+            return prior
+        
+        count, mean, std, median = observed
+        weight = count / (count + self.prior_weight)
+        if median is None:
+            median = mean
+        
+        return (
+            weight * mean + (1 - weight) * prior[0],
+            weight * std + (1 - weight) * prior[1],
+            weight * median + (1 - weight) * prior[2]
+        )
+    
+    def refresh(self):
+        """
+        Recargar el snapshot completo desde ml_delay_stats
+        """
+        from app.extensions import db
+        from app.models.ml_models import MLDelayStat
+        
+        try:
+            rows = MLDelayStat.query.all()
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ No se pudieron leer las estadísticas de retraso (se usan los priors): {e}")
+            self._loaded_at = time.monotonic()
+            return False
+        
+        self._snapshot = {(row.dimension, row.dimension_value): self._row_values(row) for row in rows}
+        self._loaded_at = time.monotonic()
+        return True
+    
+    def record_completion(self, task):
+        """
+        Agregar el retraso de una tarea recién completada a sus dimensiones
+        
+        Hace su propio commit; un error no afecta a la operación que completó la tarea.
+        
+        Args:
+            task: instancia de WebTask con status 'completada'
+        
+        Returns:
+            bool: True si se registró
+        """
+        from app.extensions import db
+        from app.models.ml_models import MLDelayStat
+        
+        delay, dimensions = task_delay_dimensions(task)
+        if delay is None:
+            return False
+        
+        try:
+            with self._write_lock:
+                updated = []
+                for dimension, value in dimensions:
+                    value = normalize_value(dimension, value)
+                    row = MLDelayStat.query.filter_by(
+                        dimension=dimension, dimension_value=value
+                    ).with_for_update().first()
+                    
+                    if row is None:
+                        row = MLDelayStat(dimension=dimension, dimension_value=value,
+                                          sample_count=0, mean_delay=0.0, m2_delay=0.0)
+                        db.session.add(row)
+                    
+                    self._apply(row, delay)
+                    updated.append(row)
+                
+                db.session.commit()
+                
+                # Reflejar el cambio en este proceso sin esperar al refresco
+                snapshot = dict(self._snapshot)
+                for row in updated:
+                    snapshot[(row.dimension, row.dimension_value)] = self._row_values(row)
+                self._snapshot = snapshot
+            
+            return True
+        
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Error actualizando estadísticas de retraso de la tarea {task.id}: {e}")
+            return False
+    
+    def rebuild(self):
+        """
+        Recalcular ml_delay_stats desde todas las tareas completadas de web_tasks
+        
+        Returns:
+            int: número de tareas procesadas
+        """
+        from app.extensions import db
+        from app.models.web_task import WebTask
+        from app.models.ml_models import MLDelayStat
+        
+        tasks = WebTask.query.filter(
+            WebTask.status == 'completada',
+            WebTask.actual_hours.isnot(None)
+        ).order_by(WebTask.completed_at, WebTask.id).all()
+        
+        rows = {}
+        processed = 0
+        for task in tasks:
+            delay, dimensions = task_delay_dimensions(task)
+            if delay is None:
+                continue
+            
+            processed += 1
+            for dimension, value in dimensions:
+                key = (dimension, normalize_value(dimension, value))
+                if key not in rows:
+                    rows[key] = MLDelayStat(dimension=key[0], dimension_value=key[1],
+                                            sample_count=0, mean_delay=0.0, m2_delay=0.0)
+                self._apply(rows[key], delay)
+        
+        try:
+            with self._write_lock:
+                MLDelayStat.query.delete()
+                db.session.add_all(rows.values())
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        self.refresh()
+        return processed
+    
+    def stats(self):
+        """
+        Resumen del snapshot vigente
+        """
+        return {
+            'dimensions': len(self._snapshot),
+            'samples': sum(values[0] for (dimension, _), values in self._snapshot.items() if dimension == 'area'),
+            'loaded_seconds_ago': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+            'refresh_seconds': self.refresh_seconds,
+            'prior_weight': self.prior_weight
+        }
+    
+    def _refresh_if_stale(self):
+        if not has_app_context():
+            return
+        
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.refresh_seconds:
+            return
+        
+        # Un solo hilo recarga; los demás siguen con el snapshot anterior
+        if self._refresh_lock.acquire(blocking=False):
+            try:
+                self.refresh()
+            finally:
+                self._refresh_lock.release()
+    
+    @staticmethod
+    def _apply(row, delay):
+        row.sample_count, row.mean_delay, row.m2_delay = welford_update(
+            row.sample_count or 0, row.mean_delay or 0.0, row.m2_delay or 0.0, delay
+        )
+        row.median_state = p2_update(row.median_state, delay)
+        row.median_delay = p2_estimate(row.median_state)
+    
+    @staticmethod
+    def _row_values(row):
+        count = row.sample_count or 0
+        std = (row.m2_delay / (count - 1)) ** 0.5 if count > 1 else 0.0
+        return (count, row.mean_delay, std, row.median_delay)
+
+
+# Instancia global
+delay_stats_store = DelayStatsStore()
@@ -4,50 +4,89 @@ Predice la duración real de una tarea en horas
 """
 import os
 import json
-import joblib
 import numpy as np
 import pandas as pd
 from flask import current_app
 
 
-_model = None
-_config = None
-_metrics = None
+from app.ml.model_registry import model_registry, get_models_path
+from app.ml.inference_batcher import InferenceQueueFull
+from app.ml.prediction_cache import cached_predict
+from app.ml.feature_schema import FeatureSchema, model_input
+from app.ml.native_models import load_catboost_model
+
+# Orden de features según columns_regression_numeric.json
+FEATURE_ORDER = [
+    'duration_est_imputed',
+    'experience_years_imputed',
+    'availability_hours_week_imputed',
+    'current_load_imputed',
+    'performance_index_imputed',
+    'rework_rate_imputed',
+    'load_ratio',
+    'complexity_numeric'
+]
+
+# CALIBRACIÓN: El modelo fue entrenado con datos rurales (~834 días promedio)
+# Factor de calibración para dominio IT: 0.12 (ajusta escala ~120 días → ~14 días)
+CALIBRATION_FACTOR = 0.12
+
+# Rango (días) en el que la predicción calibrada es confiable; fuera de él se usa la heurística
+CALIBRATED_MIN_DAYS = 5.0
+CALIBRATED_MAX_DAYS = 50.0
 
 
 def load_model():
     """
-    Cargar el modelo de predicción de duración
+    Obtener el modelo de predicción de duración desde el registro central de modelos
+    """
+    return model_registry.get_model('duration')
+
+
+def get_schema():
+    """
+    Esquema de features compilado del modelo vigente
+    """
+    return model_registry.get_schema('duration')
+
+
+def load_artifacts(model_file=None):
     """
-    global _model, _config, _metrics
+    Cargar el modelo de predicción de duración y su configuración
     
-    if _model is not None:
-        return _model
+    Args:
+        model_file: ruta de una versión específica (None → artefacto por defecto)
     
+    Returns:
+        dict {model, config, schema, metrics, model_file} (None si no existe el modelo)
+    """
     try:
         # Ruta al modelo NUMERIC_ONLY (sin dependencias categóricas)
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        model_path = os.path.join(base_path, 'ml', 'models', 'duration')
+        model_path = os.path.join(get_models_path(), 'duration')
         
-        model_file = os.path.join(model_path, 'model_catboost_rmse_numeric.pkl')
+        model_file = model_file or os.path.join(model_path, 'model_catboost_rmse_numeric.cbm')
         config_file = os.path.join(model_path, 'columns_regression_numeric.json')
         
-        # Cargar modelo CatBoost (guardado con joblib)
-        if os.path.exists(model_file):
-            _model = joblib.load(model_file)
-            print(f"✓ Modelo CatBoost Duration cargado: {model_file}")
-        else:
-            print(f"⚠ Modelo no encontrado: {model_file}")
+        config = None
+        
+        # Cargar modelo CatBoost (.cbm nativo si existe; pickle de versiones anteriores)
+        model, model_file = load_catboost_model(model_file)
+        if model is None:
+            print(f"⚠ Modelo no encontrado: {os.path.join(model_path, 'model_catboost_rmse_numeric.cbm')}")
             return None
+        print(f"✓ Modelo CatBoost Duration cargado: {model_file}")
         
         # Cargar configuración de columnas
         if os.path.exists(config_file):
             with open(config_file, 'r', encoding='utf-8') as f:
-                _config = json.load(f)
+                config = json.load(f)
             print(f"✓ Configuración cargada: {config_file}")
-            print(f"   Features: {len(_config.get('numeric', [])) + len(_config.get('categorical', []))}")
+            print(f"   Features: {len(config.get('numeric', [])) + len(config.get('categorical', []))}")
         
-        return _model
+        # Solo numéricas: la entrada es un ndarray float64 en el orden de columns_regression_numeric.json
+        schema = FeatureSchema.from_config(config, 'numeric', model=model, default_columns=FEATURE_ORDER)
+        
+        return {'model': model, 'config': config, 'schema': schema, 'metrics': None, 'model_file': model_file}
         
     except Exception as e:
         print(f"✗ Error al cargar modelo de duración: {str(e)}")
@@ -56,6 +95,14 @@ def load_model():
         return None
 
 
+def warm_up(artifacts):
+    """
+    Inferencia de calentamiento con una tarea genérica
+    """
+    features = build_features([build_feature_dict({})], artifacts.get('schema'))
+    artifacts['model'].predict(model_input(features))
+
+
 def predict_duration(task_data):
     """
     Predecir la duración real de una tarea usando modelo NUMERIC_ONLY
@@ -94,12 +141,10 @@ def predict_duration(task_data):
         features = prepare_features(task_data, person_id)
         
         # Predicción: el modelo predice log1p(duration_days), debemos revertir
-        predicted_log = model.predict(features)[0]
+        predicted_log = cached_predict('duration', model, features, method='predict')[0]
         predicted_days_raw = np.expm1(predicted_log)  # Revertir transformación log1p
         
-        # CALIBRACIÓN: El modelo fue entrenado con datos rurales (~834 días promedio)
-        # Factor de calibración para dominio IT: 0.12 (ajusta escala ~120 días → ~14 días)
-        CALIBRATION_FACTOR = 0.12
+        # CALIBRACIÓN: ver CALIBRATION_FACTOR
         predicted_days_calibrated = predicted_days_raw * CALIBRATION_FACTOR
         
         # ESTRATEGIA HÍBRIDA: Combinar CatBoost calibrado + heurística
@@ -107,10 +152,10 @@ def predict_duration(task_data):
         # - Si predicción calibrada > 50 días → usar heurística (modelo sobreestima)
         # - Si predicción calibrada 5-50 días → usar calibrada (rango confiable)
         
-        if predicted_days_calibrated < 5.0:
+        if predicted_days_calibrated < CALIBRATED_MIN_DAYS:
             print(f"     CatBoost calibrado: {predicted_days_calibrated:.1f}d (< 5d) → usando heurística")
             return predict_duration_heuristic(task_data)
-        elif predicted_days_calibrated > 50.0:
+        elif predicted_days_calibrated > CALIBRATED_MAX_DAYS:
             print(f"     CatBoost calibrado: {predicted_days_calibrated:.1f}d (> 50d) → usando heurística")
             return predict_duration_heuristic(task_data)
         
@@ -137,6 +182,8 @@ def predict_duration(task_data):
             'mode': mode
         }
         
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         print(f"Error en predicción de duración: {str(e)}")
         import traceback
@@ -144,6 +191,116 @@ def predict_duration(task_data):
         return predict_duration_heuristic(task_data)
 
 
+def predict_duration_batch(task_data, person_ids):
+    """
+    Predecir la duración de una misma tarea para varias personas con una sola llamada al modelo
+    
+    Equivale a llamar predict_duration({**task_data, 'person_id': pid}) por cada persona,
+    pero carga a todas las personas con una consulta y arma una única matriz de features.
+    
+    Args:
+        task_data (dict): Datos de la tarea (sin person_id)
+        person_ids (list): IDs de las personas candidatas
+    
+    Returns:
+        dict {person_id: resultado con el mismo formato que predict_duration}
+    """
+    if not person_ids:
+        return {}
+    
+    model = load_model()
+    
+    if model is None:
+        return {pid: predict_duration_heuristic({**task_data, 'person_id': pid}) for pid in person_ids}
+    
+    try:
+        from app.models.web_user import WebUser
+        
+        persons = WebUser.query.filter(WebUser.id.in_(list(set(person_ids)))).all()
+        persons_by_id = {person.id: person for person in persons}
+        
+        # Una fila por persona (persona inexistente → promedios, igual que el modo individual)
+        features = build_features([build_feature_dict(task_data, persons_by_id.get(pid)) for pid in person_ids])
+        
+        # Una sola predicción para todos: log1p(duration_days) → días calibrados
+        predicted_days_raw = np.expm1(np.asarray(cached_predict('duration', model, features, method='predict'), dtype=float))
+        predicted_days_calibrated = predicted_days_raw * CALIBRATION_FACTOR
+        in_range = (predicted_days_calibrated >= CALIBRATED_MIN_DAYS) & (predicted_days_calibrated <= CALIBRATED_MAX_DAYS)
+        
+        print(f"   ✓  CatBoost (lote): {len(person_ids)} personas, {int(in_range.sum())} en rango calibrado")
+        
+        results = {}
+        for i, pid in enumerate(person_ids):
+            row_task_data = {**task_data, 'person_id': pid}
+            
+            if not in_range[i]:
+                results[pid] = predict_duration_heuristic(row_task_data)
+                continue
+            
+            predicted_days = float(predicted_days_calibrated[i])
+            results[pid] = {
+                'duration_days': round(predicted_days, 1),
+                'confidence_interval': {
+                    'min': round(max(1, predicted_days * 0.8), 1),
+                    'max': round(predicted_days * 1.2, 1),
+                    'mean': round(predicted_days, 1)
+                },
+                'factors': identify_duration_factors(row_task_data, pid, persons_by_id.get(pid)),
+                'mode': 'personalized' if pid else 'generic'
+            }
+        
+        return results
+        
+    except InferenceQueueFull:
+        raise
+    except Exception as e:
+        print(f"Error en predicción de duración por lote: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {pid: predict_duration_heuristic({**task_data, 'person_id': pid}) for pid in person_ids}
+
+
+def predict_task_durations(task_data_list):
+    """
+    Predecir la duración (días) de varias tareas en modo genérico con una sola llamada al modelo
+    
+    Misma lógica que predict_duration sin person_id: fuera del rango calibrado
+    se usa la heurística. Usado por el cálculo de la ruta crítica.
+    
+    Args:
+        task_data_list (list): Datos de cada tarea (complexity_level, duration_est_days, ...)
+    
+    Returns:
+        list de duraciones en días, en el mismo orden
+    """
+    if not task_data_list:
+        return []
+    
+    model = load_model()
+    
+    if model is None:
+        return [predict_duration_heuristic(task_data)['duration'] for task_data in task_data_list]
+    
+    try:
+        features = build_features([build_feature_dict(task_data) for task_data in task_data_list])
+        
+        # Una sola predicción para todas: log1p(duration_days) → días calibrados
+        predicted_days_raw = np.expm1(np.asarray(cached_predict('duration', model, features, method='predict'), dtype=float))
+        predicted_days_calibrated = predicted_days_raw * CALIBRATION_FACTOR
+        in_range = (predicted_days_calibrated >= CALIBRATED_MIN_DAYS) & (predicted_days_calibrated <= CALIBRATED_MAX_DAYS)
+        
+        return [
+            round(float(predicted_days_calibrated[i]), 1) if in_range[i] else predict_duration_heuristic(task_data)['duration']
+            for i, task_data in enumerate(task_data_list)
+        ]
+        
+    except InferenceQueueFull:
+        raise
+    except Exception as e:
+        print(f"Error en predicción de duración por tareas: {str(e)}")
+        return [predict_duration_heuristic(task_data)['duration'] for task_data in task_data_list]
+
+
 def predict_duration_heuristic(task_data):
     """
     Predicción heurística de duración
@@ -206,26 +363,14 @@ def predict_duration_heuristic(task_data):
     }
 
 
-def prepare_features(task_data, person_id=None):
+def build_feature_dict(task_data, person=None):
     """
-    Preparar features para el modelo NUMERIC_ONLY según columns_regression_numeric.json
+    Construir el diccionario de las 8 features numéricas sin consultar la BD
     
-    Features del modelo (SOLO NUMÉRICAS):
-    1. duration_est_imputed         (días) -  MÁS IMPORTANTE (correlación ~0.9)
-    2. experience_years_imputed     (años)
-    3. availability_hours_week_imputed (horas/semana)
-    4. current_load_imputed         (número de tareas)
-    5. performance_index_imputed    (0-1, normalizado)
-    6. rework_rate_imputed          (0-1)
-    7. load_ratio                   (carga/capacidad)
-    8. complexity_numeric           (1=Baja, 2=Media, 3=Alta)
-    
-    MODO DUAL:
-    - Si person_id es None → usa promedios (modo genérico)
-    - Si person_id existe → usa datos reales de la persona (modo personalizado)
+    Args:
+        task_data (dict): Datos de la tarea
+        person (WebUser): Persona ya cargada (None → promedios del modo genérico)
     """
-    global _config
-    
     # complexity_numeric: Convertir texto a escala numérica 1-3
     complexity_map = {'Baja': 1.0, 'baja': 1.0, 'LOW': 1.0, 'Low': 1.0,
                       'Media': 2.0, 'media': 2.0, 'MEDIUM': 2.0, 'Medium': 2.0,
@@ -240,29 +385,16 @@ def prepare_features(task_data, person_id=None):
     
     # Features de persona (personalizado vs genérico)
     # IMPORTANTE: Estas features NUMÉRICAS son las que harán la diferencia real
-    
-    if person_id:
-        # MODO PERSONALIZADO: Usar datos reales de la persona
-        from app.models.web_user import WebUser
-        person = WebUser.query.get(person_id)
-        
-        if person:
-            # Features numéricas personalizadas
-            experience_years_imputed = float(person.experience_years or 2.0)
-            availability_hours_week_imputed = float(person.availability_hours_week or 40.0)
-            current_load_imputed = float(person.current_load or 0.0)
-            # Normalizar performance_index a escala 0-1 (modelo espera 0-1, no 0-100)
-            performance_index_imputed = float(person.performance_index or 0.5) / 100.0 if person.performance_index and person.performance_index > 1 else float(person.performance_index or 0.5)
-            rework_rate_imputed = float(person.rework_rate or 0.1)
-        else:
-            # Fallback a promedios
-            experience_years_imputed = 2.0
-            availability_hours_week_imputed = 40.0
-            current_load_imputed = 0.0
-            performance_index_imputed = 0.5  # 50% normalizado
-            rework_rate_imputed = 0.1
+    if person:
+        # MODO PERSONALIZADO: Features numéricas de la persona
+        experience_years_imputed = float(person.experience_years or 2.0)
+        availability_hours_week_imputed = float(person.availability_hours_week or 40.0)
+        current_load_imputed = float(person.current_load or 0.0)
+        # Normalizar performance_index a escala 0-1 (modelo espera 0-1, no 0-100)
+        performance_index_imputed = float(person.performance_index or 0.5) / 100.0 if person.performance_index and person.performance_index > 1 else float(person.performance_index or 0.5)
+        rework_rate_imputed = float(person.rework_rate or 0.1)
     else:
-        # MODO GENÉRICO: Promedios del dominio IT
+        # MODO GENÉRICO (o persona no encontrada): Promedios del dominio IT
         experience_years_imputed = 2.0
         availability_hours_week_imputed = 40.0
         current_load_imputed = 0.0
@@ -285,27 +417,52 @@ def prepare_features(task_data, person_id=None):
         'complexity_numeric': float(complexity_numeric)
     }
     
-    # Crear DataFrame con el orden exacto del entrenamiento
-    # Orden según columns_regression_numeric.json
-    feature_order = [
-        'duration_est_imputed',
-        'experience_years_imputed',
-        'availability_hours_week_imputed',
-        'current_load_imputed',
-        'performance_index_imputed',
-        'rework_rate_imputed',
-        'load_ratio',
-        'complexity_numeric'
-    ]
-    
-    df = pd.DataFrame([feature_dict], columns=feature_order)
-    
-    return df
+    return feature_dict
+
+
+def build_features(feature_dicts, schema=None):
+    """
+    Entrada del modelo para una lista de diccionarios de features (sin pandas si hay esquema)
+    """
+    schema = schema or get_schema()
+    if schema is None:
+        return pd.DataFrame(feature_dicts, columns=FEATURE_ORDER)
+    return schema.rows(feature_dicts)
+
+
+def prepare_features(task_data, person_id=None):
+    """
+    Preparar features para el modelo NUMERIC_ONLY según columns_regression_numeric.json
+    
+    Features del modelo (SOLO NUMÉRICAS):
+    1. duration_est_imputed         (días) -  MÁS IMPORTANTE (correlación ~0.9)
+    2. experience_years_imputed     (años)
+    3. availability_hours_week_imputed (horas/semana)
+    4. current_load_imputed         (número de tareas)
+    5. performance_index_imputed    (0-1, normalizado)
+    6. rework_rate_imputed          (0-1)
+    7. load_ratio                   (carga/capacidad)
+    8. complexity_numeric           (1=Baja, 2=Media, 3=Alta)
+    
+    MODO DUAL:
+    - Si person_id es None → usa promedios (modo genérico)
+    - Si person_id existe → usa datos reales de la persona (modo personalizado)
+    """
+    person = None
+    if person_id:
+        # MODO PERSONALIZADO: Usar datos reales de la persona
+        from app.models.web_user import WebUser
+        person = WebUser.query.get(person_id)
+    
+    # Una fila con el orden exacto del entrenamiento
+    return build_features([build_feature_dict(task_data, person)])
 
 
-def identify_duration_factors(task_data, person_id=None):
+def identify_duration_factors(task_data, person_id=None, person=None):
     """
     Identificar factores que afectan la duración
+    
+    Si se pasa person (ya cargada) no se vuelve a consultar la BD
     """
     factors = []
     
@@ -325,8 +482,9 @@ def identify_duration_factors(task_data, person_id=None):
     
     # Factores de la persona (si está en modo personalizado)
     if person_id:
-        from app.models.web_user import WebUser
-        person = WebUser.query.get(person_id)
+        if person is None:
+            from app.models.web_user import WebUser
+            person = WebUser.query.get(person_id)
         
         if person:
             # Performance
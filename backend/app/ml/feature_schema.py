@@ -0,0 +1,170 @@
+"""
+Esquema de Features Compilado
+Convierte los diccionarios de features en la entrada del modelo sin pandas
+
+Se construye una sola vez al cargar cada modelo (columns_binary.json,
+columns_regression_numeric.json, columns_recommender.json) con el orden de
+columnas y los índices categóricos ya resueltos. Por petición solo se arma una
+lista por fila en ese orden:
+- modelos CatBoost con categóricas → catboost.Pool con cat_features fijos
+- modelos CatBoost solo numéricos → numpy.ndarray float64 preasignado
+- otros modelos (p. ej. XGBoost) → pandas.DataFrame con el orden de columnas
+
+Para una sola fila construir y reordenar un DataFrame cuesta más que evaluar
+los árboles (ver ml/benchmarks/benchmark_feature_schema.py).
+"""
+import numpy as np
+import pandas as pd
+from catboost import CatBoost, Pool
+
+
+class FeatureSchema:
+    """
+    Orden de columnas e índices categóricos de un modelo
+    """
+    
+    def __init__(self, columns, categorical=(), native=True):
+        categorical = set(categorical)
+        
+        self.columns = tuple(columns)
+        self.cat_indices = [i for i, column in enumerate(self.columns) if column in categorical]
+        self.numeric_indices = [i for i, column in enumerate(self.columns) if column not in categorical]
+        self.native = native  # True → Pool / ndarray para CatBoost; False → DataFrame
+        self._columns_key = hash(self.columns)
+    
+    @classmethod
+    def from_config(cls, config, columns_key, model=None, default_columns=None):
+        """
+        Esquema a partir del JSON de columnas del modelo
+        
+        Si el JSON no trae la lista de columnas se usan default_columns o, para
+        CatBoost, los nombres y categóricas guardados en el propio modelo.
+        
+        Args:
+            config: dict del JSON de columnas (o None)
+            columns_key: clave con el orden completo ('all_columns', 'all_features', 'numeric', ...)
+            model: modelo cargado (define el formato de entrada)
+            default_columns: orden a usar si el JSON no lo tiene
+        
+        Returns:
+            FeatureSchema o None si no hay forma de conocer las columnas
+        """
+        native = model is None or isinstance(model, CatBoost)
+        config = config or {}
+        
+        columns = config.get(columns_key) or default_columns
+        categorical = config.get('categorical') or config.get('categorical_columns') or []
+        
+        if not columns and isinstance(model, CatBoost) and model.feature_names_:
+            columns = model.feature_names_
+            categorical = [columns[i] for i in model.get_cat_feature_indices()]
+        
+        if not columns:
+            return None
+        
+        return cls(columns, categorical, native=native)
+    
+    def row(self, feature_dict):
+        """
+        Valores de un diccionario de features en el orden del esquema
+        """
+        return [feature_dict[column] for column in self.columns]
+    
+    def rows(self, feature_dicts):
+        """
+        FeatureRows a partir de una lista de diccionarios de features
+        """
+        columns = self.columns
+        return FeatureRows(self, [[feature_dict[column] for column in columns] for feature_dict in feature_dicts])
+    
+    def to_model_input(self, rows):
+        """
+        Entrada del modelo para una lista de filas (ver docstring del módulo)
+        """
+        if not self.native:
+            return pd.DataFrame(rows, columns=list(self.columns))
+        
+        if self.cat_indices:
+            return Pool(rows, cat_features=self.cat_indices, feature_names=list(self.columns))
+        
+        matrix = np.empty((len(rows), len(self.columns)), dtype=np.float64)
+        matrix[:] = rows
+        return matrix
+    
+    def row_key(self, row, precision):
+        """
+        Clave exacta de una fila normalizada (numéricos redondeados) para la caché de predicciones
+        """
+        values = list(row)
+        for i in self.numeric_indices:
+            values[i] = round(float(values[i]), precision)
+        return tuple(values)
+
+
+class FeatureRows:
+    """
+    Filas ya ordenadas según un FeatureSchema (lo que recibe cached_predict/run_model en lugar de un DataFrame)
+    """
+    
+    __slots__ = ('schema', 'rows')
+    
+    def __init__(self, schema, rows):
+        self.schema = schema
+        self.rows = rows
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    @property
+    def columns(self):
+        return self.schema.columns
+    
+    @property
+    def columns_key(self):
+        return self.schema._columns_key
+    
+    def take(self, positions):
+        """
+        Subconjunto de filas por posición
+        """
+        return FeatureRows(self.schema, [self.rows[i] for i in positions])
+    
+    def row_keys(self, precision):
+        """
+        Claves de caché de todas las filas
+        """
+        return [self.schema.row_key(row, precision) for row in self.rows]
+    
+    def to_model_input(self):
+        return self.schema.to_model_input(self.rows)
+    
+    def to_frame(self):
+        """
+        DataFrame equivalente (depuración y compatibilidad)
+        """
+        return pd.DataFrame(self.rows, columns=list(self.schema.columns))
+
+
+def model_input(features):
+    """
+    Entrada para getattr(model, method): FeatureRows se convierte; un DataFrame pasa tal cual
+    """
+    return features.to_model_input() if isinstance(features, FeatureRows) else features
+
+
+def concat_features(parts):
+    """
+    Unir las filas de varias peticiones (micro-batching)
+    
+    Solo se unen partes del mismo tipo; FeatureRows de un mismo modelo comparten esquema.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    
+    if isinstance(parts[0], FeatureRows):
+        rows = []
+        for part in parts:
+            rows.extend(part.rows)
+        return FeatureRows(parts[0].schema, rows)
+    
+    return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,123 @@
+"""
+Alcanzabilidad en Grafos de Dependencias
+Conteo de descendientes (impact_count) de todas las tareas en una sola pasada
+
+En lugar de recorrer el grafo desde cada nodo (nx.descendants por tarea, O(V·(V+E))):
+1. Se condensan las componentes fuertemente conexas (los ciclos pasan a ser un
+   solo nodo), con scipy.sparse.csgraph
+2. Se ordena el DAG de componentes topológicamente (Kahn)
+3. En orden topológico inverso, el conjunto de descendientes de cada componente
+   es la unión (OR de bits en un int de Python) de los de sus sucesores
+
+Los bits de cada componente se asignan de forma que sus descendientes queden
+siempre en posiciones menores, y el conjunto de un sucesor se libera en cuanto
+lo consumió su último predecesor; así la memoria depende del ancho del grafo y
+no de V². Ver ml/benchmarks/benchmark_reachability.py.
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+def descendant_counts(nodes, edges, topological=False):
+    """
+    Número de descendientes de cada nodo, igual a len(nx.descendants(G, nodo))
+    
+    Un nodo dentro de un ciclo alcanza a los demás nodos de su componente (pero
+    no se cuenta a sí mismo).
+    
+    Args:
+        nodes: iterable de ids de nodo
+        edges: iterable de pares (predecesor, sucesor); se ignoran los que
+            apuntan a nodos que no están en nodes
+        topological: nodes ya viene en orden topológico de un grafo acíclico
+            (p. ej. el orden que mantiene graph_store): no se buscan
+            componentes fuertes ni se vuelve a ordenar el DAG
+    
+    Returns:
+        dict {nodo: número de descendientes}
+    """
+    nodes = list(dict.fromkeys(nodes))
+    if not nodes:
+        return {}
+    
+    index = {node: i for i, node in enumerate(nodes)}
+    pairs = [(index[u], index[v]) for u, v in edges if u in index and v in index]
+    if not pairs:
+        return dict.fromkeys(nodes, 0)
+    
+    n_nodes = len(nodes)
+    src, dst = np.array(pairs, dtype=np.int64).T
+    
+    # 1. Componentes fuertemente conexas (con orden topológico, cada nodo es su componente)
+    if topological:
+        n_comp, component = n_nodes, np.arange(n_nodes, dtype=np.int64)
+    else:
+        graph = csr_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n_nodes, n_nodes))
+        n_comp, component = connected_components(graph, directed=True, connection='strong')
+        component = component.astype(np.int64)  # las etiquetas vienen en int32 y se combinan de a pares
+    comp_size = np.bincount(component, minlength=n_comp)
+    
+    # 2. DAG de componentes (sin aristas internas ni repetidas), sucesores en formato CSR
+    comp_src, comp_dst = component[src], component[dst]
+    external = comp_src != comp_dst
+    dag_edges = np.unique(comp_src[external] * n_comp + comp_dst[external])
+    dag_src, dag_dst = dag_edges // n_comp, dag_edges % n_comp
+    succ_ptr = np.searchsorted(dag_src, np.arange(n_comp + 1)).tolist()
+    successors = dag_dst.tolist()
+    in_degree = np.bincount(dag_dst, minlength=n_comp).tolist()
+    
+    if topological:
+        order = list(range(n_comp))
+    else:
+        order = _topological_order(n_comp, succ_ptr, successors, list(in_degree))
+    
+    # 3. Bits de cada componente: las últimas en orden topológico ocupan los bits bajos
+    offsets = np.zeros(n_comp, dtype=np.int64)
+    reverse_order = order[::-1]
+    offsets[reverse_order] = np.concatenate(([0], np.cumsum(comp_size[reverse_order])[:-1]))
+    offsets = offsets.tolist()
+    sizes = comp_size.tolist()
+    
+    # closure[c] = bits de c y de todos sus descendientes (mientras algún predecesor lo necesite)
+    closure = {}
+    pending = in_degree
+    counts = [0] * n_comp
+    
+    for c in reverse_order:
+        reach = 0
+        for d in successors[succ_ptr[c]:succ_ptr[c + 1]]:
+            reach |= closure[d]
+            pending[d] -= 1
+            if pending[d] == 0:
+                del closure[d]
+        
+        counts[c] = _popcount(reach) + sizes[c] - 1
+        if pending[c] > 0:
+            closure[c] = reach | (((1 << sizes[c]) - 1) << offsets[c])
+    
+    node_counts = np.asarray(counts, dtype=np.int64)[component]
+    return dict(zip(nodes, node_counts.tolist()))
+
+
+def _topological_order(n_comp, succ_ptr, successors, remaining):
+    """
+    Orden topológico de un DAG en formato CSR (algoritmo de Kahn)
+    """
+    order = [c for c in range(n_comp) if remaining[c] == 0]
+    for c in order:
+        for d in successors[succ_ptr[c]:succ_ptr[c + 1]]:
+            remaining[d] -= 1
+            if remaining[d] == 0:
+                order.append(d)
+    return order
+
+
+def _popcount(bits):
+    """
+    Bits encendidos de un int (int.bit_count desde Python 3.10)
+    """
+    try:
+        return bits.bit_count()
+    except AttributeError:
+        return bin(bits).count('1')
@@ -0,0 +1,216 @@
+"""
+Micro-batching de Inferencia
+Agrupa las predicciones concurrentes de un mismo modelo en una sola matriz
+
+Cada petición encola sus filas de features y espera su resultado. Un hilo por
+(modelo, método) toma la primera petición, espera a lo sumo
+ML_BATCH_WINDOW_MS milisegundos (o hasta juntar ML_BATCH_MAX_ROWS filas),
+llama al modelo una sola vez y reparte las filas de salida.
+
+La cola es acotada (ML_BATCH_MAX_QUEUE): si está llena durante
+ML_BATCH_SUBMIT_TIMEOUT_MS se rechaza la petición con InferenceQueueFull
+(backpressure) en lugar de acumular latencia sin límite.
+"""
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from flask import current_app, has_app_context
+
+from app.ml.feature_schema import model_input, concat_features
+
+
+# Muestras de espera en cola que se conservan para calcular percentiles
+WAIT_SAMPLES = 1000
+
+
+class InferenceQueueFull(Exception):
+    """La cola de inferencia alcanzó su profundidad máxima"""
+    pass
+
+
+class _PendingPrediction:
+    """Filas de una petición esperando su lote"""
+    
+    __slots__ = ('model', 'features', 'future', 'enqueued_at')
+    
+    def __init__(self, model, features):
+        self.model = model
+        self.features = features
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceBatcher:
+    """
+    Cola + hilo que ejecuta getattr(model, method)(matriz) por lotes
+    """
+    
+    def __init__(self, name, method, window_ms=2, max_rows=256, max_queue=1000, submit_timeout_ms=50):
+        self.name = name
+        self.method = method
+        self.window = window_ms / 1000.0
+        self.max_rows = max_rows
+        self.submit_timeout = submit_timeout_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._waits_ms = deque(maxlen=WAIT_SAMPLES)
+        self._stats = {'requests': 0, 'rows': 0, 'batches': 0, 'max_batch_rows': 0, 'rejected': 0, 'errors': 0}
+        
+        self._thread = threading.Thread(target=self._run, name=f'ml-batcher-{name}-{method}', daemon=True)
+        self._thread.start()
+    
+    def submit(self, model, features):
+        """
+        Encolar filas de features y devolver un Future con la salida del modelo para esas filas
+        
+        Raises:
+            InferenceQueueFull: si la cola sigue llena tras submit_timeout
+        """
+        pending = _PendingPrediction(model, features)
+        
+        try:
+            self._queue.put(pending, timeout=self.submit_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats['rejected'] += 1
+            raise InferenceQueueFull(f"Cola de inferencia '{self.name}' llena ({self._queue.maxsize} peticiones)")
+        
+        return pending.future
+    
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            rows = len(first.features)
+            deadline = first.enqueued_at + self.window
+            
+            # Juntar más peticiones hasta cumplir la ventana o el máximo de filas
+            while rows < self.max_rows:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                rows += len(pending.features)
+            
+            self._execute(batch)
+    
+    def _execute(self, batch):
+        started_at = time.perf_counter()
+        
+        # Tras un reemplazo en caliente pueden convivir dos versiones: un lote por modelo
+        groups = {}
+        for pending in batch:
+            groups.setdefault(id(pending.model), []).append(pending)
+        
+        for group in groups.values():
+            try:
+                matrix = concat_features([pending.features for pending in group])
+                output = getattr(group[0].model, self.method)(model_input(matrix))
+                
+                offset = 0
+                for pending in group:
+                    n_rows = len(pending.features)
+                    pending.future.set_result(output[offset:offset + n_rows])
+                    offset += n_rows
+            
+            except Exception as e:
+                with self._stats_lock:
+                    self._stats['errors'] += 1
+                for pending in group:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+        
+        with self._stats_lock:
+            rows = sum(len(pending.features) for pending in batch)
+            self._stats['requests'] += len(batch)
+            self._stats['rows'] += rows
+            self._stats['batches'] += 1
+            self._stats['max_batch_rows'] = max(self._stats['max_batch_rows'], rows)
+            self._waits_ms.extend((started_at - pending.enqueued_at) * 1000 for pending in batch)
+    
+    def stats(self):
+        """
+        Métricas de tamaño de lote y espera en cola
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+            waits = sorted(self._waits_ms)
+        
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_batch_rows'] = round(stats['rows'] / stats['batches'], 2) if stats['batches'] else 0
+        stats['avg_requests_per_batch'] = round(stats['requests'] / stats['batches'], 2) if stats['batches'] else 0
+        stats['queue_wait_ms'] = {
+            'avg': round(sum(waits) / len(waits), 3) if waits else 0,
+            'p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0,
+            'max': round(waits[-1], 3) if waits else 0
+        }
+        
+        return stats
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(name, method):
+    """
+    Obtener (o crear con la configuración de la app) el batcher de un modelo/método
+    """
+    key = (name, method)
+    batcher = _batchers.get(key)
+    
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(key)
+            if batcher is None:
+                config = current_app.config
+                batcher = InferenceBatcher(
+                    name,
+                    method,
+                    window_ms=config.get('ML_BATCH_WINDOW_MS', 2),
+                    max_rows=config.get('ML_BATCH_MAX_ROWS', 256),
+                    max_queue=config.get('ML_BATCH_MAX_QUEUE', 1000),
+                    submit_timeout_ms=config.get('ML_BATCH_SUBMIT_TIMEOUT_MS', 50)
+                )
+                _batchers[key] = batcher
+    
+    return batcher
+
+
+def run_model(name, model, features, method='predict_proba'):
+    """
+    Ejecutar getattr(model, method)(features) pasando por el micro-batching si está activo
+    
+    Con ML_INFERENCE_BATCHING desactivado (o fuera de la app) llama al modelo directamente.
+    
+    Args:
+        name: nombre del modelo en el registro ('risk', 'duration', ...)
+        model: objeto del modelo ya obtenido del registro
+        features: FeatureRows o pandas.DataFrame con una o más filas
+        method: 'predict_proba' o 'predict'
+    
+    Returns:
+        salida del modelo para esas filas (mismo formato que la llamada directa)
+    
+    Raises:
+        InferenceQueueFull: backpressure, la cola del modelo está llena
+    """
+    if not has_app_context() or not current_app.config.get('ML_INFERENCE_BATCHING', False):
+        return getattr(model, method)(model_input(features))
+    
+    timeout = current_app.config.get('ML_BATCH_RESULT_TIMEOUT_MS', 5000) / 1000.0
+    return get_batcher(name, method).submit(model, features).result(timeout=timeout)
+
+
+def inference_stats():
+    """
+    Métricas de todos los batchers activos: {'modelo.metodo': stats}
+    """
+    return {f'{name}.{method}': batcher.stats() for (name, method), batcher in list(_batchers.items())}
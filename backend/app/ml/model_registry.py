@@ -0,0 +1,310 @@
+"""
+Registro Central de Modelos ML
+Carga todos los modelos al crear la app y los reemplaza en caliente cuando
+cambia la versión activa (tabla ml_models) o el archivo del modelo en disco
+"""
+import os
+import itertools
+import threading
+import importlib
+from datetime import datetime
+from flask import current_app, has_app_context
+
+
+# Modelos administrados por el registro
+#   module: módulo que implementa load_artifacts(model_file=None) y opcionalmente warm_up(artifacts)
+#           (load_artifacts puede incluir 'schema': FeatureSchema compilado una vez por carga)
+#   model_type: valor de MLModel.type cuya versión activa se vigila (None → solo se vigila el archivo)
+MODEL_SPECS = {
+    'risk': {'module': 'app.ml.risk_model', 'model_type': 'risk'},
+    'duration': {'module': 'app.ml.duration_model', 'model_type': 'duration'},
+    'recommendation': {'module': 'app.ml.recommender_model', 'model_type': 'recommendation'},
+    'performance': {'module': 'app.ml.performance_model', 'model_type': 'performance'},
+    'attrition': {'module': 'app.ml.attrition_model', 'model_type': None},
+    'process_mining': {'module': 'app.ml.process_mining', 'model_type': None},
+    'bottleneck': {'module': 'app.routes.process_mining_routes', 'model_type': None}
+}
+
+# Raíz del backend (las rutas relativas de ml_models.model_path se resuelven desde aquí)
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def get_models_path():
+    """
+    Carpeta raíz de los modelos ML (ML_MODELS_PATH de la configuración)
+    """
+    if has_app_context():
+        models_path = current_app.config.get('ML_MODELS_PATH')
+        if models_path:
+            return models_path
+    
+    return os.path.join(BACKEND_ROOT, 'ml', 'models')
+
+
+def _file_mtime(path):
+    """
+    Fecha de modificación de un archivo (None si no existe)
+    """
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+class ModelRegistry:
+    """
+    Mantiene una entrada inmutable por modelo: {model, config, metrics, model_file, ...}
+    
+    Las lecturas no toman locks: get() devuelve la entrada vigente y un reemplazo
+    es una sola asignación en el diccionario, por lo que una petición nunca ve
+    un modelo a medio cargar. Las cargas se serializan con _load_lock y ocurren
+    fuera del camino de las peticiones (arranque, watcher o activación).
+    """
+    
+    def __init__(self, app=None):
+        self._entries = {}
+        self._tokens = itertools.count(1)
+        self._load_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher = None
+        self.app = None
+        self.warm_up_enabled = False
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Precargar todos los modelos y arrancar el watcher de versiones
+        """
+        self.app = app
+        self.warm_up_enabled = app.config.get('ML_MODEL_WARMUP', False)
+        
+        if app.config.get('ML_PRELOAD_MODELS', True):
+            with app.app_context():
+                self.load_all()
+        
+        # El watcher necesita BD; igual que el scheduler, no se inicia en tests.
+        # Con gunicorn --preload lo arranca cada worker en post_fork (los hilos no sobreviven al fork)
+        if not app.config.get('TESTING', False) and not app.config.get('ML_MODEL_WATCHER_POST_FORK', False):
+            self.start_watcher()
+    
+    def load_all(self):
+        """
+        Cargar todos los modelos registrados
+        """
+        started_at = datetime.now()
+        active_versions = self._get_active_versions()
+        
+        for name in MODEL_SPECS:
+            self.load(name, active_versions.get(name))
+        
+        loaded = [name for name, entry in self._entries.items() if entry['model'] is not None]
+        elapsed = (datetime.now() - started_at).total_seconds()
+        print(f"✅ Registro de modelos: {len(loaded)}/{len(MODEL_SPECS)} cargados en {elapsed:.2f}s ({', '.join(loaded)})")
+    
+    def get(self, name):
+        """
+        Obtener la entrada vigente de un modelo (se carga si aún no está en el registro)
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            entry = self.load(name, self._get_active_versions().get(name), only_if_missing=True)
+        return entry
+    
+    def get_model(self, name):
+        """
+        Obtener el objeto del modelo (None si no está disponible)
+        """
+        return self.get(name)['model']
+    
+    def get_config(self, name):
+        """
+        Obtener la configuración (columnas) del modelo
+        """
+        return self.get(name)['config']
+    
+    def get_schema(self, name):
+        """
+        Obtener el esquema de features compilado del modelo (None si el módulo no lo define)
+        """
+        return self.get(name)['schema']
+    
+    def load(self, name, active_version=None, only_if_missing=False):
+        """
+        Cargar (o recargar) un modelo y reemplazar su entrada de forma atómica
+        
+        Args:
+            name: nombre en MODEL_SPECS
+            active_version: dict {version, model_path} de la fila activa en ml_models
+            only_if_missing: no recargar si otro hilo ya lo cargó
+        
+        Returns:
+            dict con la entrada vigente
+        """
+        spec = MODEL_SPECS[name]
+        
+        with self._load_lock:
+            if only_if_missing and name in self._entries:
+                return self._entries[name]
+            
+            model_file = self._resolve_model_file(active_version)
+            
+            try:
+                module = importlib.import_module(spec['module'])
+                artifacts = module.load_artifacts(model_file) or {}
+                
+                if self.warm_up_enabled and artifacts.get('model') is not None and hasattr(module, 'warm_up'):
+                    module.warm_up(artifacts)
+            
+            except Exception as e:
+                print(f"✗ Error al cargar modelo '{name}': {str(e)}")
+                artifacts = {}
+            
+            entry = {
+                'name': name,
+                'model': artifacts.get('model'),
+                'config': artifacts.get('config'),
+                'schema': artifacts.get('schema'),  # FeatureSchema compilado (modelos que lo definen)
+                'metrics': artifacts.get('metrics'),
+                'model_file': artifacts.get('model_file'),
+                'mtime': _file_mtime(artifacts.get('model_file')),
+                'version': active_version,
+                'token': next(self._tokens),  # Identifica esta carga (p. ej. en las claves de la caché de predicciones)
+                'loaded_at': datetime.now()
+            }
+            
+            # Reemplazo atómico: las peticiones en curso conservan la entrada anterior
+            replaced = name in self._entries
+            self._entries[name] = entry
+        
+        # Las predicciones de la versión anterior ya no se pueden servir
+        if replaced:
+            from app.ml.prediction_cache import prediction_cache
+            prediction_cache.invalidate(name)
+        
+        return entry
+    
+    def status(self):
+        """
+        Estado de los modelos cargados (para monitoreo)
+        
+        No toca los objetos de los modelos, solo los metadatos de cada entrada
+        """
+        return [
+            {
+                'name': name,
+                'loaded': entry['model'] is not None,
+                'model_file': entry['model_file'],
+                'version': (entry['version'] or {}).get('version'),
+                'loaded_at': entry['loaded_at'].isoformat()
+            }
+            for name, entry in self._entries.items()
+        ]
+    
+    def reload_type(self, model_type):
+        """
+        Recargar los modelos asociados a un MLModel.type (p. ej. tras activar una versión)
+        """
+        active_versions = self._get_active_versions()
+        
+        for name, spec in MODEL_SPECS.items():
+            if spec['model_type'] == model_type:
+                entry = self.load(name, active_versions.get(name))
+                print(f"🔄 Modelo '{name}' recargado (versión {(entry['version'] or {}).get('version', '-')})")
+    
+    def check_for_updates(self):
+        """
+        Recargar los modelos cuya versión activa o archivo cambió
+        
+        Returns:
+            list con los nombres recargados
+        """
+        active_versions = self._get_active_versions()
+        reloaded = []
+        
+        for name, entry in list(self._entries.items()):
+            active_version = active_versions.get(name)
+            version_changed = active_version is not None and active_version != entry['version']
+            file_changed = _file_mtime(entry['model_file']) != entry['mtime']
+            
+            if version_changed or file_changed:
+                self.load(name, active_version)
+                reloaded.append(name)
+        
+        if reloaded:
+            print(f"🔄 Modelos recargados en caliente: {', '.join(reloaded)}")
+        
+        return reloaded
+    
+    def start_watcher(self):
+        """
+        Iniciar el hilo que vigila las versiones activas (ML_MODEL_WATCH_INTERVAL segundos)
+        """
+        interval = self.app.config.get('ML_MODEL_WATCH_INTERVAL', 30)
+        if interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+        
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name='ml-model-watcher', daemon=True)
+        self._watcher.start()
+        print(f"✅ Watcher de modelos iniciado (cada {interval}s)")
+    
+    def stop_watcher(self):
+        """
+        Detener el watcher de versiones
+        """
+        self._stop_event.set()
+    
+    def _watch(self, interval):
+        while not self._stop_event.wait(interval):
+            try:
+                with self.app.app_context():
+                    self.check_for_updates()
+            except Exception as e:
+                print(f"⚠️ Error vigilando versiones de modelos: {str(e)}")
+    
+    def _get_active_versions(self):
+        """
+        Versión activa por modelo según ml_models: {name: {id, version, model_path}}
+        """
+        if not has_app_context():
+            return {}
+        
+        try:
+            from app.models.ml_models import MLModel
+            
+            names_by_type = {spec['model_type']: name for name, spec in MODEL_SPECS.items() if spec['model_type']}
+            rows = MLModel.query.filter(
+                MLModel.status == 'activo',
+                MLModel.type.in_(list(names_by_type))
+            ).order_by(MLModel.updated_at).all()
+            
+            # Si hay varias filas activas del mismo tipo gana la más reciente
+            return {
+                names_by_type[row.type]: {'id': row.id, 'version': row.version, 'model_path': row.model_path}
+                for row in rows
+            }
+        
+        except Exception as e:
+            # No dejar la sesión de la petición en estado fallido
+            from app.extensions import db
+            db.session.rollback()
+            print(f"⚠️ No se pudieron leer las versiones activas: {str(e)}")
+            return {}
+    
+    def _resolve_model_file(self, active_version):
+        """
+        Archivo de la versión activa si existe en disco (None → artefacto por defecto del módulo)
+        """
+        model_path = (active_version or {}).get('model_path')
+        if not model_path:
+            return None
+        
+        if not os.path.isabs(model_path):
+            model_path = os.path.join(BACKEND_ROOT, model_path)
+        
+        return model_path if os.path.isfile(model_path) else None
+
+
+# Instancia global
+model_registry = ModelRegistry()
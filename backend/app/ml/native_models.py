@@ -0,0 +1,166 @@
+"""
+Modelos CatBoost en Formato Nativo (.cbm)
+Carga y exportación de los modelos CatBoost sin pickle
+
+Cada modelo se guarda como <nombre>.cbm (binario nativo de CatBoost) junto a
+<nombre>.schema.json con la clase del modelo, las columnas, las categóricas y
+las clases. Al cargar:
+- se prefiere el .cbm si existe y no es más antiguo que el pickle del mismo nombre
+- el .cbm se lee de una vez a memoria y se deserializa desde ese buffer
+  (load_model(blob=...)), más rápido que abrirlo por ruta y que joblib.load
+- si no hay .cbm se usa el pickle (versiones antiguas registradas en ml_models)
+
+CatBoost copia el modelo a sus propias estructuras al deserializar, por lo que
+no admite mapear el archivo en memoria (blob exige bytes); el buffer leído se
+libera al terminar la carga. Ver ml/benchmarks/benchmark_model_loading.py.
+"""
+import os
+import json
+from datetime import datetime
+
+import joblib
+import catboost
+from catboost import CatBoost, CatBoostClassifier, CatBoostRegressor
+
+
+NATIVE_EXTENSION = '.cbm'
+SCHEMA_SUFFIX = '.schema.json'
+
+# Clase con la que se instancia el modelo nativo (define predict/predict_proba)
+MODEL_CLASSES = {
+    'CatBoostClassifier': CatBoostClassifier,
+    'CatBoostRegressor': CatBoostRegressor,
+    'CatBoost': CatBoost
+}
+
+
+def native_path(model_file):
+    """
+    Ruta del .cbm equivalente a un artefacto (mismo nombre, extensión .cbm)
+    """
+    return os.path.splitext(str(model_file))[0] + NATIVE_EXTENSION
+
+
+def schema_path(model_file):
+    """
+    Ruta del esquema JSON de un artefacto (<nombre>.schema.json)
+    """
+    return os.path.splitext(str(model_file))[0] + SCHEMA_SUFFIX
+
+
+def build_native_schema(model, source=None):
+    """
+    Esquema JSON de un modelo CatBoost (clase, columnas, categóricas y clases)
+    """
+    feature_names = list(model.feature_names_ or [])
+    cat_indices = list(model.get_cat_feature_indices())
+    classes = getattr(model, 'classes_', None) if isinstance(model, CatBoostClassifier) else None
+    
+    return {
+        'format': 'cbm',
+        'model_class': type(model).__name__,
+        'catboost_version': catboost.__version__,
+        'feature_names': feature_names,
+        'cat_features': [feature_names[i] for i in cat_indices] if feature_names else cat_indices,
+        'class_names': [_plain(value) for value in classes] if classes is not None else None,
+        'source': os.path.basename(str(source)) if source else None,
+        'created_at': datetime.now().isoformat()
+    }
+
+
+def save_native(model, model_file, source=None):
+    """
+    Guardar un modelo CatBoost como .cbm junto a su esquema JSON
+    
+    Args:
+        model: modelo CatBoost entrenado o cargado de un pickle
+        model_file: ruta del artefacto (se usa su nombre con extensión .cbm)
+        source: artefacto de origen (se anota en el esquema)
+    
+    Returns:
+        tuple (ruta .cbm, ruta .schema.json)
+    """
+    if not isinstance(model, CatBoost):
+        raise TypeError(f"Solo se exportan modelos CatBoost (recibido {type(model).__name__})")
+    
+    cbm_file = native_path(model_file)
+    schema_file = schema_path(model_file)
+    
+    model.save_model(cbm_file, format='cbm')
+    with open(schema_file, 'w', encoding='utf-8') as f:
+        json.dump(build_native_schema(model, source=source), f, indent=2, ensure_ascii=False)
+    
+    return cbm_file, schema_file
+
+
+def load_native_schema(model_file):
+    """
+    Esquema JSON de un artefacto (None si no existe)
+    """
+    path = schema_path(model_file)
+    if not os.path.exists(path):
+        return None
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def resolve_model_file(model_file):
+    """
+    Archivo a cargar para un artefacto: el .cbm si existe y está al día, si no el indicado
+    
+    Returns:
+        str o None si no existe ninguno
+    """
+    model_file = str(model_file)
+    cbm_file = native_path(model_file)
+    
+    if model_file == cbm_file:
+        if os.path.exists(cbm_file):
+            return cbm_file
+        # Sin .cbm: pickle con el mismo nombre (artefactos anteriores a la conversión)
+        pickle_file = os.path.splitext(cbm_file)[0] + '.pkl'
+        return pickle_file if os.path.exists(pickle_file) else None
+    
+    if os.path.exists(cbm_file) and (
+        not os.path.exists(model_file) or os.path.getmtime(cbm_file) >= os.path.getmtime(model_file)
+    ):
+        return cbm_file
+    
+    return model_file if os.path.exists(model_file) else None
+
+
+def load_catboost_model(model_file, model_class=CatBoost):
+    """
+    Cargar un modelo CatBoost por la vía más rápida disponible
+    
+    Args:
+        model_file: ruta del artefacto (.cbm o .pkl; se busca el .cbm del mismo nombre)
+        model_class: clase por defecto si el .cbm no tiene esquema JSON
+    
+    Returns:
+        tuple (modelo, ruta cargada) o (None, None) si no existe el artefacto
+    """
+    resolved = resolve_model_file(model_file)
+    if resolved is None:
+        return None, None
+    
+    if not resolved.endswith(NATIVE_EXTENSION):
+        return joblib.load(resolved), resolved
+    
+    schema = load_native_schema(resolved) or {}
+    model = MODEL_CLASSES.get(schema.get('model_class'), model_class)()
+    
+    # Leer de una vez y deserializar desde memoria
+    with open(resolved, 'rb') as f:
+        blob = f.read()
+    model.load_model(blob=blob)
+    
+    return model, resolved
+
+
+def _plain(value):
+    """
+    Valor serializable a JSON (las clases pueden venir como tipos numpy)
+    """
+    return value.item() if hasattr(value, 'item') else value
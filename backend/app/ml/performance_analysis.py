@@ -0,0 +1,348 @@
+"""
+Análisis Híbrido de Desempeño
+Métricas SQL, clasificación heurística de renuncia y motor de reglas de
+POST /api/ml/analisis-desempeno (un colaborador) y de su variante por equipo
+
+Las métricas de todos los colaboradores salen de una sola consulta agrupada
+por WebTask.assigned_to. Las reglas se evalúan sobre arreglos NumPy (una
+máscara por regla para todo el bloque) y solo el armado de los diccionarios
+de salida recorre las filas.
+"""
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models.web_user import WebUser
+from app.models.web_task import WebTask
+
+
+# Columnas de WebUser que usa el análisis (sin materializar objetos ORM en el modo equipo)
+MEMBER_COLUMNS = (
+    WebUser.id, WebUser.full_name, WebUser.area, WebUser.performance_index,
+    WebUser.current_load, WebUser.rework_rate, WebUser.created_at
+)
+
+# Factores contribuyentes: (máscara, factor, plantilla del valor), en el orden de la respuesta
+FACTOR_RULES = (
+    ('rendimiento_bajo', 'Rendimiento bajo del colaborador', '{rendimiento}%'),
+    ('retrabajos_altos', 'Alta tasa de retrabajos detectada', '{tasa_retrabajos}%'),
+    ('sobrecarga', 'Sobrecarga de trabajo actual', '{carga_actual}%'),
+    ('pocas_tareas', 'Poca experiencia en tareas asignadas', '{tareas_totales} tareas'),
+    ('exito_bajo', 'Baja tasa de éxito en tareas', '{calidad_exacta:.0f}%'),
+)
+
+# Motor de reglas: (máscara, recomendaciones que agrega), en el orden de evaluación
+RECOMMENDATION_RULES = (
+    # REGLA 1: Alto impacto + Liderazgo
+    ('alto_impacto', (
+        ('proyectos_alto_impacto', 'Asignar a Proyectos de Alto Impacto',
+         'Alto desempeño y baja probabilidad de renuncia. Ideal para liderar proyectos críticos.', 'alta', '🚀'),
+        ('liderazgo', 'Considerar para Rol de Liderazgo',
+         'Excelente candidato para roles de mentoría o liderazgo de equipo.', 'media', '👨‍💼'),
+    )),
+    # REGLA 2: Retención crítica
+    ('retencion_critica', (
+        ('retencion_critica', '⚠️ Retención Crítica - Talento en Riesgo',
+         'Alto desempeño pero alta probabilidad de renuncia. Requiere intervención inmediata.', 'crítica', '🚨'),
+        ('entrevista_retencion', 'Agendar Entrevista de Retención',
+         'Conversar sobre satisfacción laboral, crecimiento y expectativas.', 'alta', '💬'),
+    )),
+    # REGLA 3: Plan de mejora
+    ('plan_mejora', (
+        ('plan_mejora', 'Implementar Plan de Mejora',
+         'Desempeño bajo ({rendimiento}%). Requiere capacitación y seguimiento.', 'alta', '📚'),
+        ('capacitacion', 'Asignar Capacitación',
+         'Identificar brechas de habilidades y ofrecer entrenamiento específico.', 'media', '🎓'),
+    )),
+    # REGLA 4: Reconocimiento
+    ('reconocimiento', (
+        ('reconocimiento', '⭐ Reconocimiento Público',
+         'Desempeño excepcional ({rendimiento}%). Considerar bonos o reconocimientos.', 'media', '🏆'),
+    )),
+    # REGLA 5: Redistribución de carga
+    ('redistribucion_carga', (
+        ('redistribucion_carga', 'Redistribuir Carga de Trabajo',
+         'Sobrecarga detectada ({carga_actual}%). Reasignar tareas para evitar burnout.', 'alta', '⚖️'),
+    )),
+    # REGLA 6: Monitoreo moderado
+    ('monitoreo', (
+        ('monitoreo', 'Monitoreo Regular',
+         'Desempeño moderado. Establecer seguimientos quincenales.', 'baja', '📊'),
+    )),
+    # REGLA 7: Buen desempeño - mantener motivación
+    ('mantener_motivacion', (
+        ('mantener_motivacion', 'Mantener Motivación',
+         'Buen desempeño ({rendimiento}%). Continuar seguimiento y ofrecer oportunidades de desarrollo.', 'media', '💪'),
+        ('desarrollo', 'Oportunidades de Crecimiento',
+         'Asignar proyectos desafiantes para mantener el interés y desarrollo profesional.', 'media', '📈'),
+    )),
+    # REGLA 8: Riesgo moderado de renuncia
+    ('prevencion_renuncia', (
+        ('prevencion_renuncia', 'Prevención de Renuncia',
+         'Riesgo moderado de salida ({prob_renuncia:.0f}%). Revisar satisfacción y plan de carrera.', 'media', '⚠️'),
+    )),
+    # REGLA 9: Alta tasa de retrabajos
+    ('calidad', (
+        ('calidad', 'Mejorar Calidad de Trabajo',
+         'Tasa de retrabajos elevada ({tasa_retrabajos}%). Revisar procesos y capacitar en QA.', 'alta', '🔍'),
+    )),
+    # REGLA 10: Pocas tareas completadas
+    ('productividad', (
+        ('productividad', 'Aumentar Productividad',
+         'Solo {tareas_totales} tareas asignadas. Considerar aumentar carga gradualmente.', 'baja', '📋'),
+    )),
+    # REGLA 11: Desempeño estable y alto (sin problemas)
+    ('sin_acciones', (
+        ('sin_acciones', 'Desempeño Óptimo',
+         'El colaborador mantiene un excelente nivel. Continuar con seguimiento regular.', 'baja', '✅'),
+    )),
+)
+
+
+def get_task_stats(members):
+    """
+    Métricas de WebTask de varios colaboradores en una sola consulta (GROUP BY assigned_to)
+    
+    Args:
+        members: filas u objetos WebUser
+    
+    Returns:
+        dict {assigned_to: fila con total_tasks, completed_tasks, avg_hours}
+    """
+    keys = [str(member.id) for member in members]
+    if not keys:
+        return {}
+    
+    rows = db.session.query(
+        WebTask.assigned_to,
+        func.count(WebTask.id).label('total_tasks'),
+        func.sum(
+            db.case(
+                (WebTask.status == 'completada', 1),
+                else_=0
+            )
+        ).label('completed_tasks'),
+        func.avg(WebTask.actual_hours).label('avg_hours')
+    ).filter(
+        WebTask.assigned_to.in_(keys)
+    ).group_by(
+        WebTask.assigned_to
+    ).all()
+    
+    return {row.assigned_to: row for row in rows}
+
+
+def get_team_members(area=None, user_ids=None):
+    """
+    Colaboradores activos de un área o de una lista de ids (solo columnas del análisis)
+    """
+    query = db.session.query(*MEMBER_COLUMNS).filter(WebUser.status == 'active')
+    
+    if area:
+        query = query.filter(WebUser.area == area)
+    if user_ids:
+        query = query.filter(WebUser.id.in_(user_ids))
+    
+    return query.order_by(WebUser.full_name, WebUser.id).all()
+
+
+def build_metrics(member, stats):
+    """
+    CAPA 1: métricas del colaborador a partir de su fila de get_task_stats
+    
+    Returns:
+        tuple (metrics, tasa de éxito sin redondear)
+    """
+    total_tasks = int(getattr(stats, 'total_tasks', None) or 0)
+    completed_tasks = int(getattr(stats, 'completed_tasks', None) or 0)
+    avg_hours = float(getattr(stats, 'avg_hours', None) or 0)
+    
+    # Calcular tasa de éxito
+    success_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    
+    # Calcular tiempo promedio en días (asumiendo 8h/día)
+    avg_time = round(avg_hours / 8, 1) if avg_hours > 0 else 0
+    
+    metrics = {
+        'rendimiento': round(float(member.performance_index or 75), 1),
+        'tareas_completadas': completed_tasks,
+        'tareas_totales': total_tasks,
+        'calidad': round(success_rate, 1),
+        'tiempo_promedio': avg_time,
+        'carga_actual': round(float(member.current_load or 0), 0),
+        'tasa_retrabajos': round(float(member.rework_rate or 0) * 100, 1)
+    }
+    
+    return metrics, success_rate
+
+
+def analyze_members(members, task_stats, now=None):
+    """
+    Métricas, predicción y recomendaciones de varios colaboradores
+    
+    CAPA 1: métricas (build_metrics)
+    CAPA 2: probabilidad de renuncia y clase, vectorizadas
+    CAPA 3: motor de reglas, una máscara por regla
+    
+    Args:
+        members: filas u objetos WebUser
+        task_stats: dict de get_task_stats
+        now: fecha de referencia para la antigüedad (por defecto datetime.utcnow())
+    
+    Returns:
+        list[dict] con user_id, user_name, area, metricas, prediccion y recomendaciones
+    """
+    if not members:
+        return []
+    
+    now = now or datetime.utcnow()
+    
+    metrics_list = []
+    success_rates = []
+    for member in members:
+        metrics, success_rate = build_metrics(member, task_stats.get(str(member.id)))
+        metrics_list.append(metrics)
+        success_rates.append(success_rate)
+    
+    rendimiento = np.array([m['rendimiento'] for m in metrics_list], dtype=np.float64)
+    tasa_retrabajos = np.array([m['tasa_retrabajos'] for m in metrics_list], dtype=np.float64)
+    carga_actual = np.array([m['carga_actual'] for m in metrics_list], dtype=np.float64)
+    total_tasks = np.array([m['tareas_totales'] for m in metrics_list], dtype=np.int64)
+    success_rate = np.array(success_rates, dtype=np.float64)
+    
+    # Días desde el alta (NaN si no hay created_at)
+    days_since_join = np.array([
+        (now - member.created_at).days if member.created_at else np.nan for member in members
+    ], dtype=np.float64)
+    
+    # ============================================================
+    # CAPA 2: PREDICCIÓN (heurística gradual de renuncia)
+    # ============================================================
+    # Mismo orden de sumas que la versión escalar para obtener los mismos valores
+    base_attrition = np.full(len(members), 0.10)  # Base 10%
+    
+    # Factores que aumentan riesgo de renuncia
+    base_attrition = base_attrition + np.select(
+        [rendimiento < 60, rendimiento < 70, rendimiento < 75], [0.25, 0.15, 0.05], 0.0)
+    base_attrition = base_attrition + np.select(
+        [tasa_retrabajos > 25, tasa_retrabajos > 15, tasa_retrabajos > 10], [0.20, 0.10, 0.05], 0.0)
+    base_attrition = base_attrition + np.select(
+        [carga_actual > 90, carga_actual > 80, carga_actual > 70], [0.25, 0.15, 0.05], 0.0)
+    
+    # Factores que disminuyen riesgo de renuncia
+    base_attrition = base_attrition - np.where(rendimiento >= 85, 0.05, 0.0)
+    base_attrition = base_attrition - np.where(tasa_retrabajos < 5, 0.05, 0.0)
+    base_attrition = base_attrition - np.where(carga_actual < 50, 0.05, 0.0)
+    
+    # Limitar entre 0.05 y 0.95
+    attrition_prob = np.clip(base_attrition, 0.05, 0.95)
+    prob_renuncia = attrition_prob * 100
+    
+    # Clasificar según el riesgo calculado (primera condición que se cumple)
+    class_conditions = [
+        (rendimiento >= 80) & (attrition_prob < 0.20),
+        attrition_prob > 0.40,
+        (rendimiento < 65) | (tasa_retrabajos > 20)
+    ]
+    class_index = np.select(class_conditions, [0, 1, 2], 3)
+    class_names = np.array(['high_performer', 'resignation_risk', 'at_risk', 'at_risk'])[class_index]
+    
+    prob_high = np.select(class_conditions, [0.70 + (rendimiento - 80) / 100, 0.10, 0.15], 0.30 + (rendimiento - 65) / 100)
+    prob_at_risk = np.select(class_conditions, [0.20, 0.40, 0.60], 0.50)
+    
+    factor_masks = {
+        'rendimiento_bajo': rendimiento < 70,
+        'retrabajos_altos': tasa_retrabajos > 15,
+        'sobrecarga': carga_actual > 80,
+        'pocas_tareas': total_tasks < 5,
+        'exito_bajo': success_rate < 70
+    }
+    factor_impacts = {
+        'rendimiento_bajo': np.where(rendimiento < 50, 'crítico', 'alto'),
+        'retrabajos_altos': np.where(tasa_retrabajos > 25, 'crítico', 'alto'),
+        'sobrecarga': np.where(carga_actual > 95, 'crítico', 'medio'),
+        'pocas_tareas': np.full(len(members), 'medio'),
+        'exito_bajo': np.full(len(members), 'alto')
+    }
+    
+    # ============================================================
+    # CAPA 3: MOTOR DE REGLAS (Rule-Based System)
+    # ============================================================
+    rule_masks = {
+        'alto_impacto': (rendimiento >= 90) & (prob_renuncia < 15),
+        'retencion_critica': (prob_renuncia > 50) & (rendimiento > 80),
+        'plan_mejora': rendimiento < 60,
+        'reconocimiento': (rendimiento > 95) & (prob_renuncia < 5),
+        'redistribucion_carga': carga_actual > 90,
+        'monitoreo': (rendimiento >= 60) & (rendimiento < 80) & (prob_renuncia >= 15) & (prob_renuncia < 40),
+        'mantener_motivacion': (rendimiento >= 75) & (rendimiento < 90) & (prob_renuncia < 15),
+        'prevencion_renuncia': (prob_renuncia >= 25) & (prob_renuncia < 50) & (rendimiento >= 70),
+        'calidad': tasa_retrabajos > 15,
+        'productividad': (total_tasks < 10) & (days_since_join > 30),
+        'sin_acciones': (rendimiento >= 80) & (prob_renuncia < 10) & (tasa_retrabajos < 10) & (carga_actual < 80)
+    }
+    
+    # ============================================================
+    # OUTPUT: un diccionario por colaborador
+    # ============================================================
+    results = []
+    for i, member in enumerate(members):
+        metrics = metrics_list[i]
+        values = dict(metrics, calidad_exacta=success_rates[i], prob_renuncia=float(prob_renuncia[i]))
+        
+        factors = [{
+            'factor': factor,
+            'value': value.format(**values),
+            'impact': str(factor_impacts[name][i])
+        } for name, factor, value in FACTOR_RULES if factor_masks[name][i]]
+        
+        if not factors:
+            factors.append({
+                'factor': 'Sin factores de riesgo detectados',
+                'value': '✓',
+                'impact': 'bajo'
+            })
+        
+        probabilities = {
+            'high_performer': float(prob_high[i]),
+            'at_risk': float(prob_at_risk[i]),
+            'resignation_risk': float(attrition_prob[i])
+        }
+        
+        recommendations = [{
+            'tipo': tipo,
+            'titulo': titulo,
+            'descripcion': descripcion.format(**values),
+            'prioridad': prioridad,
+            'icono': icono
+        } for name, templates in RECOMMENDATION_RULES if rule_masks[name][i]
+            for tipo, titulo, descripcion, prioridad, icono in templates]
+        
+        results.append({
+            'user_id': member.id,
+            'user_name': member.full_name,
+            'area': member.area,
+            'metricas': metrics,
+            'prediccion': {
+                'clase': str(class_names[i]),
+                'probabilidad_renuncia': round(float(attrition_prob[i]) * 100, 1),
+                'probabilidades': {
+                    k: round(v * 100, 1) for k, v in probabilities.items()
+                },
+                'factores': factors[:5]  # Top 5
+            },
+            'recomendaciones': recommendations
+        })
+    
+    return results
+
+
+def iter_team_analysis(members, task_stats, chunk_size=200):
+    """
+    Generador de análisis por bloques (cada bloque se evalúa vectorizado y se entrega al terminar)
+    """
+    now = datetime.utcnow()
+    for start in range(0, len(members), chunk_size):
+        yield from analyze_members(members[start:start + chunk_size], task_stats, now=now)
@@ -12,28 +12,34 @@ from app.models.person import Person
 from app.models.task import Task, Assignee
 
 
-_model = None
+from app.ml.model_registry import model_registry
 
 
 def load_model():
     """
-    Cargar modelo de predicción de desempeño
+    Obtener el modelo de predicción de desempeño desde el registro central
     """
-    global _model
-    
-    if _model is not None:
-        return _model
+    return model_registry.get_model('performance')
+
+
+def load_artifacts(model_file=None):
+    """
+    Cargar modelo de predicción de desempeño
     
+    Args:
+        model_file: ruta de una versión específica (None → artefacto por defecto)
+    """
     try:
         # Cargar desde la misma carpeta app/ml/
         ml_path = os.path.dirname(os.path.abspath(__file__))
-        model_file = os.path.join(ml_path, 'performance_model.pkl')
+        model_file = model_file or os.path.join(ml_path, 'performance_model.pkl')
         
+        model = None
         if os.path.exists(model_file):
-            _model = joblib.load(model_file)
+            model = joblib.load(model_file)
             print(f"✓ Modelo de desempeño cargado: {model_file}")
         
-        return _model
+        return {'model': model, 'config': None, 'metrics': None, 'model_file': model_file}
         
     except Exception as e:
         print(f"✗ Error al cargar modelo de desempeño: {str(e)}")
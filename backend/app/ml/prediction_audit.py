@@ -0,0 +1,328 @@
+"""
+Auditoría de Predicciones
+Registro asíncrono de cada predicción servida en la tabla ml_predictions
+
+Los endpoints solo encolan el registro (sin tocar la BD) en una cola acotada
+en memoria. Un hilo escritor lo inserta en lotes con un INSERT de varias filas
+cada ML_AUDIT_BATCH_SIZE registros o cada ML_AUDIT_FLUSH_INTERVAL_MS
+milisegundos, lo que ocurra primero.
+
+Si la cola se llena se aplica ML_AUDIT_OVERFLOW_POLICY:
+- 'drop_oldest': descarta el registro más antiguo en cola (por defecto)
+- 'drop_newest': descarta el registro nuevo
+- 'block': espera hasta ML_AUDIT_BLOCK_TIMEOUT_MS y luego descarta el nuevo
+Los descartes se cuentan en stats().
+
+Al apagar el proceso (atexit o worker_exit de gunicorn) se drena la cola.
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+
+import numpy as np
+from flask import has_app_context
+
+from app.ml.model_registry import model_registry
+
+
+# Tipos válidos de ml_predictions.model_type → nombre en el registro de modelos
+AUDITED_MODEL_TYPES = {
+    'risk': 'risk',
+    'duration': 'duration',
+    'recommendation': 'recommendation',
+    'performance': 'performance'
+}
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+# Referencia para predicciones sin tarea asociada (task_reference es obligatorio)
+NO_REFERENCE = 'sin_referencia'
+
+
+class PredictionAuditWriter:
+    """
+    Cola acotada + hilo que persiste las predicciones por lotes
+    """
+    
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = True
+        self.batch_size = 200
+        self.flush_interval = 0.5
+        self.overflow_policy = 'drop_oldest'
+        self.block_timeout = 0.01
+        self._queue = queue.Queue(maxsize=10000)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'flushes': 0, 'max_batch_rows': 0}
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Tomar la configuración de la app y registrar el drenado al salir
+        
+        El hilo escritor se inicia con el primer registro, dentro del proceso que
+        atiende peticiones (con gunicorn --preload no se hereda un hilo muerto del master).
+        """
+        self.app = app
+        self.enabled = app.config.get('ML_AUDIT_ENABLED', True)
+        self.batch_size = app.config.get('ML_AUDIT_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('ML_AUDIT_FLUSH_INTERVAL_MS', 500) / 1000.0
+        self.block_timeout = app.config.get('ML_AUDIT_BLOCK_TIMEOUT_MS', 10) / 1000.0
+        
+        policy = app.config.get('ML_AUDIT_OVERFLOW_POLICY', self.overflow_policy)
+        if policy not in OVERFLOW_POLICIES:
+            print(f"⚠️ ML_AUDIT_OVERFLOW_POLICY inválida ('{policy}'), se usa 'drop_oldest'")
+            policy = 'drop_oldest'
+        self.overflow_policy = policy
+        
+        self._queue = queue.Queue(maxsize=app.config.get('ML_AUDIT_QUEUE_SIZE', 10000))
+        
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+    
+    def record(self, model_type, prediction_value, task_reference=None, input_features=None,
+               confidence=None, task_source='web'):
+        """
+        Encolar una predicción para auditoría (no bloquea salvo con la política 'block')
+        
+        Args:
+            model_type: 'risk', 'duration', 'recommendation' o 'performance'
+            prediction_value: resultado devuelto por el modelo (dict serializable)
+            task_reference: id de la tarea (web_tasks.id o task_id histórico)
+            input_features: datos de entrada usados para la predicción
+            confidence: confianza/probabilidad (0-1)
+            task_source: 'web' o 'historical'
+        
+        Returns:
+            bool: True si quedó en cola
+        """
+        if not self.enabled or model_type not in AUDITED_MODEL_TYPES:
+            return False
+        
+        self._ensure_thread()
+        
+        active_version, version_label = self._model_version(model_type)
+        item = {
+            'task_reference': str(task_reference) if task_reference not in (None, '') else NO_REFERENCE,
+            'task_source': task_source,
+            'model_id': active_version.get('id'),
+            'model_type': model_type,
+            # Copias al encolar: el llamador puede modificar sus dicts después de record()
+            'prediction_value': _json_safe(prediction_value),
+            'confidence': round(float(confidence), 2) if confidence is not None else None,
+            'input_features': _json_safe(input_features),
+            'model_version': version_label,
+            'created_at': datetime.utcnow()
+        }
+        
+        return self._enqueue(item)
+    
+    def flush(self):
+        """
+        Escribir ahora todo lo que haya en cola (hilo actual)
+        
+        Returns:
+            int: registros escritos
+        """
+        written = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+    
+    def shutdown(self, timeout=5.0):
+        """
+        Detener el escritor drenando la cola antes de salir
+        """
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        
+        # Lo que quede (escritor no iniciado o que no terminó a tiempo) se escribe aquí
+        if self.app is not None and not self._queue.empty():
+            self.flush()
+    
+    def stats(self):
+        """
+        Contadores de la auditoría y profundidad de la cola
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_size'] = self._queue.maxsize
+        stats['overflow_policy'] = self.overflow_policy
+        stats['enabled'] = self.enabled
+        return stats
+    
+    def _enqueue(self, item):
+        try:
+            if self.overflow_policy == 'block':
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        
+        except queue.Full:
+            if self.overflow_policy != 'drop_oldest':
+                self._count('dropped')
+                return False
+            
+            # Hacer espacio descartando el registro más antiguo
+            try:
+                self._queue.get_nowait()
+                self._count('dropped')
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._count('dropped')
+                return False
+        
+        self._count('enqueued')
+        return True
+    
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        
+        with self._start_lock:
+            if self._thread is not None and self._pid == pid:
+                return
+            
+            self._pid = pid
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='ml-prediction-audit', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+            elif self._stop_event.is_set():
+                return
+    
+    def _collect(self):
+        """
+        Esperar el primer registro y juntar hasta batch_size o hasta cumplir flush_interval
+        """
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        # Al apagar se toma todo lo pendiente sin esperar la ventana
+        if self._stop_event.is_set():
+            batch.extend(self._drain(self.batch_size - len(batch)))
+        
+        return batch
+    
+    def _drain(self, limit):
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+    
+    def _write(self, batch):
+        """
+        INSERT de varias filas en una transacción propia (no usa la sesión de las peticiones)
+        """
+        from app.extensions import db
+        from app.models.ml_models import MLPrediction
+        
+        rows = batch
+        
+        try:
+            if has_app_context():
+                self._insert(db, MLPrediction, rows)
+            else:
+                with self.app.app_context():
+                    self._insert(db, MLPrediction, rows)
+        
+        except Exception as e:
+            print(f"⚠️ Error guardando {len(rows)} predicciones en ml_predictions: {e}")
+            self._count('failed', len(rows))
+            return 0
+        
+        with self._stats_lock:
+            self._stats['written'] += len(rows)
+            self._stats['flushes'] += 1
+            self._stats['max_batch_rows'] = max(self._stats['max_batch_rows'], len(rows))
+        
+        return len(rows)
+    
+    @staticmethod
+    def _insert(db, model, rows):
+        with db.engine.begin() as connection:
+            connection.execute(model.__table__.insert(), rows)
+    
+    @staticmethod
+    def _model_version(model_type):
+        """
+        (fila activa en ml_models, etiqueta de versión) del modelo vigente en el registro
+        """
+        entry = model_registry.get(AUDITED_MODEL_TYPES[model_type])
+        
+        active_version = entry['version'] or {}
+        label = active_version.get('version')
+        if label is None and entry['model_file']:
+            label = os.path.basename(entry['model_file'])[:50]
+        
+        return active_version, label
+    
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_safe(value):
+    """
+    Copia serializable a JSON (tipos numpy, fechas) hecha al encolar, independiente del original
+    """
+    if value is None:
+        return None
+    return json.loads(json.dumps(value, default=_json_default))
+
+
+# Instancia global
+prediction_audit = PredictionAuditWriter()
@@ -0,0 +1,197 @@
+"""
+Caché de Predicciones
+Caché LRU/TTL de la salida del modelo por fila de features
+
+La clave de cada fila es la fila normalizada (numéricos redondeados, mismo
+orden de columnas; para un DataFrame, su hash) junto con el modelo, el método y el token de la
+versión cargada en el registro. Al activar o recargar un modelo cambia su
+token y además se vacían sus entradas, por lo que nunca se sirve una
+predicción de una versión anterior.
+
+Solo se llama al modelo para las filas que no están en caché.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from flask import current_app, has_app_context
+
+from app.ml.model_registry import model_registry
+from app.ml.inference_batcher import run_model
+from app.ml.feature_schema import FeatureRows
+
+
+# Decimales con los que se normalizan las features numéricas antes del hash
+NUMERIC_PRECISION = 6
+
+
+class PredictionCache:
+    """
+    Diccionario LRU acotado con expiración por entrada y estadísticas por modelo
+    """
+    
+    def __init__(self, app=None, max_entries=10000, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Tomar tamaño y TTL de la configuración de la app
+        """
+        with self._lock:
+            self.max_entries = app.config.get('ML_PREDICTION_CACHE_SIZE', self.max_entries)
+            self.ttl_seconds = app.config.get('ML_PREDICTION_CACHE_TTL', self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def get_many(self, name, keys):
+        """
+        Buscar varias claves de un modelo
+        
+        Returns:
+            dict {posición: valor} solo con las claves encontradas y vigentes
+        """
+        found = {}
+        now = time.monotonic()
+        
+        with self._lock:
+            stats = self._model_stats(name)
+            
+            for position, key in enumerate(keys):
+                item = self._entries.get(key)
+                if item is None:
+                    continue
+                
+                expires_at, value = item
+                if expires_at < now:
+                    del self._entries[key]
+                    stats['expired'] += 1
+                    continue
+                
+                self._entries.move_to_end(key)
+                found[position] = value
+            
+            stats['hits'] += len(found)
+            stats['misses'] += len(keys) - len(found)
+        
+        return found
+    
+    def put_many(self, name, items):
+        """
+        Guardar varias (clave, valor) de un modelo
+        """
+        expires_at = time.monotonic() + self.ttl_seconds
+        
+        with self._lock:
+            stats = self._model_stats(name)
+            
+            for key, value in items:
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                stats['evictions'] += 1
+    
+    def invalidate(self, name=None):
+        """
+        Eliminar las entradas de un modelo (o todas si name es None)
+        """
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == name]:
+                    del self._entries[key]
+            
+            for model_name, stats in self._stats.items():
+                if name is None or model_name == name:
+                    stats['invalidations'] += 1
+    
+    def stats(self):
+        """
+        Estadísticas por modelo con tasa de aciertos
+        """
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                lookups = stats['hits'] + stats['misses']
+                result[name] = dict(stats, hit_rate=round(stats['hits'] / lookups, 4) if lookups else 0)
+            
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'models': result
+            }
+    
+    def _model_stats(self, name):
+        if name not in self._stats:
+            self._stats[name] = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+        return self._stats[name]
+
+
+def feature_row_hashes(features):
+    """
+    Hash (uint64) de cada fila normalizada de un DataFrame de features
+    """
+    normalized = features.copy()
+    numeric_columns = normalized.select_dtypes(include='number').columns
+    
+    if len(numeric_columns):
+        normalized[numeric_columns] = normalized[numeric_columns].astype(float).round(NUMERIC_PRECISION)
+    
+    return pd.util.hash_pandas_object(normalized, index=False).values
+
+
+def cached_predict(name, model, features, method='predict_proba'):
+    """
+    Salida de getattr(model, method)(features) usando la caché por fila
+    
+    Solo se cachea si model es el modelo vigente del registro para name; con
+    ML_PREDICTION_CACHE_ENABLED desactivado se llama al modelo directamente.
+    
+    Args:
+        name: nombre del modelo en el registro ('risk', 'duration', 'attrition', 'bottleneck')
+        model: objeto del modelo obtenido del registro
+        features: FeatureRows o pandas.DataFrame con una o más filas
+        method: 'predict_proba' o 'predict'
+    
+    Returns:
+        numpy.ndarray con el mismo formato que la llamada directa
+    """
+    enabled = has_app_context() and current_app.config.get('ML_PREDICTION_CACHE_ENABLED', True)
+    entry = model_registry.get(name) if enabled else None
+    
+    if entry is None or entry['model'] is not model or len(features) == 0:
+        return run_model(name, model, features, method=method)
+    
+    # La versión y el orden de columnas forman parte de la clave
+    if isinstance(features, FeatureRows):
+        prefix = (name, entry['token'], method, features.columns_key)
+        keys = [prefix + (row_key,) for row_key in features.row_keys(NUMERIC_PRECISION)]
+    else:
+        prefix = (name, entry['token'], method, hash(tuple(features.columns)))
+        keys = [prefix + (int(row_hash),) for row_hash in feature_row_hashes(features)]
+    
+    found = prediction_cache.get_many(name, keys)
+    missing = [position for position in range(len(keys)) if position not in found]
+    
+    if missing:
+        missing_features = features.take(missing) if isinstance(features, FeatureRows) else features.iloc[missing]
+        missing_output = np.asarray(run_model(name, model, missing_features, method=method))
+        prediction_cache.put_many(name, [(keys[position], missing_output[i]) for i, position in enumerate(missing)])
+        found.update({position: missing_output[i] for i, position in enumerate(missing)})
+    
+    return np.array([found[position] for position in range(len(keys))])
+
+
+# Instancia global
+prediction_cache = PredictionCache()
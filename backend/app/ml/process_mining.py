@@ -4,37 +4,44 @@ Analiza flujos de trabajo, cuellos de botella y patrones en las tareas
 """
 import os
 import joblib
+from itertools import groupby
 from datetime import datetime, timedelta
 from flask import current_app
-from sqlalchemy import and_, func
+from sqlalchemy import and_, or_, func
 
 from app.extensions import db
 from app.models.task import Task
 from app.models.task import TaskDependency as TrainingTaskDependency
 
 
-_analyzer = None
+from app.ml.model_registry import model_registry
 
 
 def load_model():
     """
-    Cargar modelo/analizador de procesos
+    Obtener el analizador de procesos desde el registro central
     """
-    global _analyzer
-    
-    if _analyzer is not None:
-        return _analyzer
+    return model_registry.get_model('process_mining')
+
+
+def load_artifacts(model_file=None):
+    """
+    Cargar modelo/analizador de procesos
     
+    Args:
+        model_file: ruta de una versión específica (None → artefacto por defecto)
+    """
     try:
         # Cargar desde la misma carpeta app/ml/
         ml_path = os.path.dirname(os.path.abspath(__file__))
-        model_file = os.path.join(ml_path, 'process_mining.pkl')
+        model_file = model_file or os.path.join(ml_path, 'process_mining.pkl')
         
+        analyzer = None
         if os.path.exists(model_file):
-            _analyzer = joblib.load(model_file)
+            analyzer = joblib.load(model_file)
             print(f"✓ Analizador de procesos cargado: {model_file}")
         
-        return _analyzer
+        return {'model': analyzer, 'config': None, 'metrics': None, 'model_file': model_file}
         
     except Exception as e:
         print(f"✗ Error al cargar analizador de procesos: {str(e)}")
@@ -87,25 +94,26 @@ def analyze_process_heuristic(filters):
     Análisis heurístico de procesos
     """
     try:
-        # Obtener tareas según filtros
-        tasks = get_filtered_tasks(filters)
+        # Consulta de tareas según filtros; cada análisis es una consulta agregada sobre ella
+        query = build_task_query(filters)
         
         analysis_type = filters.get('analysis_type', 'general')
         
         # Análisis de flujo
-        flow = analyze_task_flow(tasks)
+        flow = analyze_task_flow(query)
+        total = sum(item['count'] for item in flow)
         
         # Cuellos de botella
-        bottlenecks = identify_bottlenecks(tasks)
+        bottlenecks = identify_bottlenecks(query)
         
         # Duración promedio
-        avg_duration = calculate_average_duration(tasks)
+        avg_duration = calculate_average_duration(query)
         
         # Secuencias comunes
-        sequences = find_common_sequences(tasks)
+        sequences = find_common_sequences(query)
         
         # Insights
-        insights = generate_insights(tasks, flow, bottlenecks, avg_duration)
+        insights = generate_insights(total, flow, bottlenecks, avg_duration)
         
         return {
             'flow': flow,
@@ -113,7 +121,7 @@ def analyze_process_heuristic(filters):
             'avg_duration': avg_duration,
             'task_sequences': sequences,
             'insights': insights,
-            'total_tasks_analyzed': len(tasks),
+            'total_tasks_analyzed': total,
             'analysis_type': analysis_type
         }
         
@@ -132,6 +140,13 @@ def get_filtered_tasks(filters):
     """
     Obtener tareas según filtros
     """
+    return build_task_query(filters).all()
+
+
+def build_task_query(filters):
+    """
+    Consulta de tareas según filtros (sin ejecutar)
+    """
     query = Task.query
     
     # Filtro por área
@@ -157,43 +172,33 @@ def get_filtered_tasks(filters):
         except:
             pass
     
-    return query.all()
+    return query
 
 
-def analyze_task_flow(tasks):
+def analyze_task_flow(query):
     """
-    Analizar el flujo de tareas por estado
+    Analizar el flujo de tareas por estado (GROUP BY estado)
+    
+    Args:
+        query: consulta de tareas filtradas (build_task_query)
     """
-    flow = {}
+    status = func.coalesce(func.nullif(Task.status, ''), 'Unknown')
     
-    for task in tasks:
-        status = task.status or 'Unknown'
-        
-        if status not in flow:
-            flow[status] = {
-                'count': 0,
-                'avg_duration': 0,
-                'tasks': []
-            }
-        
-        flow[status]['count'] += 1
-        flow[status]['tasks'].append(task.task_id)
-        
-        # Calcular duración si tiene fechas
-        if task.start_date_real and task.end_date_real:
-            duration = (task.end_date_real - task.start_date_real).days
-            current_avg = flow[status]['avg_duration']
-            new_avg = (current_avg * (flow[status]['count'] - 1) + duration) / flow[status]['count']
-            flow[status]['avg_duration'] = round(new_avg, 1)
+    # AVG ignora las tareas sin alguna de las dos fechas (DATEDIFF es NULL)
+    rows = query.order_by(None).with_entities(
+        status, func.count(Task.task_id), func.avg(task_duration_days())
+    ).group_by(status).all()
+    
+    total = sum(count for _, count, _ in rows)
     
     # Convertir a lista
     flow_list = []
-    for status, data in flow.items():
+    for status_name, count, avg_duration in rows:
         flow_list.append({
-            'status': status,
-            'count': data['count'],
-            'avg_duration_days': data['avg_duration'],
-            'percentage': round((data['count'] / len(tasks)) * 100, 1) if tasks else 0
+            'status': status_name,
+            'count': count,
+            'avg_duration_days': round(float(avg_duration), 1) if avg_duration is not None else 0,
+            'percentage': round((count / total) * 100, 1) if total else 0
         })
     
     # Ordenar por cantidad
@@ -202,89 +207,113 @@ def analyze_task_flow(tasks):
     return flow_list
 
 
-def identify_bottlenecks(tasks):
+def task_duration_days():
+    """
+    Duración real en días (end_date_real - start_date_real) como expresión SQL
+    """
+    return func.datediff(Task.end_date_real, Task.start_date_real)
+
+
+def identify_bottlenecks(query):
     """
     Identificar cuellos de botella
+    
+    Cada criterio es una consulta agregada sobre las tareas filtradas, así que
+    el número de consultas no depende de cuántas tareas coincidan.
+    
+    Args:
+        query: consulta de tareas filtradas (build_task_query)
     """
     bottlenecks = []
     
-    # 1. Tareas con duración real > estimada
-    delayed_tasks = []
-    for task in tasks:
-        if task.duration_real and task.duration_est:
-            if task.duration_real > task.duration_est * 1.5:  # 50% más de lo estimado
-                delay_percentage = ((task.duration_real - task.duration_est) / task.duration_est) * 100
-                delayed_tasks.append({
-                    'task_id': task.task_id,
-                    'task_name': task.task_name,
-                    'delay_percentage': round(delay_percentage, 1),
-                    'estimated_days': task.duration_est,
-                    'actual_days': task.duration_real
-                })
-    
-    if delayed_tasks:
+    # 1. Tareas con duración real > estimada (50% más de lo estimado)
+    delayed = query.filter(
+        Task.duration_real != 0,
+        Task.duration_est != 0,
+        Task.duration_real > Task.duration_est * 1.5
+    )
+    delayed_count = delayed.order_by(None).with_entities(func.count(Task.task_id)).scalar() or 0
+    
+    if delayed_count:
+        delayed_tasks = []
+        for task in delayed.limit(3):
+            duration_est = float(task.duration_est)
+            duration_real = float(task.duration_real)
+            delay_percentage = ((duration_real - duration_est) / duration_est) * 100
+            delayed_tasks.append({
+                'task_id': task.task_id,
+                'task_name': task.task_name,
+                'delay_percentage': round(delay_percentage, 1),
+                'estimated_days': duration_est,
+                'actual_days': duration_real
+            })
+        
         bottlenecks.append({
             'type': 'delays',
-            'severity': 'high' if len(delayed_tasks) > 5 else 'medium',
-            'count': len(delayed_tasks),
-            'description': f'{len(delayed_tasks)} tareas con retrasos significativos',
-            'examples': delayed_tasks[:3]
+            'severity': 'high' if delayed_count > 5 else 'medium',
+            'count': delayed_count,
+            'description': f'{delayed_count} tareas con retrasos significativos',
+            'examples': delayed_tasks
         })
     
-    # 2. Áreas con muchas tareas pendientes
-    pending_by_area = {}
-    for task in tasks:
-        if task.status in ['Pending', 'In - Progress']:
-            area = task.area or 'Unknown'
-            pending_by_area[area] = pending_by_area.get(area, 0) + 1
-    
-    for area, count in pending_by_area.items():
-        if count > 10:
-            bottlenecks.append({
-                'type': 'area_overload',
-                'severity': 'high' if count > 20 else 'medium',
-                'count': count,
-                'area': area,
-                'description': f'Área {area} con {count} tareas pendientes/en progreso'
-            })
+    # 2. Áreas con muchas tareas pendientes (GROUP BY área)
+    area = func.coalesce(func.nullif(Task.area, ''), 'Unknown')
+    pending_by_area = query.filter(
+        Task.status.in_(['Pending', 'In - Progress'])
+    ).order_by(None).with_entities(
+        area, func.count(Task.task_id)
+    ).group_by(area).having(func.count(Task.task_id) > 10)
     
-    # 3. Tareas con muchas dependencias sin completar
-    for task in tasks:
-        if task.status != 'Completed':
-            dependencies = TrainingTaskDependency.query.filter_by(
-                task_id=task.task_id
-            ).count()
-            
-            if dependencies > 3:
-                bottlenecks.append({
-                    'type': 'blocked_by_dependencies',
-                    'severity': 'medium',
-                    'task_id': task.task_id,
-                    'task_name': task.task_name,
-                    'dependencies_count': dependencies,
-                    'description': f'Tarea bloqueada por {dependencies} dependencias'
-                })
+    for area_name, count in pending_by_area:
+        bottlenecks.append({
+            'type': 'area_overload',
+            'severity': 'high' if count > 20 else 'medium',
+            'count': count,
+            'area': area_name,
+            'description': f'Área {area_name} con {count} tareas pendientes/en progreso'
+        })
+    
+    # 3. Tareas con muchas dependencias sin completar (un solo GROUP BY sobre task_dependencies)
+    dependency_count = func.count(TrainingTaskDependency.id)
+    blocked = query.filter(
+        or_(Task.status.is_(None), Task.status != 'Completed')
+    ).join(
+        TrainingTaskDependency, TrainingTaskDependency.task_id == Task.task_id
+    ).order_by(None).with_entities(
+        Task.task_id, Task.task_name, dependency_count
+    ).group_by(Task.task_id, Task.task_name).having(dependency_count > 3).order_by(Task.task_id)
+    
+    for task_id, task_name, dependencies in blocked:
+        bottlenecks.append({
+            'type': 'blocked_by_dependencies',
+            'severity': 'medium',
+            'task_id': task_id,
+            'task_name': task_name,
+            'dependencies_count': dependencies,
+            'description': f'Tarea bloqueada por {dependencies} dependencias'
+        })
     
     return bottlenecks
 
 
-def calculate_average_duration(tasks):
-    """
-    Calcular duración promedio de tareas completadas
+def calculate_average_duration(query):
     """
-    durations = []
+    Calcular duración promedio de tareas completadas (AVG/MIN/MAX en SQL)
     
-    for task in tasks:
-        if task.start_date_real and task.end_date_real:
-            duration = (task.end_date_real - task.start_date_real).days
-            durations.append(duration)
+    Args:
+        query: consulta de tareas filtradas (build_task_query)
+    """
+    duration = task_duration_days()
+    mean, minimum, maximum, count = query.order_by(None).with_entities(
+        func.avg(duration), func.min(duration), func.max(duration), func.count(duration)
+    ).one()
     
-    if durations:
+    if count:
         return {
-            'mean': round(sum(durations) / len(durations), 1),
-            'min': min(durations),
-            'max': max(durations),
-            'tasks_with_duration': len(durations)
+            'mean': round(float(mean), 1),
+            'min': int(minimum),
+            'max': int(maximum),
+            'tasks_with_duration': count
         }
     
     return {
@@ -295,36 +324,41 @@ def calculate_average_duration(tasks):
     }
 
 
-def find_common_sequences(tasks):
+def find_common_sequences(query):
     """
     Encontrar secuencias comunes de tareas (por tipo)
+    
+    Solo se leen las primeras 5 tareas con fecha de inicio de cada proyecto
+    (ROW_NUMBER por proyecto), no todas las tareas filtradas.
+    
+    Args:
+        query: consulta de tareas filtradas (build_task_query)
     """
     sequences = {}
     
-    # Agrupar por proyecto
-    by_project = {}
-    for task in tasks:
-        project = task.project_id or 'No Project'
-        if project not in by_project:
-            by_project[project] = []
-        by_project[project].append(task)
-    
-    # Analizar secuencias en cada proyecto
-    for project, project_tasks in by_project.items():
-        if len(project_tasks) < 2:
-            continue
-        
-        # Ordenar por fecha de inicio
-        sorted_tasks = sorted(
-            [t for t in project_tasks if t.start_date_real],
-            key=lambda x: x.start_date_real
-        )
-        
-        # Extraer secuencia de tipos
-        sequence = ' -> '.join([t.task_type or 'Unknown' for t in sorted_tasks[:5]])
-        
-        if sequence:
-            sequences[sequence] = sequences.get(sequence, 0) + 1
+    # Numerar las tareas de cada proyecto por fecha de inicio (sin fecha al final)
+    project = func.coalesce(func.nullif(Task.project_id, ''), 'No Project')
+    ranked = query.order_by(None).with_entities(
+        project.label('project'),
+        Task.task_type,
+        Task.start_date_real,
+        func.row_number().over(
+            partition_by=project,
+            order_by=(Task.start_date_real.is_(None), Task.start_date_real, Task.task_id)
+        ).label('position'),
+        func.count(Task.task_id).over(partition_by=project).label('project_tasks')
+    ).subquery()
+    
+    rows = db.session.query(ranked.c.project, ranked.c.task_type).filter(
+        ranked.c.position <= 5,
+        ranked.c.start_date_real.isnot(None),
+        ranked.c.project_tasks >= 2
+    ).order_by(ranked.c.project, ranked.c.position)
+    
+    # Extraer secuencia de tipos de cada proyecto
+    for _, project_rows in groupby(rows, key=lambda row: row[0]):
+        sequence = ' -> '.join([task_type or 'Unknown' for _, task_type in project_rows])
+        sequences[sequence] = sequences.get(sequence, 0) + 1
     
     # Convertir a lista ordenada
     sequence_list = [
@@ -336,14 +370,16 @@ def find_common_sequences(tasks):
     return sequence_list[:10]  # Top 10
 
 
-def generate_insights(tasks, flow, bottlenecks, avg_duration):
+def generate_insights(total, flow, bottlenecks, avg_duration):
     """
     Generar insights del análisis
+    
+    Args:
+        total: número de tareas analizadas
     """
     insights = []
     
     # Total de tareas
-    total = len(tasks)
     if total == 0:
         return ['No hay suficientes datos para generar insights']
     
@@ -374,7 +410,7 @@ def generate_insights(tasks, flow, bottlenecks, avg_duration):
         insights.append('✓ No se detectaron cuellos de botella significativos')
     
     # Tareas completadas
-    completed = sum(1 for t in tasks if t.status == 'Completed')
+    completed = sum(item['count'] for item in flow if item['status'] == 'Completed')
     if completed > 0:
         completion_rate = (completed / total) * 100
         insights.append(f'Tasa de completitud: {round(completion_rate, 1)}%')
@@ -7,63 +7,88 @@ import json
 import numpy as np
 import pandas as pd
 from catboost import CatBoost
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 
 from app.extensions import db
 from app.models.web_user import WebUser
 from app.models.web_task import WebTask
 
 
-# Variables globales para modelo y configuración
-_model = None
-_config = None
-_metrics = None
+from app.ml.model_registry import model_registry, get_models_path
+from app.ml.inference_batcher import run_model, InferenceQueueFull
+from app.ml.feature_schema import FeatureSchema, model_input
+from app.ml.native_models import load_catboost_model
 
 
 def load_model():
     """
-    Cargar el modelo CatBoost de recomendación (.pkl) y sus configuraciones
+    Obtener el modelo de recomendación desde el registro central de modelos
     """
-    global _model, _config, _metrics
+    return model_registry.get_model('recommendation')
+
+
+def get_config():
+    """
+    Configuración de columnas del modelo vigente (columns_recommender.json)
+    """
+    return model_registry.get_config('recommendation')
+
+
+def get_schema():
+    """
+    Esquema de features compilado del modelo vigente (orden de columnas + categóricas)
+    """
+    return model_registry.get_schema('recommendation')
+
+
+def load_artifacts(model_file=None):
+    """
+    Cargar el modelo CatBoost de recomendación (.cbm, o .pkl de versiones anteriores) y sus configuraciones
     
-    if _model is not None:
-        return _model
+    Args:
+        model_file: ruta de una versión específica (None → artefacto por defecto)
     
+    Returns:
+        dict {model, config, schema, metrics, model_file} (None si no existe el modelo)
+    """
     try:
         # Ruta al modelo
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        model_path = os.path.join(base_path, 'ml', 'models', 'recommender')
+        model_path = os.path.join(get_models_path(), 'recommender')
         
-        model_file = os.path.join(model_path, 'model_catboost_recommender.pkl')
+        model_file = model_file or os.path.join(model_path, 'model_catboost_recommender.cbm')
         config_file = os.path.join(model_path, 'columns_recommender.json')
         metrics_file = os.path.join(model_path, 'recommender_metrics.json')
         
-        # Cargar modelo CatBoost
-        if os.path.exists(model_file):
-            import joblib
-            _model = joblib.load(model_file)
-            print(f"✓ Modelo CatBoost Recommender cargado: {model_file}")
-        else:
-            print(f"⚠ Modelo no encontrado: {model_file}")
+        config = None
+        metrics = None
+        
+        # Cargar modelo CatBoost (.cbm nativo si existe; pickle de versiones anteriores)
+        model, model_file = load_catboost_model(model_file)
+        if model is None:
+            print(f"⚠ Modelo no encontrado: {os.path.join(model_path, 'model_catboost_recommender.cbm')}")
             return None
+        print(f"✓ Modelo CatBoost Recommender cargado: {model_file}")
         
         # Cargar configuración de columnas
         if os.path.exists(config_file):
             with open(config_file, 'r', encoding='utf-8') as f:
-                _config = json.load(f)
+                config = json.load(f)
             print(f"✓ Configuración cargada: {config_file}")
-            print(f"   Features: {len(_config.get('all_columns', []))}")
+            print(f"   Features: {len(config.get('all_columns', []))}")
         
         # Cargar métricas
         if os.path.exists(metrics_file):
             with open(metrics_file, 'r', encoding='utf-8') as f:
-                _metrics = json.load(f)
+                metrics = json.load(f)
             print(f"✓ Métricas cargadas")
-            print(f"   ROC-AUC: {_metrics.get('classification_metrics', {}).get('roc_auc', 0):.4f}")
-            print(f"   Accuracy: {_metrics.get('classification_metrics', {}).get('accuracy', 0):.4f}")
-            print(f"   Accuracy@1: {_metrics.get('ranking_metrics', {}).get('accuracy_at_1', 0)/100:.4f}")
+            print(f"   ROC-AUC: {metrics.get('classification_metrics', {}).get('roc_auc', 0):.4f}")
+            print(f"   Accuracy: {metrics.get('classification_metrics', {}).get('accuracy', 0):.4f}")
+            print(f"   Accuracy@1: {metrics.get('ranking_metrics', {}).get('accuracy_at_1', 0)/100:.4f}")
         
-        return _model
+        # Orden de columnas e índices categóricos resueltos una sola vez
+        schema = FeatureSchema.from_config(config, 'all_features', model=model)
+        
+        return {'model': model, 'config': config, 'schema': schema, 'metrics': metrics, 'model_file': model_file}
         
     except Exception as e:
         print(f"✗ Error al cargar modelo: {str(e)}")
@@ -72,6 +97,14 @@ def load_model():
         return None
 
 
+def warm_up(artifacts):
+    """
+    Inferencia de calentamiento con un candidato genérico (sin tocar la BD)
+    """
+    features = build_features([build_feature_dict(WebUser(), {})], artifacts.get('schema'))
+    artifacts['model'].predict_proba(model_input(features))
+
+
 def recommend_person(task_data):
     """
     Recomendar las mejores personas para una tarea usando el modelo CatBoost
@@ -113,21 +146,26 @@ def recommend_person(task_data):
         
         print(f"\n Evaluando {len(candidates)} candidatos...")
         
-        # Calcular scores usando el modelo ML
+        # Una sola matriz de features y una sola llamada al modelo para todos los candidatos
+        features = prepare_features_batch(candidates, task_data)
+        prediction_proba = run_model('recommendation', model, features)
+        
+        # Tomamos la probabilidad de la clase positiva (buena asignación)
+        scores = prediction_proba[:, 1] if prediction_proba.shape[1] > 1 else prediction_proba[:, 0]
+        
+        # Seleccionar top N con ordenamiento parcial
+        top_n = task_data.get('top_n', 5)
+        top_indices = select_top_n_indices(scores, top_n)
+        top_candidates = [candidates[i] for i in top_indices]
+        
+        # Carga de trabajo de los seleccionados (una sola consulta agrupada)
+        workloads = get_current_workloads([person.id for person in top_candidates])
+        
         scored_candidates = []
         
-        for person in candidates:
-            # Preparar features para el modelo
-            features_df = prepare_features(person, task_data)
-            
-            # Predicción: probabilidad de que sea una buena asignación
-            prediction_proba = model.predict_proba(features_df)[0]
-            
-            # Tomamos la probabilidad de la clase positiva (buena asignación)
-            score = float(prediction_proba[1]) if len(prediction_proba) > 1 else float(prediction_proba[0])
-            
-            # Calcular métricas adicionales
-            workload = get_current_workload(person.id)
+        for person, index in zip(top_candidates, top_indices):
+            score = float(scores[index])
+            workload = workloads.get(person.id, 0)
             
             scored_candidates.append({
                 'person_id': person.id,
@@ -146,21 +184,17 @@ def recommend_person(task_data):
                 'reasons': generate_recommendation_reasons(person, task_data, score)
             })
         
-        # Ordenar por score descendente
-        scored_candidates.sort(key=lambda x: x['score'], reverse=True)
-        
-        # Retornar top N
-        top_n = task_data.get('top_n', 5)
-        
         print(f"✓ Top {min(top_n, len(scored_candidates))} recomendaciones generadas")
         
         return {
-            'recommendations': scored_candidates[:top_n],
+            'recommendations': scored_candidates,
             'total_candidates': len(candidates),
             'criteria_used': ['performance_index', 'experience', 'area_match', 'workload', 'skill_match', 'ml_prediction'],
             'model_used': 'catboost_recommender'
         }
         
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         print(f"✗ Error en recomendación: {str(e)}")
         import traceback
@@ -168,22 +202,12 @@ def recommend_person(task_data):
         return recommend_person_heuristic(task_data)
 
 
-def prepare_features(person, task_data):
+def build_feature_dict(person, task_data):
     """
-    Preparar features que el modelo espera según columns_recommender.json
+    Construir el diccionario de features de un par (persona, tarea) sin DataFrame
     
-    Features del modelo:
-    - task_area, task_type, complexity_level (categóricas de la tarea)
-    - person_area, role (categóricas de la persona)
-    - duration_est_imputed, experience_years_imputed, availability_hours_week_imputed,
-      current_load_imputed, performance_index_imputed, rework_rate_imputed (numéricas)
-    - match_area, match_role_type (binarias)
-    - experience_complexity_ratio, load_capacity_ratio (derivadas)
+    Lo comparten prepare_features (un candidato) y prepare_features_batch (todos)
     """
-    global _config
-    
-    print(f"\n Preparando features para: {person.full_name}")
-    
     # Features de la tarea (categóricas)
     task_area = str(task_data.get('area', 'TI'))
     task_type = str(task_data.get('task_type', 'Desarrollo'))
@@ -217,7 +241,6 @@ def prepare_features(person, task_data):
     
     # skill_match_score: coincidencia de habilidades (0-1)
     skill_match_score = calculate_skill_match(person, task_data)
-    print(f"  - Skill match: {skill_match_score:.2f}")
     
     # Crear diccionario con TODAS las features en el orden correcto según all_features
     feature_dict = {
@@ -238,18 +261,80 @@ def prepare_features(person, task_data):
         'match_role_type': match_role_type
     }
     
-    # Crear DataFrame
-    df = pd.DataFrame([feature_dict])
+    return feature_dict
+
+
+def build_features(feature_dicts, schema=None):
+    """
+    Entrada del modelo para una lista de diccionarios de features
+    
+    Con el esquema compilado arma solo listas en el orden de columnas (sin pandas);
+    sin esquema cae en un DataFrame.
+    """
+    schema = schema or get_schema()
+    if schema is None:
+        return pd.DataFrame(feature_dicts)
+    return schema.rows(feature_dicts)
+
+
+def prepare_features(person, task_data):
+    """
+    Preparar features que el modelo espera según columns_recommender.json
+    
+    Features del modelo:
+    - task_area, task_type, complexity_level (categóricas de la tarea)
+    - person_area, role (categóricas de la persona)
+    - duration_est_imputed, experience_years_imputed, availability_hours_week_imputed,
+      current_load_imputed, performance_index_imputed, rework_rate_imputed (numéricas)
+    - match_area, match_role_type (binarias)
+    - experience_complexity_ratio, load_capacity_ratio (derivadas)
+    
+    Returns:
+        FeatureRows con una fila
+    """
+    return build_features([build_feature_dict(person, task_data)])
+
+
+def prepare_features_batch(candidates, task_data):
+    """
+    Preparar la matriz de features de todos los candidatos para una tarea
+    
+    Args:
+        candidates: list[WebUser]
+        task_data: dict con los datos de la tarea
+    
+    Returns:
+        FeatureRows con una fila por candidato (mismo orden que candidates)
+    """
+    return build_features([build_feature_dict(person, task_data) for person in candidates])
+
+
+def select_top_n_indices(scores, top_n):
+    """
+    Índices de los top N scores en orden descendente usando ordenamiento parcial
+    
+    Ante empates conserva el orden original de los candidatos (igual que un sort estable).
     
-    # Asegurar orden correcto según config
-    if _config and 'all_features' in _config:
-        df = df[_config['all_features']]
+    Args:
+        scores: np.ndarray (N,)
+        top_n: int
     
-    print(f"✓ Features preparados: {df.shape}")
-    print(f"  - Categóricas: {task_area}, {task_type}, {complexity_level}, {person_area}, {role}")
-    print(f"  - Match área: {match_area}, Experience: {experience_years_imputed}, Load: {current_load_imputed}")
+    Returns:
+        list[int] con a lo sumo top_n índices
+    """
+    scores = np.asarray(scores, dtype=float)
+    if top_n <= 0 or len(scores) == 0:
+        return []
+    
+    if top_n < len(scores):
+        # Valor del k-ésimo mayor score en O(N); se incluyen todos los empates con él
+        kth_score = np.partition(scores, len(scores) - top_n)[len(scores) - top_n]
+        selected = np.flatnonzero(scores >= kth_score)
+    else:
+        selected = np.arange(len(scores))
     
-    return df
+    ordered = selected[np.argsort(-scores[selected], kind='stable')]
+    return ordered[:top_n].tolist()
 
 
 def _matches_role_type(role, task_type):
@@ -342,8 +427,6 @@ def get_candidates(task_data):
     
     candidates = query.all()
     print(f"✓ Candidatos encontrados: {len(candidates)}")
-    for c in candidates:
-        print(f"  - {c.full_name} (ID: {c.id}, Área: {c.area}, Role: {c.role_id})")
     
     return candidates
 
@@ -368,6 +451,36 @@ def get_current_workload(user_id):
         return 0
 
 
+def get_current_workloads(user_ids):
+    """
+    Obtener la carga de trabajo actual de varios usuarios con una consulta agrupada
+    
+    Returns:
+        dict {user_id: tareas activas} (los usuarios sin tareas no aparecen)
+    """
+    if not user_ids:
+        return {}
+    
+    try:
+        rows = db.session.query(
+            WebTask.assigned_to,
+            func.count(WebTask.id)
+        ).filter(
+            and_(
+                WebTask.assigned_to.in_(user_ids),
+                WebTask.status.in_(['pending', 'in_progress'])
+            )
+        ).group_by(WebTask.assigned_to).all()
+        
+        # assigned_to es texto; se normaliza a los ids recibidos
+        ids_by_key = {str(user_id): user_id for user_id in user_ids}
+        return {ids_by_key.get(str(assigned_to), assigned_to): count for assigned_to, count in rows}
+        
+    except Exception as e:
+        print(f"Error al calcular workloads: {str(e)}")
+        return {}
+
+
 def generate_recommendation_reasons(person, task_data, score):
     """
     Generar razones de la recomendación basadas en el score del modelo
@@ -434,10 +547,11 @@ def recommend_person_heuristic(task_data):
             }
         
         scored_candidates = []
+        workloads = get_current_workloads([person.id for person in candidates])
         
         for person in candidates:
             score = calculate_heuristic_score(person, task_data)
-            workload = get_current_workload(person.id)
+            workload = workloads.get(person.id, 0)
             
             scored_candidates.append({
                 'person_id': person.id,
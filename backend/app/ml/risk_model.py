@@ -9,56 +9,85 @@ import pandas as pd
 from catboost import CatBoostClassifier
 
 
-# Variables globales para modelo y configuración
-_model = None
-_config = None
-_metrics = None
+from app.ml.model_registry import model_registry, get_models_path
+from app.ml.inference_batcher import InferenceQueueFull
+from app.ml.prediction_cache import cached_predict
+from app.ml.delay_stats import delay_stats_store
+from app.ml.feature_schema import FeatureSchema, model_input
+from app.ml.native_models import load_catboost_model
 
 
 def load_model():
     """
-    Cargar el modelo CatBoost binario (.cbm) y sus configuraciones
+    Obtener el modelo CatBoost binario desde el registro central de modelos
+    """
+    return model_registry.get_model('risk')
+
+
+def get_config():
+    """
+    Configuración de columnas del modelo vigente (columns_binary.json)
+    """
+    return model_registry.get_config('risk')
+
+
+def get_schema():
+    """
+    Esquema de features compilado del modelo vigente (orden de columnas + categóricas)
     """
-    global _model, _config, _metrics
+    return model_registry.get_schema('risk')
+
+
+def load_artifacts(model_file=None):
+    """
+    Cargar el modelo CatBoost binario (.cbm) y sus configuraciones
     
-    if _model is not None:
-        return _model
+    Args:
+        model_file: ruta de una versión específica (None → artefacto por defecto)
     
+    Returns:
+        dict {model, config, schema, metrics, model_file} (model None si no existe)
+    """
     try:
         # Ruta al modelo
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        model_path = os.path.join(base_path, 'ml', 'models', 'risk')
+        model_path = os.path.join(get_models_path(), 'risk')
         
-        model_file = os.path.join(model_path, 'model_binary_task_risk.cbm')
+        model_file = model_file or os.path.join(model_path, 'model_binary_task_risk.cbm')
         config_file = os.path.join(model_path, 'columns_binary.json')
         metrics_file = os.path.join(model_path, 'metrics_binary.json')
         
-        # Cargar modelo CatBoost
-        if os.path.exists(model_file):
-            _model = CatBoostClassifier()
-            _model.load_model(model_file)
-            print(f" Modelo CatBoost binario cargado: {model_file}")
-        else:
+        model = None
+        config = None
+        metrics = None
+        
+        # Cargar modelo CatBoost (.cbm nativo o pickle de versiones entrenadas)
+        model, loaded_file = load_catboost_model(model_file, model_class=CatBoostClassifier)
+        if model is None:
             print(f" Modelo no encontrado: {model_file}")
             return None
+        model_file = loaded_file
+        print(f" Modelo CatBoost binario cargado: {model_file}")
         
         # Cargar configuración de columnas
         if os.path.exists(config_file):
             with open(config_file, 'r', encoding='utf-8') as f:
-                _config = json.load(f)
+                config = json.load(f)
             print(f"✓ Configuración cargada: {config_file}")
-            print(f"   Features: {_config.get('n_features', len(_config.get('all_columns', [])))} (4 cat + {len(_config.get('numeric', []))} num)")
+            print(f"   Features: {config.get('n_features', len(config.get('all_columns', [])))} (4 cat + {len(config.get('numeric', []))} num)")
         
         # Cargar métricas
         if os.path.exists(metrics_file):
             with open(metrics_file, 'r', encoding='utf-8') as f:
-                _metrics = json.load(f)
+                metrics = json.load(f)
             print(f"✓ Métricas cargadas")
-            print(f"   Accuracy: {_metrics.get('accuracy', 0):.4f}")
-            print(f"   ROC-AUC: {_metrics.get('roc_auc', 0):.4f}")
-            print(f"   Recall ALTO_RIESGO: {_metrics.get('classification_report', {}).get('ALTO_RIESGO', {}).get('recall', 0):.4f}")
+            print(f"   Accuracy: {metrics.get('accuracy', 0):.4f}")
+            print(f"   ROC-AUC: {metrics.get('roc_auc', 0):.4f}")
+            print(f"   Recall ALTO_RIESGO: {metrics.get('classification_report', {}).get('ALTO_RIESGO', {}).get('recall', 0):.4f}")
         
-        return _model
+        # Orden de columnas e índices categóricos resueltos una sola vez
+        schema = FeatureSchema.from_config(config, 'all_columns', model=model)
+        
+        return {'model': model, 'config': config, 'schema': schema, 'metrics': metrics, 'model_file': model_file}
         
     except Exception as e:
         print(f"✗ Error al cargar modelo: {str(e)}")
@@ -67,27 +96,26 @@ def load_model():
         return None
 
 
-def prepare_features(task_data):
+def warm_up(artifacts):
     """
-    Preparar todas las features que el modelo espera (25 features totales)
+    Inferencia de calentamiento con una tarea por defecto (evita la latencia de la primera petición)
+    """
+    features = build_features([build_feature_dict({})], artifacts.get('schema'))
+    artifacts['model'].predict_proba(model_input(features))
+
+
+def build_feature_dict(task_data):
+    """
+    Construir el diccionario con las 25 features de una tarea (sin DataFrame)
+    
+    Lo comparten la predicción individual y la predicción por lotes
     
     Args:
-        task_data: dict con los datos del formulario
-            - area: str
-            - task_type: str
-            - complexity_level: str
-            - priority: str
-            - duration_est: int (días)
-            - assignees_count: int
-            - dependencies: int
+        task_data: dict con los datos del formulario (ver prepare_features)
     
     Returns:
-        pandas.DataFrame con 1 fila y 25 columnas en el orden correcto
+        dict con las 25 features (4 categóricas + 21 numéricas)
     """
-    global _config
-    
-    print(f"\n Preparando features desde: {task_data}")
-    
     # Features base del formulario
     area = str(task_data.get('area', 'TI'))
     task_type = str(task_data.get('task_type', 'Desarrollo'))
@@ -118,37 +146,11 @@ def prepare_features(task_data):
     is_high_complexity = 1.0 if complexity_numeric >= 3 else 0.0
     is_critical_priority = 1.0 if priority_numeric >= 4 else 0.0
     
-    # Features de contexto (promedios históricos - valores por defecto)
-    # Estos se calcularían de la BD en producción real
-    area_defaults = {
-        'TI': (15.2, 8.3, 12.1),  # (avg_delay, std_delay, median_delay)
-        'Marketing': (8.5, 5.2, 7.0),
-        'Operaciones': (12.0, 6.8, 10.5),
-        'RRHH': (6.3, 3.9, 5.5),
-        'Ventas': (9.8, 5.5, 8.2)
-    }
-    
-    type_defaults = {
-        'Desarrollo': (18.5, 9.2),  # (avg_delay, std_delay)
-        'Diseño': (10.2, 5.8),
-        'Testing': (7.5, 4.1),
-        'Análisis': (8.9, 5.0),
-        'Documentación': (5.2, 2.8),
-        'Soporte': (6.8, 3.5)
-    }
-    
-    complexity_defaults = {
-        'Baja': (5.5, 3.2),
-        'Media': (10.8, 5.9),
-        'Alta': (20.3, 10.5),
-        'baja': (5.5, 3.2),
-        'media': (10.8, 5.9),
-        'alta': (20.3, 10.5)
-    }
-    
-    area_stats = area_defaults.get(area, (10.0, 6.0, 8.5))
-    type_stats = type_defaults.get(task_type, (10.0, 6.0))
-    complexity_stats = complexity_defaults.get(complexity_level, (10.0, 6.0))
+    # Features de contexto: estadísticas de retraso históricas, mantenidas de forma
+    # incremental al completar tareas (snapshot en memoria, sin consultar la BD)
+    area_stats = delay_stats_store.get_stats('area', area)
+    type_stats = delay_stats_store.get_stats('task_type', task_type)
+    complexity_stats = delay_stats_store.get_stats('complexity', complexity_level)
     
     area_avg_delay = float(area_stats[0])
     area_std_delay = float(area_stats[1])
@@ -190,19 +192,53 @@ def prepare_features(task_data):
         'complexity_std_delay': complexity_std_delay
     }
     
-    # Crear DataFrame con las columnas en el orden correcto
-    df = pd.DataFrame([feature_dict])
+    return feature_dict
+
+
+def build_features(feature_dicts, schema=None):
+    """
+    Entrada del modelo para una lista de diccionarios de features
     
-    # Asegurar orden correcto según config
-    if _config and 'all_columns' in _config:
-        df = df[_config['all_columns']]
+    Con el esquema compilado arma solo listas en el orden de columnas (sin pandas);
+    sin esquema (columnas desconocidas) cae en un DataFrame.
+    """
+    schema = schema or get_schema()
+    if schema is None:
+        return pd.DataFrame(feature_dicts)
+    return schema.rows(feature_dicts)
+
+
+def prepare_features(task_data):
+    """
+    Preparar todas las features que el modelo espera (25 features totales)
     
-    print(f"✓ Features preparados: {df.shape}")
-    print(f"  - Categóricas: {area}, {task_type}, {complexity_level}, {priority}")
-    print(f"  - Numéricas clave: duration={duration_est}, assignees={assignees_count}, deps={dependencies}")
-    print(f"  - Derivadas: workload={workload_per_person:.1f}, complexity_priority={complexity_priority:.1f}")
+    Args:
+        task_data: dict con los datos del formulario
+            - area: str
+            - task_type: str
+            - complexity_level: str
+            - priority: str
+            - duration_est: int (días)
+            - assignees_count: int
+            - dependencies: int
     
-    return df
+    Returns:
+        FeatureRows con 1 fila y 25 columnas en el orden correcto
+    """
+    return build_features([build_feature_dict(task_data)])
+
+
+def prepare_features_batch(tasks_data):
+    """
+    Preparar la matriz de features de varias tareas
+    
+    Args:
+        tasks_data: list[dict] con los datos de cada tarea
+    
+    Returns:
+        FeatureRows con N filas (mismo orden que tasks_data) y 25 columnas
+    """
+    return build_features([build_feature_dict(task_data) for task_data in tasks_data])
 
 
 def predict_risk(task_data):
@@ -225,11 +261,11 @@ def predict_risk(task_data):
     
     try:
         # Preparar features
-        features_df = prepare_features(task_data)
+        features = prepare_features(task_data)
         
-        # Hacer predicción
-        prediction = model.predict(features_df)[0]  # 0 o 1
-        probabilities = model.predict_proba(features_df)[0]  # [prob_bajo, prob_alto]
+        # Hacer predicción (una sola llamada; la clase es la de mayor probabilidad)
+        probabilities = cached_predict('risk', model, features)[0]  # [prob_bajo, prob_alto]
+        prediction = int(np.argmax(probabilities))  # 0 o 1
         
         # Mapear a nombres de clases
         classes = ['BAJO_RIESGO', 'ALTO_RIESGO']
@@ -272,6 +308,8 @@ def predict_risk(task_data):
             'model_used': 'catboost_binary' + (' + business_rules' if business_result.get('adjusted') else '')
         }
         
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         print(f"✗ Error en predicción: {str(e)}")
         import traceback
@@ -279,6 +317,133 @@ def predict_risk(task_data):
         return predict_risk_heuristic(task_data)
 
 
+def predict_risk_batch(tasks_data):
+    """
+    Predecir el riesgo de varias tareas con una sola llamada al modelo
+    
+    Construye una única matriz de features, llama a predict_proba una vez
+    y aplica las reglas de negocio sobre todo el arreglo.
+    
+    Args:
+        tasks_data: list[dict] con los mismos campos que predict_risk
+    
+    Returns:
+        list[dict] en el mismo orden de entrada, con el formato de predict_risk
+    """
+    if not tasks_data:
+        return []
+    
+    model = load_model()
+    
+    if model is None:
+        print("⚠ Modelo no disponible, usando heurística")
+        return [predict_risk_heuristic(task_data) for task_data in tasks_data]
+    
+    try:
+        features = prepare_features_batch(tasks_data)
+        
+        # Una sola predicción para todas las tareas: [prob_bajo, prob_alto] por fila
+        probabilities = cached_predict('risk', model, features)
+        model_predictions = np.argmax(probabilities, axis=1)
+        
+        business_results = apply_business_rules_batch(tasks_data, model_predictions, probabilities)
+        
+        results = []
+        for task_data, business_result in zip(tasks_data, business_results):
+            risk_level = business_result['risk_level']
+            probability = business_result['probability']
+            
+            results.append({
+                'risk_level': risk_level,
+                'probability': probability,
+                'probabilities': business_result['probabilities'],
+                'factors': business_result['factors'],
+                'recommendations': generate_recommendations(task_data, risk_level, probability),
+                'model_used': 'catboost_binary' + (' + business_rules' if business_result.get('adjusted') else '')
+            })
+        
+        print(f"✓ Predicción por lotes: {len(results)} tareas en una sola llamada al modelo")
+        return results
+        
+    except InferenceQueueFull:
+        raise
+    except Exception as e:
+        print(f"✗ Error en predicción por lotes: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return [predict_risk_heuristic(task_data) for task_data in tasks_data]
+
+
+def complexity_level_from_score(complexity_score):
+    """
+    Convertir complexity_score (1-10) de web_tasks a nivel de complejidad
+    """
+    if complexity_score is None:
+        return 'Media'
+    if complexity_score <= 3:
+        return 'Baja'
+    if complexity_score <= 7:
+        return 'Media'
+    return 'Alta'
+
+
+def build_task_data_from_web_tasks(task_ids):
+    """
+    Construir los datos de entrada del modelo a partir de tareas de web_tasks
+    
+    Usa una consulta para las tareas y otra agrupada para contar dependencias
+    
+    Args:
+        task_ids: list[int] con ids de web_tasks
+    
+    Returns:
+        list[dict | None] en el mismo orden de task_ids (None si la tarea no existe)
+    """
+    from sqlalchemy import func
+    from app.extensions import db
+    from app.models.web_task import WebTask
+    from app.models.task_dependency import WebTaskDependency
+    
+    unique_ids = list(set(task_ids))
+    tasks = WebTask.query.filter(WebTask.id.in_(unique_ids)).all()
+    tasks_by_id = {task.id: task for task in tasks}
+    
+    # Número de predecesoras por tarea (una sola consulta agrupada)
+    dependency_counts = dict(
+        db.session.query(
+            WebTaskDependency.successor_task_id,
+            func.count(WebTaskDependency.id)
+        ).filter(
+            WebTaskDependency.successor_task_id.in_(unique_ids)
+        ).group_by(WebTaskDependency.successor_task_id).all()
+    )
+    
+    priority_map = {'alta': 'Alta', 'media': 'Media', 'baja': 'Baja'}
+    
+    tasks_data = []
+    for task_id in task_ids:
+        task = tasks_by_id.get(task_id)
+        if task is None:
+            tasks_data.append(None)
+            continue
+        
+        # estimated_hours se maneja en horas (8h = 1 día), igual que el frontend
+        duration_est = float(task.estimated_hours) / 8 if task.estimated_hours else 10
+        
+        tasks_data.append({
+            'task_id': task.id,
+            'area': task.area or 'TI',
+            'task_type': 'Desarrollo',  # web_tasks no registra tipo de tarea
+            'complexity_level': complexity_level_from_score(task.complexity_score),
+            'priority': priority_map.get(task.priority, 'Media'),
+            'duration_est': round(duration_est, 1),
+            'assignees_count': 1 if task.assigned_to else 0,
+            'dependencies': int(dependency_counts.get(task.id, 0))
+        })
+    
+    return tasks_data
+
+
 def identify_risk_factors(task_data, risk_level, probability):
     """
     Identificar factores de riesgo basados en la predicción
@@ -355,10 +520,12 @@ def generate_recommendations(task_data, risk_level, probability):
     return recommendations
 
 
-def apply_business_rules(task_data, model_prediction, model_probability, model_probabilities):
+def calculate_business_risk_score(task_data):
     """
-    Aplicar reglas de negocio sobre la predicción del modelo
-    Ajustar predicción si hay factores críticos evidentes
+    Calcular el puntaje de riesgo según reglas de negocio
+    
+    Returns:
+        tuple: (risk_score: int, factors: list[str])
     """
     risk_score = 0
     factors = []
@@ -400,6 +567,16 @@ def apply_business_rules(task_data, model_prediction, model_probability, model_p
         risk_score += 1
         factors.append('Recurso único asignado (punto único de falla)')
     
+    return risk_score, factors
+
+
+def apply_business_rules(task_data, model_prediction, model_probability, model_probabilities):
+    """
+    Aplicar reglas de negocio sobre la predicción del modelo
+    Ajustar predicción si hay factores críticos evidentes
+    """
+    risk_score, factors = calculate_business_risk_score(task_data)
+    
     # Si hay muchos factores de riesgo, sobrescribir predicción del modelo
     if risk_score >= 7:
         # Alto riesgo claro por reglas de negocio
@@ -439,6 +616,67 @@ def apply_business_rules(task_data, model_prediction, model_probability, model_p
     }
 
 
+def apply_business_rules_batch(tasks_data, model_predictions, model_probabilities):
+    """
+    Aplicar las reglas de negocio sobre todo el arreglo de predicciones a la vez
+    
+    Misma lógica que apply_business_rules, evaluada con operaciones de NumPy
+    
+    Args:
+        tasks_data: list[dict] con los datos de cada tarea
+        model_predictions: np.ndarray (N,) con la clase del modelo (0/1)
+        model_probabilities: np.ndarray (N, 2) con [prob_bajo, prob_alto] por fila
+    
+    Returns:
+        list[dict] con el mismo formato que apply_business_rules
+    """
+    scores_and_factors = [calculate_business_risk_score(task_data) for task_data in tasks_data]
+    risk_scores = np.array([score for score, _ in scores_and_factors], dtype=float)
+    model_predictions = np.asarray(model_predictions, dtype=int)
+    model_probabilities = np.asarray(model_probabilities, dtype=float)
+    model_probabilities_alto = model_probabilities[:, 1]
+    
+    # Regla 1: alto riesgo claro por reglas de negocio
+    rule_high = risk_scores >= 7
+    prob_high = np.minimum(0.95, 0.5 + risk_scores * 0.08)
+    
+    # Regla 2: riesgo moderado pero el modelo dice bajo
+    prob_moderate = np.minimum(0.75, model_probabilities_alto + 0.3)
+    rule_moderate = ~rule_high & (risk_scores >= 4) & (model_predictions == 0) & (prob_moderate > 0.5)
+    
+    adjusted = rule_high | rule_moderate
+    adjusted_probabilities = np.where(rule_high, prob_high, prob_moderate)
+    
+    classes = ['BAJO_RIESGO', 'ALTO_RIESGO']
+    results = []
+    for i, (_, factors) in enumerate(scores_and_factors):
+        if adjusted[i]:
+            probability = float(adjusted_probabilities[i])
+            results.append({
+                'risk_level': 'ALTO_RIESGO',
+                'probability': probability,
+                'probabilities': {
+                    'BAJO_RIESGO': 1 - probability,
+                    'ALTO_RIESGO': probability
+                },
+                'factors': factors,
+                'adjusted': True
+            })
+        else:
+            results.append({
+                'risk_level': classes[model_predictions[i]],
+                'probability': float(model_probabilities[i, 1]),
+                'probabilities': {
+                    'BAJO_RIESGO': float(model_probabilities[i, 0]),
+                    'ALTO_RIESGO': float(model_probabilities[i, 1])
+                },
+                'factors': factors if factors else ['Sin factores críticos evidentes'],
+                'adjusted': False
+            })
+    
+    return results
+
+
 def predict_risk_heuristic(task_data):
     """
     Predicción heurística de respaldo (si el modelo no está disponible)
@@ -371,6 +371,13 @@ class TrainingManager:
         db.session.commit()
         print(f" Modelo activado: {model.name} {model.version}")
         
+        # Reemplazar en caliente el modelo en este proceso (los demás workers lo detectan con el watcher)
+        try:
+            from app.ml.model_registry import model_registry
+            model_registry.reload_type(model.type)
+        except Exception as e:
+            print(f"⚠️ No se pudo recargar el modelo activado: {str(e)}")
+        
         return model
 
 
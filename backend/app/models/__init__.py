@@ -7,9 +7,9 @@ from app.models.role import Role
 from app.models.area import Area
 from app.models.web_user import WebUser
 from app.models.web_task import WebTask
-from app.models.project import Project
+from app.models.project import Project, ProjectStatCounter
 from app.models.task_dependency import WebTaskDependency
-from app.models.ml_models import MLModel, MLPrediction
+from app.models.ml_models import MLModel, MLPrediction, MLDelayStat, MLAttritionSnapshot
 
 # Modelos existentes
 from app.models.user import User
@@ -23,9 +23,12 @@ __all__ = [
     'WebUser',
     'WebTask',
     'Project',
+    'ProjectStatCounter',
     'WebTaskDependency',
     'MLModel',
     'MLPrediction',
+    'MLDelayStat',
+    'MLAttritionSnapshot',
     # Modelos existentes
     'User',
     # 'Task',
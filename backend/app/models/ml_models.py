@@ -205,3 +205,99 @@ class MLTrainingJob(db.Model):
     
     def __repr__(self):
         return f'<MLTrainingJob #{self.id} {self.status}>'
+
+
+class MLDelayStat(db.Model):
+    """
+    Estadísticas de retraso por dimensión (área, tipo de tarea, complejidad)
+    
+    Se actualizan de forma incremental al completar tareas: media y varianza con
+    momentos acumulados (Welford) y mediana con el estimador P² (median_state).
+    """
+    __tablename__ = 'ml_delay_stats'
+    __table_args__ = (
+        db.UniqueConstraint('dimension', 'dimension_value', name='uq_delay_stats_dimension'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.Enum('area', 'task_type', 'complexity'), nullable=False)
+    dimension_value = db.Column(db.String(100), nullable=False)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    mean_delay = db.Column(db.Float, nullable=False, default=0.0)
+    m2_delay = db.Column(db.Float, nullable=False, default=0.0)  # Suma de cuadrados de desviaciones
+    median_delay = db.Column(db.Float)
+    median_state = db.Column(db.JSON)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convierte el modelo a diccionario"""
+        return {
+            'id': self.id,
+            'dimension': self.dimension,
+            'dimension_value': self.dimension_value,
+            'sample_count': self.sample_count,
+            'mean_delay': self.mean_delay,
+            'std_delay': (self.m2_delay / (self.sample_count - 1)) ** 0.5 if self.sample_count > 1 else 0.0,
+            'median_delay': self.median_delay,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    def __repr__(self):
+        return f'<MLDelayStat {self.dimension}={self.dimension_value} n={self.sample_count}>'
+
+
+class MLAttritionSnapshot(db.Model):
+    """
+    Resultado del barrido nocturno de riesgo de renuncia (una fila por persona y corrida)
+    
+    Lo escribe attrition_model.run_attrition_sweep y lo leen los dashboards de RRHH
+    """
+    __tablename__ = 'ml_attrition_snapshots'
+    __table_args__ = (
+        db.Index('idx_attrition_run', 'run_id'),
+        db.Index('idx_attrition_person', 'person_id', 'scored_at'),
+        db.Index('idx_attrition_risk', 'run_id', 'attrition_risk'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.String(32), nullable=False)  # Identificador de la corrida (todas sus filas comparten scored_at)
+    person_id = db.Column(db.String(64), nullable=False)
+    area = db.Column(db.String(64))
+    role = db.Column(db.String(64))
+    performance_class = db.Column(db.String(30), nullable=False)
+    prob_at_risk = db.Column(db.Float)
+    prob_high_performer = db.Column(db.Float)
+    prob_resignation_risk = db.Column(db.Float)
+    attrition_probability = db.Column(db.Float, nullable=False)
+    attrition_risk = db.Column(db.Enum('bajo', 'medio', 'alto'), nullable=False)
+    total_tasks = db.Column(db.Integer, default=0)
+    avg_delay_ratio = db.Column(db.Float)
+    success_rate = db.Column(db.Float)
+    model_used = db.Column(db.String(50))
+    scored_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convierte el modelo a diccionario"""
+        return {
+            'id': self.id,
+            'run_id': self.run_id,
+            'person_id': self.person_id,
+            'area': self.area,
+            'role': self.role,
+            'performance_class': self.performance_class,
+            'probabilities': {
+                'at_risk': self.prob_at_risk,
+                'high_performer': self.prob_high_performer,
+                'resignation_risk': self.prob_resignation_risk
+            },
+            'attrition_probability': self.attrition_probability,
+            'attrition_risk': self.attrition_risk,
+            'total_tasks': self.total_tasks,
+            'avg_delay_ratio': self.avg_delay_ratio,
+            'success_rate': self.success_rate,
+            'model_used': self.model_used,
+            'scored_at': self.scored_at.isoformat() if self.scored_at else None
+        }
+    
+    def __repr__(self):
+        return f'<MLAttritionSnapshot {self.person_id} {self.attrition_risk} ({self.run_id})>'
@@ -1,6 +1,6 @@
 """
 Modelo de Proyecto
-Tabla: projects
+Tablas: projects, project_stat_counters
 """
 from datetime import datetime
 from app.extensions import db
@@ -58,8 +58,13 @@ class Project(db.Model):
     # Note: dependencies se accede via WebTaskDependency.query.filter_by(project_id=...)
     # para evitar conflictos con TaskDependency del sistema de entrenamiento
     
-    def to_dict(self, include_tasks=False, include_stats=False):
-        """Convierte el modelo a diccionario"""
+    def to_dict(self, include_tasks=False, include_stats=False, stats=None):
+        """
+        Convierte el modelo a diccionario
+        
+        stats: estadísticas ya calculadas para varios proyectos juntos
+        (project_stats_service.get_many); si no se pasan se calculan para este
+        """
         # Obtener nombre del manager si existe
         manager_name = None
         if self.manager_id:
@@ -88,7 +93,7 @@ class Project(db.Model):
         }
         
         if include_stats:
-            data['stats'] = self.get_stats()
+            data['stats'] = stats if stats is not None else self.get_stats()
         
         if include_tasks:
             from app.models.task_dependency import WebTaskDependency
@@ -99,30 +104,10 @@ class Project(db.Model):
         return data
     
     def get_stats(self):
-        """Calcula estadísticas del proyecto"""
-        tasks = self.tasks.all()
-        
-        total_tasks = len(tasks)
-        completed_tasks = sum(1 for t in tasks if t.status == 'completada')
-        in_progress_tasks = sum(1 for t in tasks if t.status == 'en_progreso')
-        pending_tasks = sum(1 for t in tasks if t.status == 'pendiente')
-        
-        # Team size
-        team_members = set(t.assigned_to for t in tasks if t.assigned_to)
+        """Calcula estadísticas del proyecto (consultas agrupadas o contadores, sin cargar las tareas)"""
+        from app.services.project_stats import project_stats_service
         
-        # Dependencies
-        from app.models.task_dependency import WebTaskDependency
-        dependencies_count = WebTaskDependency.query.filter_by(project_id=self.project_id).count()
-        
-        return {
-            'total_tasks': total_tasks,
-            'completed_tasks': completed_tasks,
-            'in_progress_tasks': in_progress_tasks,
-            'pending_tasks': pending_tasks,
-            'completion_percentage': round((completed_tasks / total_tasks * 100), 2) if total_tasks > 0 else 0,
-            'team_size': len(team_members),
-            'dependencies_count': dependencies_count
-        }
+        return project_stats_service.get(self.project_id)
     
     def get_task_graph(self):
         """
@@ -134,7 +119,7 @@ class Project(db.Model):
                 'edges': [list of dependencies]
             }
         """
-        from app.models.task_dependency import WebTaskDependency
+        from app.services.graph_store import graph_store
         
         nodes = []
         for task in self.tasks.all():
@@ -146,14 +131,15 @@ class Project(db.Model):
                 'complexity_score': float(task.complexity_score) if task.complexity_score else 1
             })
         
+        # Aristas desde el grafo en memoria (sin consultar web_task_dependencies)
         edges = []
-        dependencies = WebTaskDependency.query.filter_by(project_id=self.project_id).all()
-        for dep in dependencies:
+        graph = graph_store.get(self.project_id)
+        for predecessor, successor, dependency_type, lag_days in graph.edges.values():
             edges.append({
-                'source': dep.predecessor_task_id,
-                'target': dep.successor_task_id,
-                'type': dep.dependency_type,
-                'lag_days': dep.lag_days
+                'source': predecessor,
+                'target': successor,
+                'type': dependency_type,
+                'lag_days': lag_days
             })
         
         return {
@@ -163,3 +149,27 @@ class Project(db.Model):
     
     def __repr__(self):
         return f'<Project {self.project_id}: {self.name}>'
+
+
+class ProjectStatCounter(db.Model):
+    """
+    Contador incremental de un proyecto: tareas por estado, tareas por persona
+    asignada o dependencias (counter_key vacío)
+    
+    Lo mantiene project_stats_service en la misma transacción que escribe las
+    tareas y dependencias (solo con PROJECT_STATS_COUNTERS activo)
+    """
+    __tablename__ = 'project_stat_counters'
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'counter', 'counter_key', name='uq_project_stat_counter'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.String(64), db.ForeignKey('projects.project_id', ondelete='CASCADE'), nullable=False)
+    counter = db.Column(db.Enum('status', 'member', 'dependencies'), nullable=False)
+    counter_key = db.Column(db.String(64), nullable=False, default='')  # Estado o person_id asignado
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ProjectStatCounter {self.project_id} {self.counter}:{self.counter_key}={self.value}>'
@@ -2,28 +2,45 @@
 Rutas de Machine Learning
 Endpoints para predicciones usando modelos ML entrenados
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required
 from datetime import datetime
+import json
+import time
 import traceback
 
+from app.utils.concurrency import submit_with_app_context
+from app.utils.memory import get_memory_usage
+from app.utils.permissions import require_permission
+
 # Imports de los módulos ML (se crearán después)
 try:
-    from app.ml.risk_model import predict_risk
-    from app.ml.duration_model import predict_duration
+    from app.ml.inference_batcher import InferenceQueueFull
+    from app.ml.prediction_audit import prediction_audit
+    from app.ml.risk_model import predict_risk, predict_risk_batch, build_task_data_from_web_tasks
+    from app.ml.duration_model import predict_duration, predict_duration_batch
     from app.ml.recommender_model import recommend_person
     from app.ml.performance_model import predict_performance
     from app.ml.process_mining import analyze_process
-    from app.ml.attrition_model import predict_attrition
+    from app.ml.attrition_model import predict_attrition, run_attrition_sweep, get_latest_attrition_run_id
     from app.ml.chat_assistant import assistant
 except ImportError as e:
     # Los módulos ML se crearán después
+    class InferenceQueueFull(Exception):
+        """Sin módulos ML no hay cola de inferencia (mantiene válidos los except)"""
+    
+    prediction_audit = None
     predict_risk = None
+    predict_risk_batch = None
+    build_task_data_from_web_tasks = None
     predict_duration = None
+    predict_duration_batch = None
     recommend_person = None
     predict_performance = None
     analyze_process = None
     predict_attrition = None
+    run_attrition_sweep = None
+    get_latest_attrition_run_id = None
     assistant = None
 
 # Crear Blueprint
@@ -73,6 +90,8 @@ def prediction_risk():
         
         # Llamar al modelo de predicción
         result = predict_risk(data)
+        prediction_audit.record('risk', result, task_reference=data.get('task_id'),
+                                input_features=data, confidence=result.get('probability'))
         
         print(f" Resultado del modelo:")
         print(f"   risk_level: {result.get('risk_level')}")
@@ -89,6 +108,12 @@ def prediction_risk():
             'recommendations': result.get('recommendations', [])
         }), 200
         
+    except InferenceQueueFull as e:
+        return jsonify({
+            'error': 'Servicio de predicción saturado, intente nuevamente',
+            'details': str(e)
+        }), 503
+        
     except Exception as e:
         return jsonify({
             'error': 'Error al predecir riesgo',
@@ -97,6 +122,128 @@ def prediction_risk():
         }), 500
 
 
+@ml_bp.route('/prediccion-riesgo/lote', methods=['POST'])
+@jwt_required()
+def prediction_risk_batch():
+    """
+    Predecir el riesgo de varias tareas en una sola llamada al modelo
+    
+    Body JSON (uno de los dos):
+        - tasks: list[dict] con los mismos campos que /prediccion-riesgo
+        - task_ids: list[int] con ids de web_tasks (las features se arman desde la BD)
+    
+    Returns:
+        JSON con la lista de predicciones en el mismo orden de entrada
+    """
+    try:
+        if predict_risk_batch is None:
+            return jsonify({
+                'error': 'Modelo de predicción de riesgo no disponible',
+                'message': 'El módulo ML aún no está configurado'
+            }), 503
+        
+        data = request.get_json()
+        
+        if not data or ('tasks' not in data and 'task_ids' not in data):
+            return jsonify({
+                'error': 'No se enviaron datos',
+                'message': 'Se requiere "tasks" o "task_ids"'
+            }), 400
+        
+        max_batch_size = current_app.config.get('ML_RISK_BATCH_MAX_SIZE', 1000)
+        items = data.get('tasks') if 'tasks' in data else data.get('task_ids')
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'La lista de tareas está vacía o no es válida'}), 400
+        
+        if len(items) > max_batch_size:
+            return jsonify({
+                'error': 'Lote demasiado grande',
+                'max_batch_size': max_batch_size
+            }), 400
+        
+        if 'tasks' in data:
+            # Validar campos requeridos en cada tarea
+            required_fields = ['complexity_level', 'priority', 'area', 'task_type']
+            invalid_items = []
+            for index, task_data in enumerate(items):
+                if not isinstance(task_data, dict):
+                    invalid_items.append({'index': index, 'missing_fields': required_fields})
+                    continue
+                missing = [f for f in required_fields if f not in task_data]
+                if missing:
+                    invalid_items.append({'index': index, 'missing_fields': missing})
+            
+            if invalid_items:
+                return jsonify({
+                    'error': 'Faltan campos requeridos',
+                    'invalid_items': invalid_items
+                }), 400
+            
+            tasks_data = items
+        else:
+            # Ids enteros de web_tasks (bool es subclase de int)
+            invalid_items = [
+                {'index': index, 'task_id': task_id}
+                for index, task_id in enumerate(items)
+                if not isinstance(task_id, int) or isinstance(task_id, bool)
+            ]
+            
+            if invalid_items:
+                return jsonify({
+                    'error': 'task_ids debe contener solo ids enteros',
+                    'invalid_items': invalid_items
+                }), 400
+            
+            tasks_data = build_task_data_from_web_tasks(items)
+        
+        # Solo se predicen las tareas encontradas; se mantiene el orden de entrada
+        valid_positions = [i for i, task_data in enumerate(tasks_data) if task_data is not None]
+        predictions = predict_risk_batch([tasks_data[i] for i in valid_positions])
+        predictions_by_position = dict(zip(valid_positions, predictions))
+        
+        results = []
+        for position, task_data in enumerate(tasks_data):
+            if task_data is None:
+                results.append({
+                    'task_id': items[position],
+                    'error': 'Tarea no encontrada'
+                })
+                continue
+            
+            result = predictions_by_position[position]
+            prediction_audit.record('risk', result, task_reference=task_data.get('task_id'),
+                                    input_features=task_data, confidence=result.get('probability'))
+            results.append({
+                'task_id': task_data.get('task_id'),
+                'risk_level': result['risk_level'],
+                'risk_probability': result['probability'],
+                'probabilities': result.get('probabilities', {}),
+                'risk_factors': result.get('factors', []),
+                'recommendations': result.get('recommendations', [])
+            })
+        
+        return jsonify({
+            'results': results,
+            'total': len(results),
+            'predicted': len(predictions),
+            'model_used': predictions[0].get('model_used') if predictions else None
+        }), 200
+    
+    except InferenceQueueFull as e:
+        return jsonify({
+            'error': 'Servicio de predicción saturado, intente nuevamente',
+            'details': str(e)
+        }), 503
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Error al predecir riesgo por lotes',
+            'details': str(e),
+            'trace': traceback.format_exc()
+        }), 500
+
+
 @ml_bp.route('/tiempo-real', methods=['POST'])
 @jwt_required()
 def prediction_duration():
@@ -136,6 +283,8 @@ def prediction_duration():
         
         # Llamar al modelo
         result = predict_duration(data)
+        prediction_audit.record('duration', result, task_reference=data.get('task_id'),
+                                input_features=data, confidence=None)
         
         return jsonify({
             'predicted_duration_days': result.get('duration_days', result.get('duration', 0)),
@@ -144,6 +293,12 @@ def prediction_duration():
             'mode': result.get('mode', 'generico')
         }), 200
         
+    except InferenceQueueFull as e:
+        return jsonify({
+            'error': 'Servicio de predicción saturado, intente nuevamente',
+            'details': str(e)
+        }), 503
+        
     except Exception as e:
         return jsonify({
             'error': 'Error al predecir duración',
@@ -190,6 +345,7 @@ def recommendation_person():
         
         # Llamar al modelo
         result = recommend_person(data)
+        _audit_recommendation(result, data)
         
         return jsonify({
             'task_id': data.get('task_id'),
@@ -198,6 +354,12 @@ def recommendation_person():
             'criteria_used': result.get('criteria', [])
         }), 200
         
+    except InferenceQueueFull as e:
+        return jsonify({
+            'error': 'Servicio de predicción saturado, intente nuevamente',
+            'details': str(e)
+        }), 503
+        
     except Exception as e:
         return jsonify({
             'error': 'Error al recomendar persona',
@@ -212,9 +374,10 @@ def intelligent_assignment():
     """
     Asignación inteligente de tareas (COMBINA 3 MODELOS)
     
-    Ejecuta en paralelo:
+    Ejecuta en paralelo (pool de hilos acotado, ML_PARALLEL_MAX_WORKERS):
     1. Clasificación de Riesgo → Nivel de riesgo de la tarea
     2. Recomendación de Personas → Top 5 candidatos ideales
+    Y luego, en un solo lote:
     3. Predicción de Duración → Duración personalizada por cada candidato
     
     Body JSON:
@@ -227,6 +390,7 @@ def intelligent_assignment():
         JSON con análisis completo:
         - risk: {level, probability, factors}
         - recommendations: [{person_id, name, score, predicted_duration, observations}]
+        - timings: {risk_ms, recommendation_ms, duration_ms, total_ms}
     """
     try:
         data = request.get_json()
@@ -245,32 +409,29 @@ def intelligent_assignment():
                 'required': required_fields
             }), 400
         
-        # 1. CLASIFICACIÓN DE RIESGO
+        started_at = time.perf_counter()
+        timings = {}
+        
+        # 1 y 2. RIESGO y RECOMENDACIÓN en paralelo (pool acotado, cada etapa con su app_context)
+        risk_future = submit_with_app_context(_run_timed, _assignment_risk_stage, data) if predict_risk else None
+        rec_future = submit_with_app_context(_run_timed, _assignment_recommendation_stage, data) if recommend_person else None
+        
         risk_result = {'level': 'MEDIO', 'probability': 50, 'factors': []}
-        if predict_risk:
+        if risk_future:
             try:
-                risk_result = predict_risk(data)
+                risk_result, timings['risk_ms'] = risk_future.result()
             except Exception as e:
                 print(f" Error en clasificación de riesgo: {e}")
         
-        # 2. RECOMENDACIÓN DE PERSONAS
         recommendations = []
-        if recommend_person:
+        if rec_future:
             try:
-                rec_data = {
-                    'area': data.get('area', 'General'),
-                    'complexity_level': data['complexity_level'],
-                    'task_type': data.get('task_type', 'desarrollo'),
-                    'top_n': data.get('top_n', 5)
-                }
-                rec_result = recommend_person(rec_data)
-                recommended_persons = rec_result.get('recommendations', [])
+                recommended_persons, timings['recommendation_ms'] = rec_future.result()
                 
                 # FALLBACK: Si no hay recomendaciones, obtener usuarios de la BD
                 if not recommended_persons:
                     print(" No hay recomendaciones del modelo, obteniendo usuarios de BD...")
                     from app.models.web_user import WebUser
-                    from app import db
                     
                     # Obtener usuarios activos con rol colaborador (role_id=7), filtrar por área si se especificó
                     query = WebUser.query.filter_by(status='active', role_id=7)
@@ -293,23 +454,26 @@ def intelligent_assignment():
                         })
                     print(f"✓ Obtenidos {len(recommended_persons)} usuarios de BD")
                 
-                # 3. PREDICCIÓN DE DURACIÓN para cada persona recomendada
+                # 3. PREDICCIÓN DE DURACIÓN de todas las personas recomendadas en un solo lote
+                durations = {}
+                person_ids = [person.get('person_id') for person in recommended_persons if person.get('person_id')]
+                if predict_duration_batch and person_ids:
+                    stage_started_at = time.perf_counter()
+                    try:
+                        duration_data = {
+                            'complexity_level': data['complexity_level'],
+                            'duration_est_days': data['duration_est_days']
+                        }
+                        durations = predict_duration_batch(duration_data, person_ids)
+                        for person_id, duration_result in durations.items():
+                            prediction_audit.record('duration', duration_result, task_reference=data.get('task_id'),
+                                                    input_features={**duration_data, 'person_id': person_id})
+                    except Exception as e:
+                        print(f" Error en predicción de duración: {e}")
+                    timings['duration_ms'] = _elapsed_ms(stage_started_at)
+                
                 for person in recommended_persons:
-                    person_id = person.get('person_id')
-                    
-                    # Predicción personalizada de duración
-                    duration_days = None
-                    if predict_duration and person_id:
-                        try:
-                            duration_data = {
-                                'complexity_level': data['complexity_level'],
-                                'duration_est_days': data['duration_est_days'],
-                                'person_id': person_id
-                            }
-                            duration_result = predict_duration(duration_data)
-                            duration_days = duration_result.get('duration_days')
-                        except Exception as e:
-                            print(f" Error en predicción de duración para {person_id}: {e}")
+                    duration_days = durations.get(person.get('person_id'), {}).get('duration_days')
                     
                     # Generar observaciones
                     observations = []
@@ -334,6 +498,8 @@ def intelligent_assignment():
                 print(f"⚠️ Error en recomendación de personas: {e}")
                 traceback.print_exc()
         
+        timings['total_ms'] = _elapsed_ms(started_at)
+        
         # Convertir nivel de riesgo del modelo al formato del frontend
         risk_level_raw = risk_result.get('risk_level', 'MEDIO')
         probabilities = risk_result.get('probabilities', {})
@@ -358,7 +524,8 @@ def intelligent_assignment():
                 'factors': risk_result.get('factors', [])
             },
             'recommendations': recommendations,
-            'total_candidates': len(recommendations)
+            'total_candidates': len(recommendations),
+            'timings': timings
         }), 200
         
     except Exception as e:
@@ -369,6 +536,68 @@ def intelligent_assignment():
         }), 500
 
 
+def _assignment_risk_stage(data):
+    """
+    Etapa de riesgo de la asignación inteligente (se ejecuta en el pool)
+    """
+    result = predict_risk(data)
+    prediction_audit.record('risk', result, task_reference=data.get('task_id'),
+                            input_features=data, confidence=result.get('probability'))
+    return result
+
+
+def _assignment_recommendation_stage(data):
+    """
+    Etapa de recomendación de la asignación inteligente (se ejecuta en el pool)
+    
+    Returns:
+        list con las personas recomendadas por el modelo
+    """
+    rec_data = {
+        'area': data.get('area', 'General'),
+        'complexity_level': data['complexity_level'],
+        'task_type': data.get('task_type', 'desarrollo'),
+        'top_n': data.get('top_n', 5)
+    }
+    rec_result = recommend_person(rec_data)
+    _audit_recommendation(rec_result, {**rec_data, 'task_id': data.get('task_id')})
+    return rec_result.get('recommendations', [])
+
+
+def _audit_recommendation(result, data):
+    """
+    Encolar la auditoría de una recomendación (solo person_id y score de cada candidato)
+    """
+    recommendations = result.get('recommendations', [])
+    prediction_audit.record(
+        'recommendation',
+        {
+            'recommendations': [{'person_id': r.get('person_id'), 'score': r.get('score')} for r in recommendations],
+            'total_candidates': result.get('total_candidates', 0),
+            'model_used': result.get('model_used')
+        },
+        task_reference=data.get('task_id'),
+        input_features=data,
+        confidence=recommendations[0].get('score') if recommendations else None
+    )
+
+
+def _run_timed(fn, *args):
+    """
+    Ejecutar fn(*args) y devolver (resultado, milisegundos transcurridos)
+    """
+    started_at = time.perf_counter()
+    result = fn(*args)
+    return result, _elapsed_ms(started_at)
+
+
+def _elapsed_ms(started_at):
+    """
+    Milisegundos transcurridos desde started_at (time.perf_counter)
+    """
+    return round((time.perf_counter() - started_at) * 1000, 1)
+
+
 @ml_bp.route('/desempeno', methods=['POST'])
 @jwt_required()
 def prediction_performance():
@@ -405,6 +634,8 @@ def prediction_performance():
         
         # Llamar al modelo
         result = predict_performance(data)
+        prediction_audit.record('performance', result, task_reference=data.get('task_id'),
+                                input_features=data, confidence=result.get('confidence'))
         
         return jsonify({
             'person_id': data['person_id'],
@@ -424,6 +655,95 @@ def prediction_performance():
         }), 500
 
 
+@ml_bp.route('/renuncia/barrido', methods=['POST'])
+@jwt_required()
+@require_permission('system_config')
+def attrition_sweep():
+    """
+    Ejecutar el barrido de riesgo de renuncia de toda la plantilla
+    
+    Normalmente lo lanza el cron nocturno (backend/run_attrition_sweep.py);
+    este endpoint permite forzarlo. Los resultados quedan en ml_attrition_snapshots.
+    
+    Returns:
+        JSON con el resumen de la corrida (run_id, personas, conteo por riesgo)
+    """
+    try:
+        if run_attrition_sweep is None:
+            return jsonify({
+                'error': 'Modelo de predicción de renuncia no disponible',
+                'message': 'El módulo ML aún no está configurado'
+            }), 503
+        
+        return jsonify(run_attrition_sweep()), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Error al ejecutar el barrido de renuncia',
+            'details': str(e),
+            'trace': traceback.format_exc()
+        }), 500
+
+
+@ml_bp.route('/renuncia/snapshot', methods=['GET'])
+@jwt_required()
+@require_permission('access_ml_models')
+def attrition_snapshot():
+    """
+    Resultados del último barrido de riesgo de renuncia (o de run_id)
+    
+    Query params:
+        - run_id: str (opcional, por defecto la corrida más reciente)
+        - area: str (opcional)
+        - risk: bajo/medio/alto (opcional)
+        - limit: int (opcional, por defecto 500)
+    
+    Returns:
+        JSON con las personas ordenadas por probabilidad de renuncia
+    """
+    try:
+        from app.models.ml_models import MLAttritionSnapshot
+        
+        if get_latest_attrition_run_id is None:
+            return jsonify({
+                'error': 'Modelo de predicción de renuncia no disponible',
+                'message': 'El módulo ML aún no está configurado'
+            }), 503
+        
+        run_id = request.args.get('run_id') or get_latest_attrition_run_id()
+        if not run_id:
+            return jsonify({'error': 'Aún no se ha ejecutado el barrido de renuncia'}), 404
+        
+        query = MLAttritionSnapshot.query.filter_by(run_id=run_id)
+        
+        area = request.args.get('area')
+        if area:
+            query = query.filter(MLAttritionSnapshot.area == area)
+        
+        risk = request.args.get('risk')
+        if risk:
+            if risk not in ('bajo', 'medio', 'alto'):
+                return jsonify({'error': 'risk debe ser bajo, medio o alto'}), 400
+            query = query.filter(MLAttritionSnapshot.attrition_risk == risk)
+        
+        limit = min(request.args.get('limit', 500, type=int), 5000)
+        snapshots = query.order_by(MLAttritionSnapshot.attrition_probability.desc()).limit(limit).all()
+        
+        return jsonify({
+            'run_id': run_id,
+            'scored_at': snapshots[0].scored_at.isoformat() if snapshots else None,
+            'total': len(snapshots),
+            'persons': [snapshot.to_dict() for snapshot in snapshots]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Error al obtener el snapshot de renuncia',
+            'details': str(e),
+            'trace': traceback.format_exc()
+        }), 500
+
+
 @ml_bp.route('/proceso', methods=['POST'])
 @jwt_required()
 def analysis_process():
@@ -504,335 +824,25 @@ def hybrid_performance_analysis():
         if not user_id:
             return jsonify({'error': 'user_id es requerido'}), 400
         
-        # ============================================================
-        # CAPA 1: MÉTRICAS SQL + AGREGACIÓN
-        # ============================================================
+        # Métricas (consulta agrupada), predicción y reglas compartidas con la variante por equipo
         from app.models.web_user import WebUser
-        from app.models.web_task import WebTask
-        from app.extensions import db
-        from sqlalchemy import func
+        from app.ml.performance_analysis import get_task_stats, analyze_members
         
         user = WebUser.query.get(user_id)
         
         if not user:
             return jsonify({'error': 'Usuario no encontrado'}), 404
         
-        # Calcular métricas agregadas desde WebTask
-        task_stats = db.session.query(
-            func.count(WebTask.id).label('total_tasks'),
-            func.sum(
-                db.case(
-                    (WebTask.status == 'completada', 1),
-                    else_=0
-                )
-            ).label('completed_tasks'),
-            func.avg(WebTask.actual_hours).label('avg_hours')
-        ).filter(
-            WebTask.assigned_to == user_id
-        ).first()
-        
-        total_tasks = int(task_stats.total_tasks or 0)
-        completed_tasks = int(task_stats.completed_tasks or 0)
-        avg_hours = float(task_stats.avg_hours or 0)
-        
-        # Calcular tasa de éxito
-        success_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        # Calcular tiempo promedio en días (asumiendo 8h/día)
-        avg_time = round(avg_hours / 8, 1) if avg_hours > 0 else 0
-        
-        metrics = {
-            'rendimiento': round(float(user.performance_index or 75), 1),
-            'tareas_completadas': completed_tasks,
-            'tareas_totales': total_tasks,
-            'calidad': round(success_rate, 1),
-            'tiempo_promedio': avg_time,
-            'carga_actual': round(float(user.current_load or 0), 0),
-            'tasa_retrabajos': round(float(user.rework_rate or 0) * 100, 1)
-        }
-        
-        # ============================================================
-        # CAPA 2: PREDICCIÓN ML (CatBoost)
-        # ============================================================
-        # Para web_users usamos un modelo heurístico simplificado
-        # basado en las métricas disponibles
-        
-        rendimiento = metrics['rendimiento']
-        tasa_retrabajos = metrics['tasa_retrabajos']
-        carga_actual = metrics['carga_actual']
-        
-        # Clasificación heurística basada en rendimiento y métricas
-        # Calcular probabilidad de renuncia de forma gradual
-        base_attrition = 0.10  # Base 10%
-        
-        # Factores que aumentan riesgo de renuncia
-        if rendimiento < 60:
-            base_attrition += 0.25
-        elif rendimiento < 70:
-            base_attrition += 0.15
-        elif rendimiento < 75:
-            base_attrition += 0.05
-            
-        if tasa_retrabajos > 25:
-            base_attrition += 0.20
-        elif tasa_retrabajos > 15:
-            base_attrition += 0.10
-        elif tasa_retrabajos > 10:
-            base_attrition += 0.05
-            
-        if carga_actual > 90:
-            base_attrition += 0.25
-        elif carga_actual > 80:
-            base_attrition += 0.15
-        elif carga_actual > 70:
-            base_attrition += 0.05
-            
-        # Factores que disminuyen riesgo de renuncia
-        if rendimiento >= 85:
-            base_attrition -= 0.05
-        if tasa_retrabajos < 5:
-            base_attrition -= 0.05
-        if carga_actual < 50:
-            base_attrition -= 0.05
-            
-        # Limitar entre 0.05 y 0.95
-        attrition_prob = max(0.05, min(0.95, base_attrition))
-        
-        # Clasificar según el riesgo calculado
-        if rendimiento >= 80 and attrition_prob < 0.20:
-            performance_class = 'high_performer'
-            prob_high = 0.70 + (rendimiento - 80) / 100
-            prob_at_risk = 0.20
-            prob_resignation = attrition_prob
-        elif attrition_prob > 0.40:
-            performance_class = 'resignation_risk'
-            prob_high = 0.10
-            prob_at_risk = 0.40
-            prob_resignation = attrition_prob
-        elif rendimiento < 65 or tasa_retrabajos > 20:
-            performance_class = 'at_risk'
-            prob_high = 0.15
-            prob_at_risk = 0.60
-            prob_resignation = attrition_prob
-        else:
-            # Rendimiento medio (65-80)
-            performance_class = 'at_risk'
-            prob_high = 0.30 + (rendimiento - 65) / 100
-            prob_at_risk = 0.50
-            prob_resignation = attrition_prob
-        
-        probabilities = {
-            'high_performer': prob_high,
-            'at_risk': prob_at_risk,
-            'resignation_risk': prob_resignation
-        }
-        
-        # Factores contribuyentes
-        factors = []
-        if rendimiento < 70:
-            factors.append({
-                'factor': 'Rendimiento bajo del colaborador',
-                'value': f'{rendimiento}%',
-                'impact': 'crítico' if rendimiento < 50 else 'alto'
-            })
-        if tasa_retrabajos > 15:
-            factors.append({
-                'factor': 'Alta tasa de retrabajos detectada',
-                'value': f'{tasa_retrabajos}%',
-                'impact': 'crítico' if tasa_retrabajos > 25 else 'alto'
-            })
-        if carga_actual > 80:
-            factors.append({
-                'factor': 'Sobrecarga de trabajo actual',
-                'value': f'{carga_actual}%',
-                'impact': 'crítico' if carga_actual > 95 else 'medio'
-            })
-        if total_tasks < 5:
-            factors.append({
-                'factor': 'Poca experiencia en tareas asignadas',
-                'value': f'{total_tasks} tareas',
-                'impact': 'medio'
-            })
-        if success_rate < 70:
-            factors.append({
-                'factor': 'Baja tasa de éxito en tareas',
-                'value': f'{success_rate:.0f}%',
-                'impact': 'alto'
-            })
-        
-        if not factors:
-            factors.append({
-                'factor': 'Sin factores de riesgo detectados',
-                'value': '✓',
-                'impact': 'bajo'
-            })
-        
-        prediction = {
-            'clase': performance_class,
-            'probabilidad_renuncia': round(attrition_prob * 100, 1),
-            'probabilidades': {
-                k: round(v * 100, 1) for k, v in probabilities.items()
-            },
-            'factores': factors[:5]  # Top 5
-        }
-        
-        # ============================================================
-        # CAPA 3: MOTOR DE REGLAS (Rule-Based System)
-        # ============================================================
-        recommendations = []
-        
-        rendimiento = metrics['rendimiento']
-        prob_renuncia = attrition_prob * 100
-        
-        # REGLA 1: Alto impacto + Liderazgo
-        if rendimiento >= 90 and prob_renuncia < 15:
-            recommendations.append({
-                'tipo': 'proyectos_alto_impacto',
-                'titulo': 'Asignar a Proyectos de Alto Impacto',
-                'descripcion': 'Alto desempeño y baja probabilidad de renuncia. Ideal para liderar proyectos críticos.',
-                'prioridad': 'alta',
-                'icono': '🚀'
-            })
-            recommendations.append({
-                'tipo': 'liderazgo',
-                'titulo': 'Considerar para Rol de Liderazgo',
-                'descripcion': 'Excelente candidato para roles de mentoría o liderazgo de equipo.',
-                'prioridad': 'media',
-                'icono': '👨‍💼'
-            })
-        
-        # REGLA 2: Retención crítica
-        if prob_renuncia > 50 and rendimiento > 80:
-            recommendations.append({
-                'tipo': 'retencion_critica',
-                'titulo': '⚠️ Retención Crítica - Talento en Riesgo',
-                'descripcion': 'Alto desempeño pero alta probabilidad de renuncia. Requiere intervención inmediata.',
-                'prioridad': 'crítica',
-                'icono': '🚨'
-            })
-            recommendations.append({
-                'tipo': 'entrevista_retencion',
-                'titulo': 'Agendar Entrevista de Retención',
-                'descripcion': 'Conversar sobre satisfacción laboral, crecimiento y expectativas.',
-                'prioridad': 'alta',
-                'icono': '💬'
-            })
-        
-        # REGLA 3: Plan de mejora
-        if rendimiento < 60:
-            recommendations.append({
-                'tipo': 'plan_mejora',
-                'titulo': 'Implementar Plan de Mejora',
-                'descripcion': f'Desempeño bajo ({rendimiento}%). Requiere capacitación y seguimiento.',
-                'prioridad': 'alta',
-                'icono': '📚'
-            })
-            recommendations.append({
-                'tipo': 'capacitacion',
-                'titulo': 'Asignar Capacitación',
-                'descripcion': 'Identificar brechas de habilidades y ofrecer entrenamiento específico.',
-                'prioridad': 'media',
-                'icono': '🎓'
-            })
-        
-        # REGLA 4: Reconocimiento
-        if rendimiento > 95 and prob_renuncia < 5:
-            recommendations.append({
-                'tipo': 'reconocimiento',
-                'titulo': '⭐ Reconocimiento Público',
-                'descripcion': f'Desempeño excepcional ({rendimiento}%). Considerar bonos o reconocimientos.',
-                'prioridad': 'media',
-                'icono': '🏆'
-            })
-        
-        # REGLA 5: Redistribución de carga
-        if metrics['carga_actual'] > 90:
-            recommendations.append({
-                'tipo': 'redistribucion_carga',
-                'titulo': 'Redistribuir Carga de Trabajo',
-                'descripcion': f'Sobrecarga detectada ({metrics["carga_actual"]}%). Reasignar tareas para evitar burnout.',
-                'prioridad': 'alta',
-                'icono': '⚖️'
-            })
-        
-        # REGLA 6: Monitoreo moderado
-        if 60 <= rendimiento < 80 and 15 <= prob_renuncia < 40:
-            recommendations.append({
-                'tipo': 'monitoreo',
-                'titulo': 'Monitoreo Regular',
-                'descripcion': 'Desempeño moderado. Establecer seguimientos quincenales.',
-                'prioridad': 'baja',
-                'icono': '📊'
-            })
-        
-        # REGLA 7: Buen desempeño - mantener motivación
-        if 75 <= rendimiento < 90 and prob_renuncia < 15:
-            recommendations.append({
-                'tipo': 'mantener_motivacion',
-                'titulo': 'Mantener Motivación',
-                'descripcion': f'Buen desempeño ({rendimiento}%). Continuar seguimiento y ofrecer oportunidades de desarrollo.',
-                'prioridad': 'media',
-                'icono': '💪'
-            })
-            recommendations.append({
-                'tipo': 'desarrollo',
-                'titulo': 'Oportunidades de Crecimiento',
-                'descripcion': 'Asignar proyectos desafiantes para mantener el interés y desarrollo profesional.',
-                'prioridad': 'media',
-                'icono': '📈'
-            })
-        
-        # REGLA 8: Riesgo moderado de renuncia
-        if 25 <= prob_renuncia < 50 and rendimiento >= 70:
-            recommendations.append({
-                'tipo': 'prevencion_renuncia',
-                'titulo': 'Prevención de Renuncia',
-                'descripcion': f'Riesgo moderado de salida ({prob_renuncia:.0f}%). Revisar satisfacción y plan de carrera.',
-                'prioridad': 'media',
-                'icono': '⚠️'
-            })
-        
-        # REGLA 9: Alta tasa de retrabajos
-        if metrics['tasa_retrabajos'] > 15:
-            recommendations.append({
-                'tipo': 'calidad',
-                'titulo': 'Mejorar Calidad de Trabajo',
-                'descripcion': f'Tasa de retrabajos elevada ({metrics["tasa_retrabajos"]}%). Revisar procesos y capacitar en QA.',
-                'prioridad': 'alta',
-                'icono': '🔍'
-            })
-        
-        # REGLA 10: Pocas tareas completadas
-        if total_tasks < 10 and user.created_at:
-            from datetime import datetime
-            days_since_join = (datetime.utcnow() - user.created_at).days
-            if days_since_join > 30:
-                recommendations.append({
-                    'tipo': 'productividad',
-                    'titulo': 'Aumentar Productividad',
-                    'descripcion': f'Solo {total_tasks} tareas asignadas. Considerar aumentar carga gradualmente.',
-                    'prioridad': 'baja',
-                    'icono': '📋'
-                })
-        
-        # REGLA 11: Desempeño estable y alto (sin problemas)
-        if rendimiento >= 80 and prob_renuncia < 10 and metrics['tasa_retrabajos'] < 10 and metrics['carga_actual'] < 80:
-            recommendations.append({
-                'tipo': 'sin_acciones',
-                'titulo': 'Desempeño Óptimo',
-                'descripcion': 'El colaborador mantiene un excelente nivel. Continuar con seguimiento regular.',
-                'prioridad': 'baja',
-                'icono': '✅'
-            })
+        analysis = analyze_members([user], get_task_stats([user]))[0]
         
         # ============================================================
         # OUTPUT: Dashboard
         # ============================================================
         return jsonify({
             'user_name': user.full_name,
-            'metricas': metrics,
-            'prediccion': prediction,
-            'recomendaciones': recommendations
+            'metricas': analysis['metricas'],
+            'prediccion': analysis['prediccion'],
+            'recomendaciones': analysis['recomendaciones']
         }), 200
         
     except Exception as e:
@@ -844,6 +854,112 @@ def hybrid_performance_analysis():
         }), 500
 
 
+@ml_bp.route('/analisis-desempeno/equipo', methods=['POST'])
+@jwt_required()
+@require_permission('access_ml_models')
+def team_performance_analysis():
+    """
+    Análisis híbrido de desempeño de todos los colaboradores de un área o equipo
+    
+    Mismas métricas, clasificación y recomendaciones que /analisis-desempeno,
+    calculadas con una sola consulta agrupada y reglas vectorizadas. La
+    respuesta se envía en NDJSON (una línea JSON por colaborador a medida que
+    se evalúa cada bloque y una última línea con el resumen).
+    
+    Body JSON:
+        - area: str (opcional; los supervisores de área solo ven la suya)
+        - user_ids: list[int] (opcional, equipo específico)
+    
+    Returns:
+        application/x-ndjson con {user_id, user_name, area, metricas, prediccion, recomendaciones}
+        por línea y al final {resumen: {total, por_clase}}
+    """
+    try:
+        from app.utils.permissions import get_current_user, is_area_restricted
+        from app.ml.performance_analysis import get_team_members, get_task_stats, iter_team_analysis
+        
+        data = request.get_json(silent=True) or {}
+        area = data.get('area')
+        user_ids = data.get('user_ids')
+        
+        if user_ids is not None and not isinstance(user_ids, list):
+            return jsonify({'error': 'user_ids debe ser una lista'}), 400
+        
+        # Supervisores de área: siempre restringidos a su propia área
+        user = get_current_user()
+        if is_area_restricted(user):
+            if not user.area:
+                return jsonify({'error': 'El usuario no tiene un área asignada'}), 403
+            if area and area != user.area:
+                return jsonify({'error': 'No tiene acceso a esta área'}), 403
+            area = user.area
+        
+        if not area and not user_ids:
+            return jsonify({'error': 'Debe indicar area o user_ids'}), 400
+        
+        # Toda la consulta se hace antes de empezar a responder
+        members = get_team_members(area=area, user_ids=user_ids)
+        task_stats = get_task_stats(members)
+        chunk_size = current_app.config.get('ML_TEAM_ANALYSIS_CHUNK_SIZE', 200)
+        
+        def generate():
+            by_class = {}
+            for analysis in iter_team_analysis(members, task_stats, chunk_size=chunk_size):
+                performance_class = analysis['prediccion']['clase']
+                by_class[performance_class] = by_class.get(performance_class, 0) + 1
+                yield json.dumps(analysis, ensure_ascii=False) + '\n'
+            
+            yield json.dumps({'resumen': {'area': area, 'total': len(members), 'por_clase': by_class}},
+                             ensure_ascii=False) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        print(f"✗ Error en análisis de desempeño por equipo: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            'error': 'Error en análisis de desempeño por equipo',
+            'message': str(e)
+        }), 500
+
+
+@ml_bp.route('/modelos/registro', methods=['GET'])
+@jwt_required()
+def models_registry_status():
+    """
+    Estado del registro de modelos y memoria de este worker
+    
+    Returns:
+        JSON con:
+        - models: [{name, loaded, model_file, version, loaded_at}]
+        - memory: {pid, rss_mb, pss_mb, shared_mb, private_mb} del proceso que atiende
+        - batching: métricas del micro-batching por modelo (tamaño de lote, espera en cola)
+        - prediction_cache: entradas y tasa de aciertos por modelo
+        - delay_stats: snapshot de estadísticas de retraso usado en las features de riesgo
+        - prediction_audit: registros encolados, escritos y descartados de ml_predictions
+    """
+    try:
+        from app.ml.model_registry import model_registry
+        from app.ml.inference_batcher import inference_stats
+        from app.ml.prediction_cache import prediction_cache
+        from app.ml.delay_stats import delay_stats_store
+        
+        return jsonify({
+            'models': model_registry.status(),
+            'memory': get_memory_usage(),
+            'batching': inference_stats(),
+            'prediction_cache': prediction_cache.stats(),
+            'delay_stats': delay_stats_store.stats(),
+            'prediction_audit': prediction_audit.stats()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Error al obtener el estado de los modelos',
+            'details': str(e)
+        }), 500
+
+
 @ml_bp.route('/health', methods=['GET'])
 def ml_health():
     """
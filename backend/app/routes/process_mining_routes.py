@@ -2,15 +2,22 @@
 Rutas para Process Mining - Predicción de Cuellos de Botella
 Endpoint ML usando exclusivamente el modelo CatBoost Bottleneck Predictor
 """
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, jsonify, request, send_file, current_app
 from flask_jwt_extended import jwt_required
 from sqlalchemy import text
 from app.extensions import db
+from app.ml.model_registry import model_registry
+from app.ml.prediction_cache import cached_predict
+from app.ml.native_models import load_catboost_model
+from app.ml.graph_reachability import descendant_counts
+from app.ml.graph_centrality import centrality_service
+from app.ml.analysis_cache import analysis_cache
+from app.services.graph_store import graph_store, DependencyCycleError
 import pandas as pd
 import numpy as np
-import networkx as nx
-import joblib
 import json
+import zlib
+import hashlib
 from pathlib import Path
 from datetime import datetime
 import traceback
@@ -21,31 +28,37 @@ process_mining_bp = Blueprint('process_mining', __name__)
 ML_MODELS_PATH = Path(__file__).parent.parent.parent / 'ml' / 'models' / 'mining'
 METRICS_PATH = ML_MODELS_PATH / 'metrics'
 
-# Cache del modelo
-_bottleneck_model = None
-_bottleneck_config = None
-
 
 def load_bottleneck_model():
-    """Carga el modelo de bottleneck con cache"""
-    global _bottleneck_model, _bottleneck_config
+    """Obtiene el modelo de bottleneck desde el registro central de modelos"""
+    entry = model_registry.get('bottleneck')
     
-    if _bottleneck_model is None:
-        model_path = ML_MODELS_PATH / 'model_bottleneck_corregido.pkl'
-        config_path = ML_MODELS_PATH / 'bottleneck_config.json'
-        
-        if not model_path.exists():
-            raise FileNotFoundError(f"Modelo no encontrado: {model_path}")
-        
-        _bottleneck_model = joblib.load(model_path)
-        
-        if config_path.exists():
-            with open(config_path, 'r', encoding='utf-8') as f:
-                _bottleneck_config = json.load(f)
-        
-        print(f"✓ Modelo bottleneck cargado: {model_path}")
+    if entry['model'] is None:
+        raise FileNotFoundError(f"Modelo no encontrado: {ML_MODELS_PATH / 'model_bottleneck_corregido.cbm'}")
     
-    return _bottleneck_model, _bottleneck_config
+    return entry['model'], entry['config']
+
+
+def load_artifacts(model_file=None):
+    """Carga el modelo de bottleneck y su configuración (usado por el registro de modelos)"""
+    model_path = Path(model_file) if model_file else ML_MODELS_PATH / 'model_bottleneck_corregido.cbm'
+    config_path = ML_MODELS_PATH / 'bottleneck_config.json'
+    
+    # .cbm nativo si existe; pickle de versiones anteriores
+    model, model_path = load_catboost_model(model_path)
+    if model is None:
+        print(f"⚠ Modelo no encontrado: {ML_MODELS_PATH / 'model_bottleneck_corregido.cbm'}")
+        return None
+    
+    config = None
+    
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    
+    print(f"✓ Modelo bottleneck cargado: {model_path}")
+    
+    return {'model': model, 'config': config, 'metrics': None, 'model_file': str(model_path)}
 
 
 def load_json_artifact(filename):
@@ -61,9 +74,17 @@ def get_process_data(project_id=None):
     """
     Extrae datos de la tabla 'web_tasks' adaptados al modelo bottleneck
     
+    Todas las features se calculan por columnas (sin apply/iterrows por fila) y
+    el grafo se arma con las aristas ya filtradas, para que el análisis escale a
+    decenas de miles de tareas (límite: ML_PROCESS_MINING_MAX_TASKS).
+    
     Returns:
-        DataFrame con features necesarias para predicción
+        tuple (DataFrame con features necesarias para predicción,
+               DataFrame de aristas predecessor_task_id → successor_task_id entre esas tareas)
     """
+    params = {'project_id': project_id} if project_id else {}
+    no_edges = pd.DataFrame(columns=['predecessor_task_id', 'successor_task_id'])
+    
     try:
         # Usar tabla 'web_tasks'
         base_query = """
@@ -98,84 +119,96 @@ def get_process_data(project_id=None):
         """
         
         if project_id:
-            base_query += f" AND wt.project_id = '{project_id}'"
+            base_query += " AND wt.project_id = :project_id"
         
-        base_query += " ORDER BY wt.created_at DESC LIMIT 1000"
+        base_query += " ORDER BY wt.created_at DESC"
+        
+        max_tasks = current_app.config.get('ML_PROCESS_MINING_MAX_TASKS', 50000)
+        if max_tasks and max_tasks > 0:
+            base_query += " LIMIT :max_tasks"
+            params['max_tasks'] = int(max_tasks)
         
         print(f"   📊 Ejecutando query SQL en tabla 'web_tasks'...")
-        df = pd.read_sql(text(base_query), db.engine)
+        df = pd.read_sql(text(base_query), db.engine, params=params)
         print(f"   ✅ Query ejecutada: {len(df)} registros obtenidos")
         
         if len(df) == 0:
             print(f"   ⚠️ No hay datos en tabla 'web_tasks'")
-            return pd.DataFrame()
+            return pd.DataFrame(), no_edges
     
     except Exception as e:
         print(f"   ❌ Error al cargar datos: {str(e)}")
-        return pd.DataFrame()
+        return pd.DataFrame(), no_edges
     
-    # Calcular delay_ratio
-    df['delay_ratio'] = df.apply(
-        lambda row: row['duration_real'] / row['duration_est'] if row['duration_est'] > 0 else 1.0,
-        axis=1
-    )
+    # Calcular delay_ratio (1.0 si no hay estimación)
+    duration_est = pd.to_numeric(df['duration_est'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    duration_real = pd.to_numeric(df['duration_real'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    df['delay_ratio'] = np.divide(duration_real, duration_est, out=np.ones_like(duration_est), where=duration_est > 0)
     
     # Construir grafo de dependencias
-    # Usar 'web_task_dependencies'
-    deps_query = """
-        SELECT predecessor_task_id, successor_task_id
-        FROM web_task_dependencies
-    """
-    if project_id:
-        deps_query += f" WHERE project_id = '{project_id}'"
-    
+    # Aristas desde el grafo en memoria de cada proyecto (sin consultar 'web_task_dependencies').
+    # Se revalida contra la BD: el resultado se guarda en caché con la versión de get_data_version
+    # y no debe faltarle una dependencia escrita por otro worker
+    graphs = {}
     try:
-        deps_df = pd.read_sql(text(deps_query), db.engine)
+        project_ids = [project_id] if project_id else df['project_id'].dropna().unique().tolist()
+        graphs = graph_store.get_many(project_ids, revalidate=True)
+        deps_df = pd.DataFrame(
+            [pair for graph in graphs.values() for pair in graph.edge_pairs()],
+            columns=['predecessor_task_id', 'successor_task_id']
+        )
         print(f"   🔗 Dependencias cargadas: {len(deps_df)} edges")
     except Exception as e:
         print(f"   ⚠️ No se pudieron cargar dependencias: {str(e)}")
-        deps_df = pd.DataFrame(columns=['predecessor_task_id', 'successor_task_id'])
-    
-    # Calcular métricas de grafo
-    G = nx.DiGraph()
-    for task_id in df['task_id']:
-        G.add_node(task_id)
-    
-    for _, row in deps_df.iterrows():
-        if row['predecessor_task_id'] in df['task_id'].values and \
-           row['successor_task_id'] in df['task_id'].values:
-            G.add_edge(row['predecessor_task_id'], row['successor_task_id'])
-    
-    # Calcular centralidad
-    if G.number_of_edges() > 0:
-        betweenness = nx.betweenness_centrality(G)
-    else:
-        betweenness = {node: 0 for node in G.nodes()}
-    
-    df['betweenness'] = df['task_id'].map(betweenness).fillna(0)
-    df['degree_centrality'] = df['task_id'].apply(lambda x: G.degree(x))
-    df['in_degree'] = df['task_id'].apply(lambda x: G.in_degree(x))
-    df['out_degree'] = df['task_id'].apply(lambda x: G.out_degree(x))
-    
-    # Calcular impact_count (descendientes en el grafo)
-    def count_descendants(node):
-        try:
-            return len(nx.descendants(G, node))
-        except:
-            return 0
+        deps_df = no_edges
+    
+    # Solo aristas entre tareas cargadas (pertenencia por hash con isin) y sin duplicados
+    task_ids = df['task_id']
+    edges = deps_df[
+        deps_df['predecessor_task_id'].isin(task_ids) & deps_df['successor_task_id'].isin(task_ids)
+    ].drop_duplicates()
+    
+    edge_pairs = list(zip(edges['predecessor_task_id'], edges['successor_task_id']))
+    
+    # Calcular centralidad (exacta o aproximada por grupo de proyectos, en caché mientras el grafo no cambie)
+    betweenness = centrality_service.betweenness(task_ids, df['project_id'], edge_pairs)
     
-    df['impact_count'] = df['task_id'].apply(count_descendants)
+    # Grados desde los conteos de cada columna de aristas
+    out_degree = edges['predecessor_task_id'].value_counts()
+    in_degree = edges['successor_task_id'].value_counts()
     
-    # Features adicionales
-    df['week_of_year'] = pd.to_datetime(df['created_at']).dt.isocalendar().week
-    df['month'] = pd.to_datetime(df['created_at']).dt.month
-    df['day_of_week'] = pd.to_datetime(df['created_at']).dt.dayofweek
-    df['quarter'] = pd.to_datetime(df['created_at']).dt.quarter
+    df['betweenness'] = task_ids.map(betweenness).fillna(0)
+    df['in_degree'] = task_ids.map(in_degree).fillna(0).astype(int)
+    df['out_degree'] = task_ids.map(out_degree).fillna(0).astype(int)
+    df['degree_centrality'] = df['in_degree'] + df['out_degree']
+    
+    # Calcular impact_count (descendientes en el grafo) en una sola pasada; con un solo
+    # proyecto se reutiliza su orden topológico mantenido (sin condensar componentes)
+    impact = None
+    if project_id in graphs:
+        try:
+            loaded = set(task_ids)
+            ordered = [task for task in graphs[project_id].topological_order() if task in loaded]
+            placed = set(ordered)
+            ordered += [task for task in task_ids if task not in placed]  # Sin dependencias: cualquier posición
+            impact = descendant_counts(ordered, edge_pairs, topological=True)
+        except DependencyCycleError:
+            impact = None
+    if impact is None:
+        impact = descendant_counts(task_ids, edge_pairs)
+    df['impact_count'] = task_ids.map(impact).fillna(0).astype(int)
+    
+    # Features adicionales (la fecha se convierte una sola vez)
+    created_at = pd.to_datetime(df['created_at'])
+    df['week_of_year'] = created_at.dt.isocalendar().week
+    df['month'] = created_at.dt.month
+    df['day_of_week'] = created_at.dt.dayofweek
+    df['quarter'] = created_at.dt.quarter
     
     # Progreso del proyecto
-    project_sizes = df.groupby('project_id').size()
-    df['project_size'] = df['project_id'].map(project_sizes)
-    df['task_number_in_project'] = df.groupby('project_id').cumcount() + 1
+    project_groups = df.groupby('project_id', dropna=False)
+    df['project_size'] = project_groups['task_id'].transform('size')
+    df['task_number_in_project'] = project_groups.cumcount() + 1
     df['project_progress'] = df['task_number_in_project'] / df['project_size']
     
     # Features de persona (valores por defecto si no hay datos)
@@ -192,7 +225,7 @@ def get_process_data(project_id=None):
     df['is_overloaded'] = (df['load_ratio'] > 0.8).astype(int)
     df['complexity_numeric'] = df['complexity_level'].map({'Low': 100, 'Medium': 200, 'High': 300}).fillna(200)
     
-    return df
+    return df, edges
 
 
 def predict_bottlenecks(df):
@@ -238,15 +271,144 @@ def predict_bottlenecks(df):
         X[col] = X[col].fillna(median_val)
     
     # Predicción
-    predictions = model.predict(X)
-    probabilities = model.predict_proba(X)[:, 1]  # Probabilidad de clase "Bottleneck"
+    # Una sola pasada del modelo: la clase es la de mayor probabilidad (como predict)
+    probabilities = cached_predict('bottleneck', model, X)
     
-    df['is_bottleneck'] = predictions
-    df['bottleneck_probability'] = probabilities
+    df['is_bottleneck'] = np.argmax(probabilities, axis=1)
+    df['bottleneck_probability'] = probabilities[:, 1]  # Probabilidad de clase "Bottleneck"
     
     return df
 
 
+# Columnas que lee el análisis; su checksum detecta cambios que no mueven el conteo ni
+# MAX(updated_at) (TIMESTAMP de 1 segundo: otra edición en el mismo segundo, o de una
+# fila más antigua que la última modificada)
+VERSION_COLUMNS = {
+    'web_tasks': (
+        'id', 'project_id', 'title', 'status', 'assigned_to', 'area', 'priority', 'complexity_score',
+        'estimated_hours', 'actual_hours', 'start_date', 'completed_at', 'created_at', 'updated_at'
+    ),
+    'web_task_dependencies': ('id', 'predecessor_task_id', 'successor_task_id', 'updated_at')
+}
+
+
+def checksum_sql(table, dialect):
+    """
+    Suma de CRC32 de las columnas de cada fila (en SQLite, CRC32 se registra en la conexión)
+    """
+    columns = ', '.join(VERSION_COLUMNS[table])
+    if dialect == 'mysql':
+        return f"SUM(CRC32(CONCAT_WS('|', {columns})))"
+    return f"SUM(CRC32({columns}))"
+
+
+def sqlite_crc32(*values):
+    return zlib.crc32('|'.join('' if value is None else str(value) for value in values).encode('utf-8'))
+
+
+def get_data_version(project_id=None):
+    """
+    Versión de los datos del análisis: conteo, última modificación y checksum
+    de 'web_tasks' y 'web_task_dependencies' (del proyecto o de todos)
+    
+    Returns:
+        tuple comparable o None si no se pudo consultar (entonces no se usa caché)
+    """
+    where = " WHERE project_id = :project_id" if project_id else ""
+    
+    try:
+        with db.engine.connect() as connection:
+            dialect = connection.dialect.name
+            if dialect == 'sqlite':
+                connection.connection.driver_connection.create_function('CRC32', -1, sqlite_crc32, deterministic=True)
+            
+            query = text(f"""
+                SELECT
+                    (SELECT COUNT(*) FROM web_tasks{where}) AS tasks,
+                    (SELECT MAX(updated_at) FROM web_tasks{where}) AS tasks_updated_at,
+                    (SELECT {checksum_sql('web_tasks', dialect)} FROM web_tasks{where}) AS tasks_checksum,
+                    (SELECT COUNT(*) FROM web_task_dependencies{where}) AS dependencies,
+                    (SELECT MAX(updated_at) FROM web_task_dependencies{where}) AS dependencies_updated_at,
+                    (SELECT {checksum_sql('web_task_dependencies', dialect)} FROM web_task_dependencies{where}) AS dependencies_checksum
+            """)
+            row = connection.execute(query, {'project_id': project_id} if project_id else {}).one()
+    except Exception as e:
+        print(f"   ⚠️ No se pudo obtener la versión de los datos: {str(e)}")
+        return None
+    
+    return tuple(str(value) if value is not None else None for value in row)
+
+
+def get_analysis(project_id=None, version=None):
+    """
+    DataFrame con predicciones y aristas del análisis, compartido por /analyze y /stats-by-area
+    
+    Se reutiliza el resultado en caché mientras no cambien los datos (version)
+    ni el modelo cargado; con version=None se calcula siempre. El DataFrame
+    devuelto es compartido entre peticiones: no se debe modificar.
+    
+    Returns:
+        tuple (DataFrame con features y predicciones, DataFrame de aristas)
+    """
+    cache_version = (version, model_registry.get('bottleneck')['token']) if version is not None else None
+    
+    if cache_version is not None:
+        cached = analysis_cache.get(project_id, cache_version)
+        if cached is not None:
+            print(f"   ♻️ Análisis en caché (project_id={project_id})")
+            return cached
+    
+    df, edges = get_process_data(project_id)
+    print(f"   📊 Datos cargados: {len(df)} tareas")
+    
+    if len(df) > 0:
+        print(f"   🤖 Ejecutando predicción con modelo CatBoost...")
+        df = predict_bottlenecks(df)
+        print(f"   ✅ Predicción completada")
+    
+    if cache_version is not None:
+        analysis_cache.put(project_id, cache_version, (df, edges))
+    
+    return df, edges
+
+
+def analysis_etag(endpoint, project_id, version):
+    """
+    ETag de una respuesta: endpoint, proyecto, versión de los datos y archivo del
+    modelo (ruta y fecha, iguales en todos los workers). None si no hay versión.
+    """
+    if version is None:
+        return None
+    
+    entry = model_registry.get('bottleneck')
+    raw = json.dumps([
+        endpoint, project_id, version, entry['model_file'], entry['mtime'],
+        current_app.config.get('ML_PROCESS_MINING_MAX_TASKS')
+    ], default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def not_modified(etag):
+    """
+    True si el cliente ya tiene la respuesta con este ETag (If-None-Match)
+    """
+    return etag is not None and request.if_none_match.contains(etag)
+
+
+def etag_response(response, etag):
+    """
+    Añadir ETag a una respuesta (None = 304 vacía); el navegador debe revalidar siempre
+    """
+    if response is None:
+        response = current_app.response_class(status=304)
+    
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    
+    return response
+
+
 # ============================================================================
 # ENDPOINT PRINCIPAL: Análisis de Cuellos de Botella
 # ============================================================================
@@ -273,12 +435,18 @@ def analyze_bottlenecks(project_id=None):
     try:
         print(f"\n🔍 Iniciando análisis de bottlenecks (project_id={project_id})...")
         
-        # Cargar datos
-        df = get_process_data(project_id)
-        print(f"   📊 Datos cargados: {len(df)} tareas")
+        # Sin cambios en los datos ni en el modelo desde la última respuesta: 304
+        version = get_data_version(project_id)
+        etag = analysis_etag('analyze', project_id, version)
+        if not_modified(etag):
+            print(f"   ♻️ Sin cambios (304)")
+            return etag_response(None, etag)
+        
+        # Cargar datos y predecir bottlenecks (en caché mientras la versión no cambie)
+        df, edges = get_analysis(project_id, version)
         
         if len(df) == 0:
-            return jsonify({
+            return etag_response(jsonify({
                 'message': 'No hay datos disponibles',
                 'summary': {
                     'total_tasks': 0,
@@ -298,12 +466,7 @@ def analyze_bottlenecks(project_id=None):
                 'bottlenecks': [],
                 'graph': {'nodes': [], 'edges': []},
                 'recommendations': []
-            }), 200
-        
-        # Predecir bottlenecks
-        print(f"   🤖 Ejecutando predicción con modelo CatBoost...")
-        df = predict_bottlenecks(df)
-        print(f"   ✅ Predicción completada")
+            }), etag)
         
         # Identificar top bottlenecks
         bottlenecks_df = df[df['is_bottleneck'] == 1].nlargest(20, 'bottleneck_probability')
@@ -326,18 +489,6 @@ def analyze_bottlenecks(project_id=None):
                              'Alto' if row['bottleneck_probability'] > 0.6 else 'Medio'
             })
         
-        # Construir grafo para visualización
-        # Usar 'web_task_dependencies'
-        deps_query = text("""
-            SELECT predecessor_task_id, successor_task_id
-            FROM web_task_dependencies
-        """ + (f" WHERE project_id = '{project_id}'" if project_id else ""))
-        
-        try:
-            deps = pd.read_sql(deps_query, db.engine)
-        except:
-            deps = pd.DataFrame(columns=['predecessor_task_id', 'successor_task_id'])
-        
         # Nodos del grafo (solo bottlenecks para mejor visualización)
         graph_nodes = []
         for _, row in bottlenecks_df.head(15).iterrows():
@@ -350,15 +501,15 @@ def analyze_bottlenecks(project_id=None):
                 'size': 10 + int(row['bottleneck_probability'] * 20)
             })
         
-        # Edges del grafo
-        bottleneck_ids = set(bottlenecks_df.head(15)['task_id'].values)
-        graph_edges = []
-        for _, row in deps.iterrows():
-            if row['predecessor_task_id'] in bottleneck_ids and row['successor_task_id'] in bottleneck_ids:
-                graph_edges.append({
-                    'from': int(row['predecessor_task_id']),
-                    'to': int(row['successor_task_id'])
-                })
+        # Edges del grafo (aristas ya cargadas con el análisis)
+        bottleneck_ids = bottlenecks_df.head(15)['task_id']
+        graph_deps = edges[
+            edges['predecessor_task_id'].isin(bottleneck_ids) & edges['successor_task_id'].isin(bottleneck_ids)
+        ]
+        graph_edges = [
+            {'from': int(predecessor), 'to': int(successor)}
+            for predecessor, successor in zip(graph_deps['predecessor_task_id'], graph_deps['successor_task_id'])
+        ]
         
         # Estadísticas
         total_tasks = len(df)
@@ -401,7 +552,7 @@ def analyze_bottlenecks(project_id=None):
         }
         
         print(f"   ✅ Análisis completado exitosamente\n")
-        return jsonify(response_data), 200
+        return etag_response(jsonify(response_data), etag)
         
     except Exception as e:
         error_trace = traceback.format_exc()
@@ -506,12 +657,16 @@ def get_stats_by_area(project_id=None):
     Retorna estadísticas de bottlenecks por área
     """
     try:
-        df = get_process_data(project_id)
+        version = get_data_version(project_id)
+        etag = analysis_etag('stats-by-area', project_id, version)
+        if not_modified(etag):
+            return etag_response(None, etag)
         
-        if len(df) == 0:
-            return jsonify({'areas': []}), 200
+        # Mismo resultado que /analyze (en caché mientras la versión no cambie)
+        df, _ = get_analysis(project_id, version)
         
-        df = predict_bottlenecks(df)
+        if len(df) == 0:
+            return etag_response(jsonify({'areas': []}), etag)
         
         # Agrupar por área
         area_stats = df.groupby('area').agg({
@@ -535,7 +690,7 @@ def get_stats_by_area(project_id=None):
                 'avg_delay': round(row['avg_delay'], 2)
             })
         
-        return jsonify({'areas': areas}), 200
+        return etag_response(jsonify({'areas': areas}), etag)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
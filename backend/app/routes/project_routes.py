@@ -9,6 +9,11 @@ from app.models.task_dependency import WebTaskDependency
 from app.models.web_task import WebTask
 from app.models.web_user import WebUser
 from app.models.meeting import Meeting
+from app.ml.analysis_cache import analysis_cache
+from app.services.graph_store import graph_store
+from app.services.critical_path import critical_path_service, DependencyCycleError
+from app.services.schedule_simulation import schedule_simulator, completion_dates
+from app.services.project_stats import project_stats_service
 from app.utils.permissions import (
     get_current_user, 
     apply_area_filter,
@@ -17,6 +22,8 @@ from app.utils.permissions import (
 )
 from sqlalchemy import func
 from sqlalchemy.orm import joinedload
+from datetime import timedelta
+import math
 
 project_bp = Blueprint('projects', __name__)
 
@@ -45,8 +52,14 @@ def get_projects():
         
         projects = query.all()
         
+        # Estadísticas de todos los proyectos juntos (una consulta agrupada por métrica)
+        stats = project_stats_service.get_many([p.project_id for p in projects]) if include_stats else {}
+        
         # Debug: Ver qué devuelve to_dict para el primer proyecto
-        projects_data = [p.to_dict(include_tasks=include_tasks, include_stats=include_stats) for p in projects]
+        projects_data = [
+            p.to_dict(include_tasks=include_tasks, include_stats=include_stats, stats=stats.get(p.project_id))
+            for p in projects
+        ]
         if projects_data:
             print("\n=== DEBUG: Primer proyecto en JSON ===")
             import json
@@ -169,8 +182,12 @@ def delete_project(project_id):
         project = Project.query.get_or_404(project_id)
         
         # Las tareas quedan con project_id NULL (SET NULL)
+        project_stats_service.remove_project(project_id)
         db.session.delete(project)
         db.session.commit()
+        graph_store.invalidate(project_id)
+        critical_path_service.invalidate(project_id)
+        analysis_cache.invalidate(project_id)
         
         return jsonify({
             'status': 'success',
@@ -200,35 +217,102 @@ def get_project_graph(project_id):
 @project_bp.route('/projects/<project_id>/critical-path', methods=['GET'])
 def get_critical_path(project_id):
     """
-    Calcula el camino crítico del proyecto
-    TODO: Implementar algoritmo CPM (Critical Path Method)
+    Calcula el camino crítico del proyecto (CPM)
+    
+    Query params:
+        - durations: 'estimate' (estimated_hours; modelo si falta, por defecto) o 'model'
+    
+    Returns:
+        JSON con la duración del proyecto, la cadena crítica y, por tarea,
+        inicio/fin más tempranos y más tardíos (días desde el inicio) y holgura
     """
     try:
         project = Project.query.get_or_404(project_id)
+        durations = request.args.get('durations', 'estimate')
         
-        # Placeholder: retornar tareas con más dependencias
-        tasks = WebTask.query.filter_by(project_id=project_id).all()
-        dependencies = WebTaskDependency.query.filter_by(project_id=project_id).all()
+        try:
+            result = critical_path_service.analyze(project_id, durations)
+        except DependencyCycleError as e:
+            return jsonify({
+                'status': 'error',
+                'message': 'El grafo de dependencias tiene ciclos',
+                'cycle_tasks': e.tasks
+            }), 409
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        
+        tasks = sorted(result['tasks'].items(), key=lambda item: (item[1]['earliest_start'], item[0]))
+        
+        estimated_end_date = None
+        if project.start_date:
+            estimated_end_date = project.start_date + timedelta(days=math.ceil(result['project_duration_days']))
+        
+        return jsonify({
+            'status': 'success',
+            'project_id': project_id,
+            'duration_source': result['duration_source'],
+            'project_duration_days': result['project_duration_days'],
+            'start_date': project.start_date.isoformat() if project.start_date else None,
+            'estimated_end_date': estimated_end_date.isoformat() if estimated_end_date else None,
+            'critical_path': result['critical_path'],
+            'tasks': [dict(values, task_id=task_id) for task_id, values in tasks],
+            'tasks_estimated_by_model': result['tasks_estimated_by_model']
+        }), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@project_bp.route('/projects/<project_id>/simulation', methods=['GET'])
+@jwt_required()
+def simulate_project_schedule(project_id):
+    """
+    Simulación Monte Carlo del término del proyecto
+    
+    Query params:
+        - trials: número de corridas (por defecto SCHEDULE_SIMULATION_TRIALS)
+        - seed: semilla (opcional; por defecto el resultado es reproducible por proyecto)
+    
+    Returns:
+        JSON con días y fechas P50/P80/P95 de término, probabilidad de terminar
+        antes de expected_end_date e índice de criticidad por tarea
+    """
+    try:
+        project = Project.query.get_or_404(project_id)
         
-        # Contar dependencias por tarea
-        task_deps = {}
-        for task in tasks:
-            pred_count = len([d for d in dependencies if d.successor_task_id == task.id])
-            succ_count = len([d for d in dependencies if d.predecessor_task_id == task.id])
-            task_deps[task.id] = {
-                'task': task.to_dict(),
-                'predecessor_count': pred_count,
-                'successor_count': succ_count,
-                'total_connections': pred_count + succ_count
-            }
-        
-        # Ordenar por total de conexiones
-        critical_tasks = sorted(task_deps.values(), key=lambda x: x['total_connections'], reverse=True)
+        try:
+            trials = request.args.get('trials', type=int)
+            seed = request.args.get('seed', type=int)
+            
+            deadline_days = None
+            if project.start_date and project.expected_end_date:
+                deadline_days = (project.expected_end_date - project.start_date).days
+            
+            result = schedule_simulator.simulate(project_id, trials=trials, seed=seed, deadline_days=deadline_days)
+        except DependencyCycleError as e:
+            return jsonify({
+                'status': 'error',
+                'message': 'El grafo de dependencias tiene ciclos',
+                'cycle_tasks': e.tasks
+            }), 409
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        
+        criticality = sorted(result['criticality'].items(), key=lambda item: (-item[1], item[0]))
         
         return jsonify({
             'status': 'success',
             'project_id': project_id,
-            'critical_path_candidates': critical_tasks[:10]  # Top 10
+            'trials': result['trials'],
+            'seed': result['seed'],
+            'completion_days': result['completion_days'],
+            'completion_dates': completion_dates(project.start_date, result['completion_days']),
+            'expected_end_date': project.expected_end_date.isoformat() if project.expected_end_date else None,
+            'on_time_probability': result['on_time_probability'],
+            'criticality': [
+                {'task_id': task_id, 'criticality_index': index}
+                for task_id, index in criticality if index > 0
+            ],
+            'distributions': result['distributions']
         }), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -266,36 +350,61 @@ def create_dependency():
             if field not in data:
                 return jsonify({'status': 'error', 'message': f'{field} es requerido'}), 400
         
+        try:
+            predecessor_id = int(data['predecessor_task_id'])
+            successor_id = int(data['successor_task_id'])
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'predecessor_task_id y successor_task_id deben ser enteros'}), 400
+        
+        # Bloquear la fila del proyecto hasta el commit (primera consulta de la transacción):
+        # las altas de dependencias del proyecto se serializan entre workers y la
+        # verificación de ciclos ve las que otro worker acaba de confirmar
+        project = Project.query.filter_by(project_id=data['project_id']).with_for_update().first()
+        if not project:
+            return jsonify({'status': 'error', 'message': 'Proyecto no encontrado'}), 404
+        
         # Validar que las tareas existan
-        pred_task = WebTask.query.get(data['predecessor_task_id'])
-        succ_task = WebTask.query.get(data['successor_task_id'])
+        pred_task = WebTask.query.get(predecessor_id)
+        succ_task = WebTask.query.get(successor_id)
         
         if not pred_task or not succ_task:
             return jsonify({'status': 'error', 'message': 'Tarea no encontrada'}), 404
         
-        # Verificar que no haya ciclos (simplificado)
-        if data['predecessor_task_id'] == data['successor_task_id']:
+        if predecessor_id == successor_id:
             return jsonify({'status': 'error', 'message': 'Una tarea no puede depender de sí misma'}), 400
         
         # Verificar que no exista ya
         existing = WebTaskDependency.query.filter_by(
-            predecessor_task_id=data['predecessor_task_id'],
-            successor_task_id=data['successor_task_id']
+            predecessor_task_id=predecessor_id,
+            successor_task_id=successor_id
         ).first()
         
         if existing:
             return jsonify({'status': 'error', 'message': 'La dependencia ya existe'}), 400
         
+        # Verificar que no cree un ciclo (solo se recorre la región entre las dos tareas del orden
+        # topológico) sobre el snapshot revalidado contra la BD dentro de la transacción bloqueada
+        cycle = graph_store.get(project.project_id, revalidate=True).find_cycle(predecessor_id, successor_id)
+        if cycle:
+            return jsonify({
+                'status': 'error',
+                'message': 'La dependencia crearía un ciclo',
+                'cycle': cycle
+            }), 409
+        
         dependency = WebTaskDependency(
-            project_id=data['project_id'],
-            predecessor_task_id=data['predecessor_task_id'],
-            successor_task_id=data['successor_task_id'],
+            project_id=project.project_id,
+            predecessor_task_id=predecessor_id,
+            successor_task_id=successor_id,
             dependency_type=data.get('dependency_type', 'finish_to_start'),
             lag_days=data.get('lag_days', 0)
         )
         
         db.session.add(dependency)
+        project_stats_service.record_dependency(dependency.project_id, 1)
         db.session.commit()
+        graph_store.add_dependency(dependency)
+        analysis_cache.invalidate(dependency.project_id)
         
         return jsonify({
             'status': 'success',
@@ -312,9 +421,13 @@ def delete_dependency(dependency_id):
     """Elimina una dependencia"""
     try:
         dependency = WebTaskDependency.query.get_or_404(dependency_id)
+        project_id = dependency.project_id
         
+        project_stats_service.record_dependency(project_id, -1)
         db.session.delete(dependency)
         db.session.commit()
+        graph_store.remove_dependency(project_id, dependency_id)
+        analysis_cache.invalidate(project_id)
         
         return jsonify({
             'status': 'success',
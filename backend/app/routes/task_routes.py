@@ -9,6 +9,11 @@ from datetime import datetime
 from app.extensions import db
 from app.models.web_task import WebTask
 from app.models.web_user import WebUser
+from app.ml.delay_stats import delay_stats_store
+from app.ml.analysis_cache import analysis_cache
+from app.services.graph_store import graph_store, DependencyCycleError
+from app.services.schedule_propagation import schedule_propagator, SCHEDULE_FIELDS
+from app.services.project_stats import project_stats_service, task_counter_values
 from app.utils.permissions import (
     get_current_user,
     apply_area_filter,
@@ -186,7 +191,10 @@ def create_task():
                 pass
         
         db.session.add(new_task)
+        project_stats_service.record_task(None, task_counter_values(new_task))
         db.session.commit()
+        graph_store.add_task(new_task.project_id, new_task.id)
+        analysis_cache.invalidate(new_task.project_id)
         
         return jsonify({
             'message': 'Tarea creada exitosamente',
@@ -218,7 +226,8 @@ def update_task(id):
         - colaborador: solo puede cambiar el estado
     
     Returns:
-        JSON con la tarea actualizada
+        JSON con la tarea actualizada y, si cambió estimated_hours, start_date o
+        deadline, las tareas del proyecto cuyo cronograma cambió
     """
     try:
         # Obtener usuario actual
@@ -234,6 +243,7 @@ def update_task(id):
             return jsonify({'error': 'Tarea no encontrada'}), 404
         
         data = request.get_json()
+        counter_values = task_counter_values(task)
         
         # Obtener rol del usuario
         user_role = current_user.role.name if current_user.role else 'colaborador'
@@ -266,6 +276,11 @@ def update_task(id):
                     'message': f'No se puede cambiar de "{current_status}" a "{new_status}"'
                 }), 400
         
+        # Cronograma del proyecto antes de los cambios (para propagar solo el delta)
+        schedule_projects = []
+        if task.project_id and any(field in data for field in SCHEDULE_FIELDS):
+            schedule_projects = prepare_schedules([task.project_id])
+        
         # Actualizar campos (admin y supervisor pueden editar todo)
         if 'title' in data:
             task.title = data['title']
@@ -274,6 +289,7 @@ def update_task(id):
         if 'priority' in data:
             task.priority = data['priority']
         if 'status' in data:
+            previous_status = task.status
             task.status = data['status']
             
             # Si se completa, calcular días calendario reales
@@ -315,11 +331,21 @@ def update_task(id):
             except:
                 pass
         
+        project_stats_service.record_task(counter_values, task_counter_values(task))
         db.session.commit()
+        analysis_cache.invalidate(task.project_id)
+        
+        # Actualizar las estadísticas de retraso solo en la transición a completada
+        if 'status' in data and data['status'] == 'completada' and previous_status != 'completada':
+            delay_stats_store.record_completion(task)
+        
+        # Propagar a los sucesores los cambios de duración y fechas
+        schedule_changes = propagate_schedules({project_id: [task.id] for project_id in schedule_projects})
         
         return jsonify({
             'message': 'Tarea actualizada exitosamente',
-            'task': task.to_dict()
+            'task': task.to_dict(),
+            'schedule_changes': schedule_changes.get(task.project_id)
         }), 200
         
     except Exception as e:
@@ -330,6 +356,93 @@ def update_task(id):
         }), 500
 
 
+@tasks_bp.route('/schedule', methods=['PUT'])
+@jwt_required()
+def update_task_schedules():
+    """
+    Actualizar duración y fechas de varias tareas en una sola transacción
+    
+    Body JSON:
+        - tasks: lista de {id, estimated_hours, start_date, deadline} (solo id es requerido)
+    
+    Permisos:
+        - admin/supervisor
+    
+    Returns:
+        JSON con las tareas actualizadas y, por proyecto, las tareas cuyo
+        cronograma cambió (una sola propagación por proyecto)
+    """
+    try:
+        current_user_email = get_jwt_identity()
+        current_user = WebUser.query.filter_by(email=current_user_email).first()
+        
+        if not current_user:
+            return jsonify({'error': 'Usuario no autenticado'}), 401
+        
+        user_role = current_user.role.name if current_user.role else 'colaborador'
+        if user_role == 'colaborador':
+            return jsonify({
+                'error': 'Permiso denegado',
+                'message': 'Los colaboradores no pueden cambiar el cronograma de las tareas'
+            }), 403
+        
+        data = request.get_json() or {}
+        updates = data.get('tasks')
+        
+        if not isinstance(updates, list) or not updates or not all(isinstance(item, dict) and 'id' in item for item in updates):
+            return jsonify({
+                'error': 'Campo requerido faltante',
+                'required': ['tasks[].id']
+            }), 400
+        
+        ids = [item['id'] for item in updates]
+        tasks = {task.id: task for task in WebTask.query.filter(WebTask.id.in_(ids)).all()}
+        missing = [task_id for task_id in ids if task_id not in tasks]
+        
+        if missing:
+            return jsonify({'error': 'Tarea no encontrada', 'missing': missing}), 404
+        
+        # Cronograma de cada proyecto antes de los cambios
+        schedule_projects = prepare_schedules({task.project_id for task in tasks.values() if task.project_id})
+        
+        for item in updates:
+            task = tasks[item['id']]
+            if 'estimated_hours' in item:
+                task.estimated_hours = item['estimated_hours']
+            for field in ('start_date', 'deadline'):
+                if item.get(field):
+                    try:
+                        setattr(task, field, datetime.fromisoformat(item[field].replace('Z', '+00:00')))
+                    except (AttributeError, ValueError):
+                        db.session.rollback()
+                        return jsonify({
+                            'error': 'Fecha inválida',
+                            'message': f'{field} de la tarea {task.id} debe estar en formato ISO 8601'
+                        }), 400
+        
+        db.session.commit()
+        for project_id in {task.project_id for task in tasks.values()}:
+            analysis_cache.invalidate(project_id)
+        
+        edited = {}
+        for task in tasks.values():
+            if task.project_id in schedule_projects:
+                edited.setdefault(task.project_id, []).append(task.id)
+        
+        return jsonify({
+            'message': f'{len(tasks)} tareas actualizadas exitosamente',
+            'tasks': [task.to_dict() for task in tasks.values()],
+            'schedule_changes': propagate_schedules(edited)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Error al actualizar tareas',
+            'details': str(e)
+        }), 500
+
+
 @tasks_bp.route('/<int:id>', methods=['DELETE'])
 def delete_task(id):
     """
@@ -347,9 +460,16 @@ def delete_task(id):
         if not task:
             return jsonify({'error': 'Tarea no encontrada'}), 404
         
+        project_id = task.project_id
+        
+        project_stats_service.record_task_deleted(task)
         db.session.delete(task)
         db.session.commit()
         
+        # Las dependencias de la tarea se eliminan en cascada
+        graph_store.remove_task(project_id, id)
+        analysis_cache.invalidate(project_id)
+        
         return jsonify({
             'message': 'Tarea eliminada exitosamente'
         }), 200
@@ -405,3 +525,36 @@ def get_stats():
             'error': 'Error al obtener estadísticas',
             'details': str(e)
         }), 500
+
+
+def prepare_schedules(project_ids):
+    """
+    Estado del cronograma de cada proyecto antes de modificar sus tareas
+    
+    Returns:
+        list de proyectos listos para propagar (los que tienen dependencias circulares se omiten)
+    """
+    ready = []
+    for project_id in project_ids:
+        try:
+            schedule_propagator.prepare(project_id)
+            ready.append(project_id)
+        except DependencyCycleError as e:
+            print(f"   ⚠️ Cronograma sin propagar: {str(e)}")
+    return ready
+
+
+def propagate_schedules(edited):
+    """
+    Propagar los cambios confirmados de cada proyecto ({project_id: [task_id]})
+    
+    Returns:
+        dict {project_id: tareas cuyo cronograma cambió}
+    """
+    changes = {}
+    for project_id, task_ids in edited.items():
+        try:
+            changes[project_id] = schedule_propagator.apply(project_id, task_ids)
+        except DependencyCycleError as e:
+            print(f"   ⚠️ Cronograma sin propagar: {str(e)}")
+    return changes
@@ -1,9 +1,20 @@
 """
 APScheduler para entrenamientos automáticos programados
+
+Con varios procesos (workers de gunicorn) solo uno ejecuta los jobs: el que
+obtiene el lock de TRAINING_SCHEDULER_LOCK_FILE. Los demás inician el scheduler
+en pausa. Los reentrenamientos que se programan desde la API
+(schedule_training_simple) se guardan en la tabla apscheduler_jobs, así que
+cualquier worker puede crearlos, listarlos o eliminarlos y el que tiene el lock
+los toma (revisa la tabla cada TRAINING_SCHEDULER_SYNC_SECONDS).
 """
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_STOPPED
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime
+from sqlalchemy import inspect
+import tempfile
 from app.extensions import db
 from app.models.training_schedule import TrainingSchedule
 from app.models.ml_models import MLModel
@@ -23,6 +34,10 @@ TRAINING_SCRIPTS = {
     'simulation': 'ml/models/training/train_bottleneck_predictor_FIXED.py'
 }
 
+# Job store compartido entre procesos (jobs creados desde la API)
+SHARED_JOBSTORE = 'shared'
+SYNC_JOB_ID = 'training_scheduler_sync'
+
 
 class TrainingScheduler:
     """Gestiona programaciones de entrenamiento automático"""
@@ -30,21 +45,68 @@ class TrainingScheduler:
     def __init__(self, app=None):
         self.scheduler = BackgroundScheduler()
         self.app = app
+        self.is_leader = False
+        self._lock_file = None
         if app:
             self.init_app(app)
     
     def init_app(self, app):
-        """Inicializa el scheduler con la app Flask"""
+        """
+        Inicializa el scheduler con la app Flask
+        
+        Con gunicorn en modo preload se llama en post_fork (nunca en el master:
+        el hilo del scheduler no sobrevive al fork).
+        """
+        if self.scheduler.state != STATE_STOPPED:
+            return  # Ya iniciado en este proceso (p. ej. create_app desde un job)
+        
         self.app = app
         
-        # Configuración del scheduler
-        self.scheduler.start()
+        with app.app_context():
+            store = SQLAlchemyJobStore(engine=db.engine, tablename='apscheduler_jobs')
+            create_jobs_table(store)
+            self.scheduler.add_jobstore(store, alias=SHARED_JOBSTORE)
+        
+        # Solo el proceso con el lock ejecuta jobs; el resto solo los administra
+        self.is_leader = self._acquire_lock(app.config.get('TRAINING_SCHEDULER_LOCK_FILE'))
+        self.scheduler.start(paused=not self.is_leader)
+        
+        if self.is_leader:
+            # Despertar periódicamente para tomar los jobs que agregan otros procesos
+            self.scheduler.add_job(
+                func=_sync_shared_jobs,
+                trigger='interval',
+                seconds=app.config.get('TRAINING_SCHEDULER_SYNC_SECONDS', 60),
+                id=SYNC_JOB_ID,
+                replace_existing=True
+            )
         
         # Cargar schedules existentes
         with app.app_context():
             self.load_schedules()
         
-        print("✅ Training Scheduler iniciado")
+        role = "ejecuta los jobs" if self.is_leader else "en pausa, otro proceso ejecuta los jobs"
+        print(f"✅ Training Scheduler iniciado (pid {os.getpid()}, {role})")
+    
+    def _acquire_lock(self, path):
+        """
+        Lock exclusivo no bloqueante sobre un archivo; se libera al terminar el proceso
+        """
+        try:
+            import fcntl
+        except ImportError:
+            return True  # Sin fcntl (Windows): un solo proceso
+        
+        path = path or os.path.join(tempfile.gettempdir(), 'training_scheduler.lock')
+        lock_file = open(path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        
+        self._lock_file = lock_file
+        return True
     
     
     def load_schedules(self):
@@ -333,11 +395,14 @@ class TrainingScheduler:
         job_id = f'retrain_{model_type}_scheduled'
         
         self.scheduler.add_job(
-            func=self.execute_training_script,
+            func=run_training_script,
             trigger=trigger,
             args=[model_type],
             id=job_id,
+            jobstore=SHARED_JOBSTORE,
             replace_existing=True,
+            misfire_grace_time=3600,  # El proceso que ejecuta puede tomarlo hasta un ciclo de sync después
+            coalesce=True,
             name=f'Reentrenamiento: {model_type}'
         )
         
@@ -349,6 +414,8 @@ class TrainingScheduler:
         """Obtiene todos los jobs programados"""
         jobs = []
         for job in self.scheduler.get_jobs():
+            if job.id == SYNC_JOB_ID:
+                continue
             jobs.append({
                 'id': job.id,
                 'name': job.name,
@@ -369,5 +436,30 @@ class TrainingScheduler:
             return False
 
 
+def run_training_script(model_type):
+    """
+    Job del job store compartido (referenciable por nombre, no un método ligado)
+    """
+    return training_scheduler.execute_training_script(model_type)
+
+
+def create_jobs_table(store):
+    """
+    Crear la tabla del job store compartido (database/09_create_apscheduler_jobs.sql);
+    los workers arrancan a la vez y otro puede crearla entre la verificación y el CREATE
+    """
+    try:
+        store.jobs_t.create(store.engine, checkfirst=True)
+    except Exception:
+        if not inspect(store.engine).has_table(store.jobs_t.name):
+            raise
+
+
+def _sync_shared_jobs():
+    """
+    Sin trabajo: solo hace que el scheduler vuelva a leer el job store compartido
+    """
+
+
 # Instancia global
 training_scheduler = TrainingScheduler()
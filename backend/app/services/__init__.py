@@ -0,0 +1,4 @@
+"""
+Servicios de Dominio - Inicialización
+Estructuras en memoria y cálculos de planificación compartidos por las rutas
+"""
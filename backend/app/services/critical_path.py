@@ -0,0 +1,361 @@
+"""
+Ruta Crítica (CPM) por Proyecto
+Fechas más tempranas/tardías, holgura y cadena crítica sobre web_task_dependencies
+
+El cálculo usa el grafo en memoria del proyecto (graph_store) y recorre las
+tareas en el orden topológico que este mantiene: una pasada hacia adelante
+(inicio/fin más tempranos) y otra hacia atrás (inicio/fin más tardíos), en
+O(V + E). Las dependencias respetan su tipo y lag_days (días, puede ser
+negativo):
+
+- finish_to_start:  inicio(sucesor) >= fin(predecesor) + lag
+- start_to_start:   inicio(sucesor) >= inicio(predecesor) + lag
+- finish_to_finish: fin(sucesor)    >= fin(predecesor) + lag
+- start_to_finish:  fin(sucesor)    >= inicio(predecesor) + lag
+
+Duraciones (días): estimated_hours / 8; las tareas sin estimación se predicen
+con el modelo de duración (modo genérico, una sola llamada para todas). Con
+durations='model' se usa el modelo para todas las tareas.
+
+El resultado se guarda por proyecto junto con el snapshot del grafo con el que
+se calculó y la versión de las duraciones (conteo, última modificación y
+sumas de estimated_hours/complexity_score de las tareas): mientras no cambien,
+la respuesta sale de memoria.
+"""
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import func, or_
+
+from app.extensions import db
+from app.ml.model_registry import model_registry
+from app.services.graph_store import graph_store, DependencyCycleError
+
+
+HOURS_PER_DAY = 8
+DURATION_SOURCES = ('estimate', 'model')
+
+# Tolerancia para considerar cero la holgura (sumas de duraciones en días)
+SLACK_TOLERANCE = 1e-6
+
+
+class CriticalPathService:
+    """
+    CPM por proyecto con caché LRU por snapshot del grafo y versión de duraciones
+    """
+    
+    def __init__(self, app=None):
+        self.max_entries = 128
+        self._entries = OrderedDict()  # {(project_id, fuente): (grafo, versión, resultado)}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Tomar el tamaño de la caché de la configuración de la app
+        """
+        with self._lock:
+            self.max_entries = app.config.get('CRITICAL_PATH_CACHE_SIZE', self.max_entries)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def analyze(self, project_id, durations='estimate'):
+        """
+        Ruta crítica del proyecto
+        
+        Args:
+            project_id: ID del proyecto
+            durations: 'estimate' (estimated_hours, modelo si falta) o 'model'
+        
+        Returns:
+            dict con project_duration_days, critical_path (ids en orden) y
+            tasks {task_id: {duration_days, earliest_start, earliest_finish,
+            latest_start, latest_finish, slack, is_critical}}
+        
+        Raises:
+            ValueError: fuente de duraciones desconocida
+            DependencyCycleError: el grafo tiene ciclos
+        """
+        if durations not in DURATION_SOURCES:
+            raise ValueError(f"durations debe ser uno de: {', '.join(DURATION_SOURCES)}")
+        
+        graph = graph_store.get(project_id)
+        external = graph.nodes - graph.tasks
+        version = duration_version(project_id, external)
+        if durations == 'model' or version[-1]:
+            version += (model_registry.get('duration')['token'],)
+        
+        key = (project_id, durations)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] is graph and item[1] == version:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return item[2]
+            self._stats['misses'] += 1
+        
+        task_durations, estimated_by_model = load_durations(project_id, external, durations)
+        order = graph.topological_order()
+        result = compute_schedule(order, graph.edges.values(), task_durations)
+        result['duration_source'] = durations
+        result['tasks_estimated_by_model'] = estimated_by_model
+        
+        with self._lock:
+            self._entries[key] = (graph, version, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        
+        return result
+    
+    def invalidate(self, project_id=None):
+        """
+        Eliminar los resultados de un proyecto (o todos)
+        """
+        with self._lock:
+            if project_id is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == project_id]:
+                del self._entries[key]
+    
+    def stats(self):
+        """
+        Estadísticas de la caché con tasa de aciertos
+        """
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                hit_rate=round(self._stats['hits'] / lookups, 4) if lookups else 0,
+                entries=len(self._entries),
+                max_entries=self.max_entries
+            )
+
+
+def compute_schedule(order, edges, durations):
+    """
+    Pasadas hacia adelante y hacia atrás del CPM (días desde el inicio del proyecto)
+    
+    Args:
+        order: tareas en orden topológico
+        edges: tuplas (predecesor, sucesor, tipo, lag_days)
+        durations: {tarea: duración en días} (0 si falta)
+    
+    Returns:
+        dict {project_duration_days, critical_path, tasks}
+    """
+    outgoing, incoming = edge_index(edges)
+    duration = {task: float(durations.get(task) or 0) for task in order}
+    earliest_start, earliest_finish = forward_pass(order, outgoing, duration)
+    
+    project_duration = max(earliest_finish.values(), default=0.0)
+    
+    # Pasada hacia atrás: cada tarea toma la restricción más fuerte de sus sucesores
+    latest_finish = {}
+    latest_start = {}
+    for task in reversed(order):
+        finish = project_duration
+        for predecessor, successor, dependency_type, lag_days in outgoing.get(task, ()):
+            if dependency_type == 'start_to_start':
+                bound = latest_start[successor] - lag_days + duration[task]
+            elif dependency_type == 'finish_to_finish':
+                bound = latest_finish[successor] - lag_days
+            elif dependency_type == 'start_to_finish':
+                bound = latest_finish[successor] - lag_days + duration[task]
+            else:
+                bound = latest_start[successor] - lag_days
+            if bound < finish:
+                finish = bound
+        latest_finish[task] = finish
+        latest_start[task] = finish - duration[task]
+    
+    tasks = {}
+    for task in order:
+        slack = latest_start[task] - earliest_start[task]
+        tasks[task] = {
+            'duration_days': round(duration[task], 2),
+            'earliest_start': round(earliest_start[task], 2),
+            'earliest_finish': round(earliest_finish[task], 2),
+            'latest_start': round(latest_start[task], 2),
+            'latest_finish': round(latest_finish[task], 2),
+            'slack': round(slack, 2),
+            'is_critical': slack <= SLACK_TOLERANCE
+        }
+    
+    return {
+        'project_duration_days': round(project_duration, 2),
+        'critical_path': critical_chain(order, incoming, duration, earliest_start, earliest_finish, tasks, project_duration),
+        'tasks': tasks
+    }
+
+
+def edge_index(edges):
+    """
+    Dependencias (predecesor, sucesor, tipo, lag_days) agrupadas por predecesor y por sucesor
+    
+    Returns:
+        tuple ({predecesor: [arista]}, {sucesor: [arista]}) con lag_days en float
+    """
+    outgoing = {}
+    incoming = {}
+    for predecessor, successor, dependency_type, lag_days in edges:
+        edge = (predecessor, successor, dependency_type, float(lag_days or 0))
+        outgoing.setdefault(predecessor, []).append(edge)
+        incoming.setdefault(successor, []).append(edge)
+    return outgoing, incoming
+
+
+def forward_pass(order, outgoing, duration, release=None):
+    """
+    Pasada hacia adelante: cada tarea empuja su restricción a los sucesores
+    
+    Args:
+        release: {tarea: día mínimo de inicio} opcional (0 si falta)
+    
+    Returns:
+        tuple ({tarea: inicio más temprano}, {tarea: fin más temprano})
+    """
+    earliest_start = dict.fromkeys(order, 0.0)
+    if release:
+        earliest_start.update((task, day) for task, day in release.items() if task in earliest_start)
+    earliest_finish = {}
+    for task in order:
+        earliest_finish[task] = earliest_start[task] + duration[task]
+        for edge in outgoing.get(task, ()):
+            successor = edge[1]
+            start = successor_start(edge, earliest_start[task], earliest_finish[task], duration[successor])
+            if start > earliest_start[successor]:
+                earliest_start[successor] = start
+    return earliest_start, earliest_finish
+
+
+def successor_start(edge, start, finish, successor_duration):
+    """
+    Inicio más temprano que impone una dependencia a su sucesor
+    """
+    dependency_type, lag_days = edge[2], edge[3]
+    if dependency_type == 'start_to_start':
+        return start + lag_days
+    if dependency_type == 'finish_to_finish':
+        return finish + lag_days - successor_duration
+    if dependency_type == 'start_to_finish':
+        return start + lag_days - successor_duration
+    return finish + lag_days
+
+
+def critical_chain(order, incoming, duration, earliest_start, earliest_finish, tasks, project_duration):
+    """
+    Cadena crítica: desde la tarea crítica que termina el proyecto, hacia atrás por
+    las dependencias que fijan el inicio de cada tarea (restricción sin holgura)
+    
+    Si varias terminan el último día se parte de la última en orden topológico, para
+    no cortar la cadena en una tarea cuyo sucesor (p. ej. finish_to_finish) también termina ese día.
+    """
+    ends = [task for task in order
+            if tasks[task]['is_critical'] and project_duration - earliest_finish[task] <= SLACK_TOLERANCE]
+    if not ends:
+        return []
+    
+    chain = [ends[-1]]
+    visited = {ends[-1]}
+    while True:
+        task = chain[-1]
+        driver = None
+        for edge in incoming.get(task, ()):
+            predecessor = edge[0]
+            if predecessor in visited or not tasks[predecessor]['is_critical']:
+                continue
+            start = successor_start(edge, earliest_start[predecessor], earliest_finish[predecessor], duration[task])
+            if abs(start - earliest_start[task]) <= SLACK_TOLERANCE:
+                driver = predecessor
+                break
+        if driver is None:
+            break
+        chain.append(driver)
+        visited.add(driver)
+    
+    chain.reverse()
+    return chain
+
+
+def task_scope(project_id, external):
+    """
+    Filtro de web_tasks del proyecto más las tareas de otros proyectos enlazadas por dependencias
+    """
+    from app.models.web_task import WebTask
+    
+    if external:
+        return or_(WebTask.project_id == project_id, WebTask.id.in_(list(external)))
+    return WebTask.project_id == project_id
+
+
+def duration_version(project_id, external):
+    """
+    Versión de las duraciones: (conteo, última modificación, suma de estimated_hours,
+    suma de complexity_score, tareas sin estimación)
+    """
+    from app.models.web_task import WebTask
+    
+    row = db.session.query(
+        func.count(WebTask.id), func.max(WebTask.updated_at),
+        func.sum(WebTask.estimated_hours), func.sum(WebTask.complexity_score),
+        func.sum(func.coalesce(WebTask.estimated_hours, 0) <= 0)
+    ).filter(task_scope(project_id, external)).one()
+    
+    return tuple(str(value) for value in row[:-1]) + (int(row[-1] or 0),)
+
+
+def load_durations(project_id, external, source):
+    """
+    Duración en días de cada tarea del proyecto
+    
+    Returns:
+        tuple ({task_id: días}, tareas estimadas con el modelo)
+    """
+    from app.models.web_task import WebTask
+    
+    rows = db.session.query(
+        WebTask.id, WebTask.estimated_hours, WebTask.complexity_score
+    ).filter(task_scope(project_id, external)).all()
+    
+    return task_durations(rows, source)
+
+
+def task_durations(rows, source='estimate'):
+    """
+    Duración en días de filas (id, estimated_hours, complexity_score), con una
+    sola llamada al modelo para las que lo necesitan
+    
+    Returns:
+        tuple ({task_id: días}, tareas estimadas con el modelo)
+    """
+    from app.ml.duration_model import predict_task_durations
+    from app.ml.risk_model import complexity_level_from_score
+    
+    durations = {}
+    pending = []
+    for task_id, estimated_hours, complexity_score in rows:
+        estimated_days = float(estimated_hours) / HOURS_PER_DAY if estimated_hours and estimated_hours > 0 else None
+        if source == 'estimate' and estimated_days is not None:
+            durations[task_id] = estimated_days
+            continue
+        
+        task_data = {'complexity_level': complexity_level_from_score(complexity_score)}
+        if estimated_days is not None:
+            task_data['duration_est_days'] = estimated_days
+        pending.append((task_id, task_data))
+    
+    if pending:
+        predicted = predict_task_durations([task_data for _, task_data in pending])
+        for (task_id, _), days in zip(pending, predicted):
+            durations[task_id] = float(days)
+    
+    return durations, len(pending)
+
+
+# Instancia global
+critical_path_service = CriticalPathService()
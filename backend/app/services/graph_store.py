@@ -0,0 +1,709 @@
+"""
+Grafo de Dependencias en Memoria por Proyecto
+Adyacencia compacta de web_task_dependencies, actualizada en cada escritura
+
+Cada proyecto se carga una vez desde la BD (tareas y dependencias) a un
+snapshot inmutable (ProjectGraph): diccionarios de sucesores y predecesores
+con conjuntos de ids de tarea. Las rutas que escriben dependencias o tareas
+aplican el cambio sobre el snapshot vigente (copia de los diccionarios y de los
+dos conjuntos afectados) y lo reemplazan de forma atómica, así que los lectores
+siempre ven un grafo consistente sin consultar la BD.
+
+Métricas derivadas:
+- grados: salen directamente del tamaño de los conjuntos, siempre al día
+- descendientes y betweenness: se calculan bajo demanda por componente
+  débilmente conexa y se guardan en el snapshot; un cambio de arista solo
+  descarta las componentes de sus dos extremos, el resto pasa al snapshot nuevo
+
+Orden topológico: se calcula una vez por carga (Kahn) y luego se mantiene en
+línea con el algoritmo de Pearce–Kelly. Al agregar u → v con posición(v) <
+posición(u) solo se recorren las tareas con posiciones entre las dos (las
+alcanzables desde v y las que llegan a u) y se reasignan sus posiciones; si v
+alcanza a u la arista crearía un ciclo (find_cycle, usado por la ruta que crea
+dependencias para rechazarla). Quitar aristas o tareas nunca invalida el orden.
+El orden lo reutilizan la ruta crítica, la simulación y el conteo de
+descendientes.
+
+Los cambios hechos por otros workers se detectan revalidando cada proyecto
+cada GRAPH_STORE_REFRESH_SECONDS (conteo y máximo id/updated_at de tareas y
+dependencias); si la versión cambió, el proyecto se recarga.
+"""
+import time
+import threading
+from collections import OrderedDict, deque
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.ml.graph_reachability import descendant_counts
+from app.ml.graph_centrality import centrality_service
+
+
+EMPTY = frozenset()
+
+
+class DependencyCycleError(Exception):
+    """
+    El grafo de dependencias del proyecto tiene ciclos (no hay orden topológico)
+    """
+    
+    def __init__(self, project_id, tasks):
+        self.project_id = project_id
+        self.tasks = sorted(tasks)
+        super().__init__(f'El proyecto {project_id} tiene dependencias circulares entre {len(self.tasks)} tareas')
+
+
+class ProjectGraph:
+    """
+    Snapshot inmutable del grafo de dependencias de un proyecto
+    
+    No se modifica después de publicarse: los métodos with_*/without_*
+    devuelven un snapshot nuevo.
+    """
+    
+    def __init__(self, project_id, tasks, edges, successors, predecessors, pair_counts,
+                 data_version=None, revision=0, metrics=None, order=None):
+        self.project_id = project_id
+        self.tasks = tasks                  # frozenset de ids de web_tasks del proyecto
+        self.edges = edges                  # {dependency_id: (predecesor, sucesor, tipo, lag_days)}
+        self.successors = successors        # {tarea: frozenset de sucesores}
+        self.predecessors = predecessors    # {tarea: frozenset de predecesores}
+        self.pair_counts = pair_counts      # {(predecesor, sucesor): filas con ese par}
+        self.data_version = data_version
+        self.revision = revision            # cambios aplicados en memoria desde la carga
+        self.checked_at = time.monotonic()
+        self._metrics = metrics if metrics is not None else {}  # {frozenset(componente): métricas}
+        self._component_of = None
+        self._order_state = order          # ({tarea: posición}, próxima posición libre) o None si no se calculó
+        self._cycle = None                 # Tareas en ciclos si el grafo no es acíclico
+        self._order = None
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def build(cls, project_id, task_ids, dependency_rows, data_version=None):
+        """
+        Snapshot a partir de los ids de tareas y las filas (id, predecesor, sucesor, tipo, lag_days)
+        """
+        edges = {}
+        successors = {}
+        predecessors = {}
+        pair_counts = {}
+        
+        for dependency_id, predecessor, successor, dependency_type, lag_days in dependency_rows:
+            edges[dependency_id] = (predecessor, successor, dependency_type, lag_days or 0)
+            pair = (predecessor, successor)
+            pair_counts[pair] = pair_counts.get(pair, 0) + 1
+            successors.setdefault(predecessor, set()).add(successor)
+            predecessors.setdefault(successor, set()).add(predecessor)
+        
+        return cls(
+            project_id, frozenset(task_ids), edges,
+            {task: frozenset(values) for task, values in successors.items()},
+            {task: frozenset(values) for task, values in predecessors.items()},
+            pair_counts, data_version=data_version
+        )
+    
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    
+    @property
+    def nodes(self):
+        """
+        Tareas del proyecto más los extremos de sus dependencias
+        """
+        return self.tasks.union(self.successors, self.predecessors)
+    
+    def edge_pairs(self):
+        """
+        Pares (predecesor, sucesor) distintos
+        """
+        return list(self.pair_counts)
+    
+    def in_degree(self, task_id):
+        return len(self.predecessors.get(task_id, EMPTY))
+    
+    def out_degree(self, task_id):
+        return len(self.successors.get(task_id, EMPTY))
+    
+    def positions(self):
+        """
+        {tarea: posición} de un orden topológico (las posiciones son enteros distintos, no necesariamente consecutivos)
+        
+        Raises:
+            DependencyCycleError: si el grafo tiene ciclos
+        """
+        state = self._topological_state()
+        if state is None:
+            raise DependencyCycleError(self.project_id, self._cycle)
+        return state[0]
+    
+    def topological_order(self):
+        """
+        Tareas en orden topológico (lista compartida: no modificar)
+        
+        Raises:
+            DependencyCycleError: si el grafo tiene ciclos
+        """
+        if self._order is None:
+            positions = self.positions()
+            nodes = self.nodes
+            self._order = [task for task in sorted(positions, key=positions.__getitem__) if task in nodes]
+        return self._order
+    
+    def find_cycle(self, predecessor, successor):
+        """
+        Ciclo que crearía la dependencia predecesor → sucesor
+        
+        Solo se recorren las tareas con posición entre la del sucesor y la del
+        predecesor; si el predecesor ya va antes que el sucesor no hay ciclo posible.
+        
+        Returns:
+            list con el camino sucesor → ... → predecesor, o None si no hay ciclo
+        """
+        if predecessor == successor:
+            return [predecessor]
+        
+        state = self._topological_state()
+        upper = None
+        if state is not None:
+            positions = state[0]
+            if predecessor not in positions or successor not in positions:
+                return None  # Tarea sin dependencias todavía
+            if positions[predecessor] < positions[successor]:
+                return None
+            upper = positions[predecessor]
+        
+        parents = {successor: None}
+        stack = [successor]
+        while stack:
+            task = stack.pop()
+            for nxt in self.successors.get(task, EMPTY):
+                if nxt in parents or (upper is not None and positions[nxt] > upper):
+                    continue
+                parents[nxt] = task
+                if nxt == predecessor:
+                    path = [nxt]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    return path[::-1]
+                stack.append(nxt)
+        
+        return None
+    
+    def descendant_counts(self):
+        """
+        {tarea: número de descendientes} (igual a len(nx.descendants(G, tarea)))
+        """
+        return self._derived('descendants')
+    
+    def betweenness(self):
+        """
+        {tarea: betweenness normalizada en el proyecto} (misma escala que nx.betweenness_centrality)
+        """
+        raw = self._derived('betweenness')
+        n_nodes = len(self.nodes)
+        if n_nodes <= 2:
+            return dict.fromkeys(raw, 0.0)
+        
+        scale = 1.0 / ((n_nodes - 1) * (n_nodes - 2))
+        return {task: value * scale for task, value in raw.items()}
+    
+    # ------------------------------------------------------------------
+    # Escritura (snapshot nuevo)
+    # ------------------------------------------------------------------
+    
+    def with_edge(self, dependency_id, predecessor, successor, dependency_type='finish_to_start', lag_days=0):
+        """
+        Snapshot con la dependencia agregada (o reemplazada si ya existía ese id)
+        """
+        graph = self.without_edge(dependency_id) if dependency_id in self.edges else self
+        
+        edges = dict(graph.edges)
+        edges[dependency_id] = (predecessor, successor, dependency_type, lag_days or 0)
+        pair = (predecessor, successor)
+        pair_counts = dict(graph.pair_counts)
+        pair_counts[pair] = pair_counts.get(pair, 0) + 1
+        
+        # Otra fila con el mismo par: la adyacencia no cambia
+        if pair_counts[pair] > 1:
+            return graph._replace(edges=edges, pair_counts=pair_counts, metrics=graph._metrics, order=graph._order_state)
+        
+        successors = dict(graph.successors)
+        successors[predecessor] = successors.get(predecessor, EMPTY) | {successor}
+        predecessors = dict(graph.predecessors)
+        predecessors[successor] = predecessors.get(successor, EMPTY) | {predecessor}
+        
+        order = None
+        if graph._order_state is not None:
+            order = reorder(graph._order_state, predecessor, successor, successors, predecessors)
+        
+        return graph._replace(
+            edges=edges, successors=successors, predecessors=predecessors, pair_counts=pair_counts,
+            metrics=graph._metrics_without(predecessor, successor), order=order
+        )
+    
+    def without_edge(self, dependency_id):
+        """
+        Snapshot sin la dependencia (el mismo si no existe)
+        """
+        if dependency_id not in self.edges:
+            return self
+        
+        edges = dict(self.edges)
+        predecessor, successor = edges.pop(dependency_id)[:2]
+        pair = (predecessor, successor)
+        pair_counts = dict(self.pair_counts)
+        pair_counts[pair] -= 1
+        
+        if pair_counts[pair] > 0:
+            return self._replace(edges=edges, pair_counts=pair_counts, metrics=self._metrics, order=self._order_state)
+        
+        del pair_counts[pair]
+        successors = dict(self.successors)
+        successors[predecessor] = successors[predecessor] - {successor}
+        if not successors[predecessor]:
+            del successors[predecessor]
+        predecessors = dict(self.predecessors)
+        predecessors[successor] = predecessors[successor] - {predecessor}
+        if not predecessors[successor]:
+            del predecessors[successor]
+        
+        # Quitar una arista no invalida el orden topológico
+        return self._replace(
+            edges=edges, successors=successors, predecessors=predecessors, pair_counts=pair_counts,
+            metrics=self._metrics_without(predecessor, successor), order=self._order_state
+        )
+    
+    def with_task(self, task_id):
+        """
+        Snapshot con una tarea nueva (sin dependencias: no afecta a ninguna componente)
+        """
+        if task_id in self.tasks:
+            return self
+        # La tarea nueva va al final del orden (si ya era extremo de una dependencia conserva su posición)
+        order = self._order_state
+        if order is not None and task_id not in order[0]:
+            positions, next_position = order
+            order = ({**positions, task_id: next_position}, next_position + 1)
+        return self._replace(tasks=self.tasks | {task_id}, metrics=self._metrics, order=order)
+    
+    def without_task(self, task_id):
+        """
+        Snapshot sin la tarea ni sus dependencias
+        """
+        graph = self
+        for dependency_id, edge in self.edges.items():
+            if task_id in edge[:2]:
+                graph = graph.without_edge(dependency_id)
+        
+        if task_id not in graph.tasks:
+            return graph
+        
+        order = None
+        if graph._order_state is not None:
+            positions, next_position = graph._order_state
+            order = ({task: position for task, position in positions.items() if task != task_id}, next_position)
+        return graph._replace(tasks=graph.tasks - {task_id}, metrics=graph._metrics_without(task_id), order=order)
+    
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    
+    def _replace(self, metrics, order=None, **changes):
+        values = {
+            'tasks': self.tasks, 'edges': self.edges, 'successors': self.successors,
+            'predecessors': self.predecessors, 'pair_counts': self.pair_counts
+        }
+        values.update(changes)
+        graph = ProjectGraph(
+            self.project_id, data_version=self.data_version, revision=self.revision + 1,
+            metrics=dict(metrics), order=order, **values
+        )
+        graph.checked_at = self.checked_at
+        return graph
+    
+    def _metrics_without(self, *tasks):
+        """
+        Métricas guardadas salvo las de las componentes que contienen alguna de las tareas
+        """
+        return {component: values for component, values in self._metrics.items()
+                if not any(task in component for task in tasks)}
+    
+    def _topological_state(self):
+        """
+        Estado del orden topológico (se calcula con Kahn la primera vez); None si hay ciclos
+        """
+        if self._order_state is None and self._cycle is None:
+            in_degree = {task: len(self.predecessors.get(task, EMPTY)) for task in self.nodes}
+            ready = deque(sorted(task for task, degree in in_degree.items() if degree == 0))
+            order = []
+            
+            while ready:
+                task = ready.popleft()
+                order.append(task)
+                for successor in self.successors.get(task, EMPTY):
+                    in_degree[successor] -= 1
+                    if in_degree[successor] == 0:
+                        ready.append(successor)
+            
+            if len(order) < len(in_degree):
+                self._cycle = cycle_tasks(self, [task for task, degree in in_degree.items() if degree > 0])
+            else:
+                self._order_state = ({task: position for position, task in enumerate(order)}, len(order))
+        
+        return self._order_state
+    
+    def _components(self):
+        """
+        {tarea: frozenset de su componente débilmente conexa} (solo tareas con dependencias)
+        """
+        if self._component_of is not None:
+            return self._component_of
+        
+        parent = {}
+        
+        def find(task):
+            root = task
+            while parent[root] != root:
+                root = parent[root]
+            while parent[task] != root:
+                parent[task], task = root, parent[task]
+            return root
+        
+        for predecessor, successor in self.pair_counts:
+            parent.setdefault(predecessor, predecessor)
+            parent.setdefault(successor, successor)
+            a, b = find(predecessor), find(successor)
+            if a != b:
+                parent[b] = a
+        
+        members = {}
+        for task in parent:
+            members.setdefault(find(task), []).append(task)
+        
+        component_of = {}
+        for tasks in members.values():
+            component = frozenset(tasks)
+            for task in tasks:
+                component_of[task] = component
+        
+        self._component_of = component_of
+        return component_of
+    
+    def _derived(self, name):
+        """
+        Métrica por tarea armada con los valores de cada componente (calculados solo si faltan)
+        """
+        state = self._topological_state() if name == 'descendants' else None
+        
+        with self._lock:
+            component_of = self._components()
+            result = dict.fromkeys(self.nodes, 0)
+            
+            for component in set(component_of.values()):
+                values = self._metrics.get(component)
+                if values is None:
+                    values = self._metrics[component] = {}
+                
+                if name not in values:
+                    edges = [(u, v) for u in component for v in self.successors.get(u, EMPTY)]
+                    if name == 'descendants' and state is not None:
+                        # Orden topológico mantenido: sin condensar componentes fuertes
+                        ordered = sorted(component, key=state[0].__getitem__)
+                        values[name] = descendant_counts(ordered, edges, topological=True)
+                    elif name == 'descendants':
+                        values[name] = descendant_counts(component, edges)
+                    else:
+                        values[name] = centrality_service.raw_betweenness(component, edges)
+                
+                result.update(values[name])
+            
+            return result
+
+
+def reorder(state, predecessor, successor, successors, predecessors):
+    """
+    Orden topológico después de agregar predecesor → sucesor (Pearce–Kelly)
+    
+    Args:
+        state: ({tarea: posición}, próxima posición libre) antes de la arista
+        successors, predecessors: adyacencia que ya incluye la arista
+    
+    Returns:
+        estado nuevo, o None si la arista cierra un ciclo
+    """
+    positions, next_position = state
+    positions = dict(positions)
+    for task in (predecessor, successor):
+        if task not in positions:
+            positions[task] = next_position
+            next_position += 1
+    
+    lower, upper = positions[successor], positions[predecessor]
+    if lower > upper:
+        return positions, next_position
+    
+    # Región afectada: alcanzables desde el sucesor (hasta upper) y los que llegan al predecesor (desde lower)
+    forward = {successor}
+    stack = [successor]
+    while stack:
+        for task in successors.get(stack.pop(), EMPTY):
+            if task == predecessor:
+                return None
+            if task not in forward and positions[task] < upper:
+                forward.add(task)
+                stack.append(task)
+    
+    backward = {predecessor}
+    stack = [predecessor]
+    while stack:
+        for task in predecessors.get(stack.pop(), EMPTY):
+            if task not in backward and positions[task] > lower:
+                backward.add(task)
+                stack.append(task)
+    
+    # Los que llegan al predecesor primero, luego los alcanzables desde el sucesor, con las mismas posiciones
+    moved = sorted(backward, key=positions.__getitem__) + sorted(forward, key=positions.__getitem__)
+    for task, position in zip(moved, sorted(positions[task] for task in moved)):
+        positions[task] = position
+    
+    return positions, next_position
+
+
+def cycle_tasks(graph, remaining):
+    """
+    Tareas que están en algún ciclo: de las que Kahn no pudo ordenar, quitar
+    hacia atrás las que solo dependen de un ciclo (sin sucesores entre el resto)
+    """
+    remaining = set(remaining)
+    out_degree = {task: len(graph.successors.get(task, EMPTY) & remaining) for task in remaining}
+    ready = deque(task for task, degree in out_degree.items() if degree == 0)
+    
+    while ready:
+        task = ready.popleft()
+        remaining.discard(task)
+        for predecessor in graph.predecessors.get(task, EMPTY):
+            if predecessor in remaining:
+                out_degree[predecessor] -= 1
+                if out_degree[predecessor] == 0:
+                    ready.append(predecessor)
+    
+    return remaining
+
+
+class GraphStore:
+    """
+    Snapshots ProjectGraph por proyecto (LRU) con carga perezosa y revalidación periódica
+    """
+    
+    def __init__(self, app=None):
+        self.refresh_seconds = 30
+        self.max_projects = 512
+        self._graphs = OrderedDict()
+        self._generations = {}  # Escrituras por proyecto: una carga en curso no pisa una escritura posterior
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'loads': 0, 'reloads': 0, 'updates': 0, 'evictions': 0}
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Tomar intervalo de revalidación y límite de proyectos de la configuración de la app
+        """
+        with self._lock:
+            self.refresh_seconds = app.config.get('GRAPH_STORE_REFRESH_SECONDS', self.refresh_seconds)
+            self.max_projects = app.config.get('GRAPH_STORE_MAX_PROJECTS', self.max_projects)
+            self._evict()
+    
+    def get(self, project_id, revalidate=False):
+        """
+        Snapshot del grafo de un proyecto (se carga desde la BD si no está o quedó desactualizado)
+        """
+        return self.get_many([project_id], revalidate=revalidate)[project_id]
+    
+    def get_many(self, project_ids, revalidate=False):
+        """
+        Snapshots de varios proyectos; los que faltan se cargan con una sola consulta por tabla
+        
+        Args:
+            project_ids: IDs de proyecto
+            revalidate: comparar ya la versión en la BD (load_versions) sin esperar
+                GRAPH_STORE_REFRESH_SECONDS, para ver escrituras de otros workers
+                (validaciones de escritura y resultados que se guardan en caché)
+        
+        Returns:
+            dict {project_id: ProjectGraph}
+        """
+        project_ids = [project_id for project_id in dict.fromkeys(project_ids) if project_id is not None]
+        now = time.monotonic()
+        
+        with self._lock:
+            graphs = {project_id: self._graphs.get(project_id) for project_id in project_ids}
+            generations = {project_id: self._generations.get(project_id, 0) for project_id in project_ids}
+        
+        stale = [project_id for project_id, graph in graphs.items()
+                 if graph is not None and (revalidate or (self.refresh_seconds and now - graph.checked_at > self.refresh_seconds))]
+        if stale:
+            versions = load_versions(stale)
+            for project_id in stale:
+                if graphs[project_id].data_version == versions.get(project_id) and graphs[project_id].revision == 0:
+                    graphs[project_id].checked_at = now
+                else:
+                    graphs[project_id] = None
+                    self._count('reloads')
+        
+        missing = [project_id for project_id, graph in graphs.items() if graph is None]
+        if missing:
+            loaded = load_graphs(missing)
+            self._count('loads', len(missing))
+            
+            with self._lock:
+                for project_id, graph in loaded.items():
+                    # Si hubo una escritura durante la carga se publica el snapshot con la escritura
+                    if self._generations.get(project_id, 0) == generations[project_id]:
+                        self._graphs[project_id] = graph
+                    else:
+                        graph = self._graphs.get(project_id) or graph
+                    graphs[project_id] = graph
+                self._evict()
+        
+        with self._lock:
+            for project_id in project_ids:
+                if project_id in self._graphs:
+                    self._graphs.move_to_end(project_id)
+            self._stats['hits'] += len(project_ids) - len(missing)
+        
+        return graphs
+    
+    # ------------------------------------------------------------------
+    # Escrituras (llamar después del commit)
+    # ------------------------------------------------------------------
+    
+    def add_dependency(self, dependency):
+        """
+        Aplicar una dependencia nueva (WebTaskDependency ya guardada)
+        """
+        self._apply(dependency.project_id, lambda graph: graph.with_edge(
+            dependency.id, dependency.predecessor_task_id, dependency.successor_task_id,
+            dependency.dependency_type, dependency.lag_days
+        ))
+    
+    def remove_dependency(self, project_id, dependency_id):
+        """
+        Quitar una dependencia eliminada
+        """
+        self._apply(project_id, lambda graph: graph.without_edge(dependency_id))
+    
+    def add_task(self, project_id, task_id):
+        """
+        Agregar una tarea nueva al proyecto
+        """
+        self._apply(project_id, lambda graph: graph.with_task(task_id))
+    
+    def remove_task(self, project_id, task_id):
+        """
+        Quitar una tarea eliminada (y sus dependencias)
+        """
+        self._apply(project_id, lambda graph: graph.without_task(task_id))
+    
+    def invalidate(self, project_id=None):
+        """
+        Descartar el grafo de un proyecto (o todos); se recarga en la próxima lectura
+        """
+        with self._lock:
+            if project_id is None:
+                self._graphs.clear()
+                self._generations = {key: value + 1 for key, value in self._generations.items()}
+            else:
+                self._graphs.pop(project_id, None)
+                self._generations[project_id] = self._generations.get(project_id, 0) + 1
+    
+    def stats(self):
+        """
+        Contadores del almacén y proyectos cargados
+        """
+        with self._lock:
+            return dict(self._stats, projects=len(self._graphs), max_projects=self.max_projects,
+                        refresh_seconds=self.refresh_seconds)
+    
+    def _apply(self, project_id, change):
+        if project_id is None:
+            return
+        
+        with self._lock:
+            self._generations[project_id] = self._generations.get(project_id, 0) + 1
+            graph = self._graphs.get(project_id)
+            if graph is None:
+                return  # Sin cargar: la próxima lectura ya verá el cambio en la BD
+            self._graphs[project_id] = change(graph)
+            self._stats['updates'] += 1
+    
+    def _evict(self):
+        while len(self._graphs) > self.max_projects:
+            self._graphs.popitem(last=False)
+            self._stats['evictions'] += 1
+    
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+
+def load_versions(project_ids):
+    """
+    Versión del grafo de cada proyecto: (tareas, máximo id de tarea, dependencias,
+    máximo id de dependencia, última modificación de dependencias)
+    
+    Los cambios de otros campos de las tareas (estado, horas) no cambian la versión.
+    """
+    from app.models.web_task import WebTask
+    from app.models.task_dependency import WebTaskDependency
+    
+    tasks = dict(
+        (row[0], tuple(row[1:])) for row in db.session.query(
+            WebTask.project_id, func.count(WebTask.id), func.max(WebTask.id)
+        ).filter(WebTask.project_id.in_(project_ids)).group_by(WebTask.project_id)
+    )
+    dependencies = dict(
+        (row[0], tuple(row[1:])) for row in db.session.query(
+            WebTaskDependency.project_id, func.count(WebTaskDependency.id),
+            func.max(WebTaskDependency.id), func.max(WebTaskDependency.updated_at)
+        ).filter(WebTaskDependency.project_id.in_(project_ids)).group_by(WebTaskDependency.project_id)
+    )
+    
+    return {
+        project_id: tuple(str(value) for value in tasks.get(project_id, (0, None)) + dependencies.get(project_id, (0, None, None)))
+        for project_id in project_ids
+    }
+
+
+def load_graphs(project_ids):
+    """
+    Snapshots de varios proyectos con una consulta a web_tasks y otra a web_task_dependencies
+    """
+    from app.models.web_task import WebTask
+    from app.models.task_dependency import WebTaskDependency
+    
+    versions = load_versions(project_ids)
+    
+    task_ids = {project_id: [] for project_id in project_ids}
+    for task_id, project_id in db.session.query(WebTask.id, WebTask.project_id).filter(
+        WebTask.project_id.in_(project_ids)
+    ):
+        task_ids[project_id].append(task_id)
+    
+    dependency_rows = {project_id: [] for project_id in project_ids}
+    for row in db.session.query(
+        WebTaskDependency.project_id, WebTaskDependency.id, WebTaskDependency.predecessor_task_id,
+        WebTaskDependency.successor_task_id, WebTaskDependency.dependency_type, WebTaskDependency.lag_days
+    ).filter(WebTaskDependency.project_id.in_(project_ids)):
+        dependency_rows[row[0]].append(tuple(row[1:]))
+    
+    return {
+        project_id: ProjectGraph.build(project_id, task_ids[project_id], dependency_rows[project_id], versions[project_id])
+        for project_id in project_ids
+    }
+
+
+# Instancia global
+graph_store = GraphStore()
@@ -0,0 +1,288 @@
+"""
+Estadísticas de Proyectos
+Tareas por estado, tamaño del equipo y dependencias para una página de proyectos
+
+Reemplaza el cálculo de Project.get_stats, que cargaba todas las tareas de cada
+proyecto (N+1 cargas completas al listar con include_stats). Dos formas de
+obtener las mismas estadísticas:
+
+- Consultas agrupadas (por defecto): una consulta por métrica para todos los
+  proyectos de la página (GROUP BY project_id, status / COUNT(DISTINCT
+  assigned_to) / dependencias por proyecto).
+- Contadores incrementales (PROJECT_STATS_COUNTERS=true): tabla
+  project_stat_counters con tareas por estado, tareas por persona asignada y
+  dependencias de cada proyecto. Las rutas que crean, editan o eliminan tareas
+  y dependencias aplican los deltas con un upsert en su misma transacción, y
+  la página se lee con una sola consulta. Requiere
+  database/08_create_project_stat_counters.sql y
+  python backend/rebuild_project_stats.py para cargar los valores iniciales.
+"""
+from collections import Counter
+
+from sqlalchemy import func
+
+from app.extensions import db
+
+
+# Estados de web_tasks que se informan por separado (el total incluye todos)
+STATUS_FIELDS = (
+    ('completed_tasks', 'completada'),
+    ('in_progress_tasks', 'en_progreso'),
+    ('pending_tasks', 'pendiente')
+)
+
+
+class ProjectStatsService:
+    """
+    Estadísticas de varios proyectos por consultas agrupadas o contadores incrementales
+    """
+    
+    def __init__(self, app=None):
+        self.use_counters = False
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Tomar la configuración de la app
+        """
+        self.use_counters = app.config.get('PROJECT_STATS_COUNTERS', self.use_counters)
+    
+    def get(self, project_id):
+        """
+        Estadísticas de un proyecto (mismo formato que get_many)
+        """
+        return self.get_many([project_id])[project_id]
+    
+    def get_many(self, project_ids):
+        """
+        Estadísticas de varios proyectos
+        
+        Returns:
+            dict {project_id: {total_tasks, completed_tasks, in_progress_tasks,
+            pending_tasks, completion_percentage, team_size, dependencies_count}}
+        """
+        project_ids = list(dict.fromkeys(project_ids))
+        if not project_ids:
+            return {}
+        
+        if self.use_counters:
+            status_counts, team_sizes, dependency_counts = read_counters(project_ids)
+        else:
+            status_counts, team_sizes, dependency_counts = query_counts(project_ids)
+        
+        return {
+            project_id: build_stats(
+                status_counts.get(project_id, {}), team_sizes.get(project_id, 0), dependency_counts.get(project_id, 0)
+            )
+            for project_id in project_ids
+        }
+    
+    def record_task(self, before, after):
+        """
+        Aplicar a los contadores el cambio de una tarea (sin commit: va en la transacción de la ruta)
+        
+        Args:
+            before, after: task_counter_values de la tarea antes y después (None si no existía / se elimina)
+        """
+        if self.use_counters:
+            increment_counters(task_deltas(before, after))
+    
+    def record_task_deleted(self, task):
+        """
+        Descontar una tarea que se va a eliminar y sus dependencias (se borran en cascada)
+        """
+        if not self.use_counters:
+            return
+        
+        from app.models.task_dependency import WebTaskDependency
+        
+        deltas = task_deltas(task_counter_values(task), None)
+        rows = db.session.query(
+            WebTaskDependency.project_id, func.count(WebTaskDependency.id)
+        ).filter(
+            (WebTaskDependency.predecessor_task_id == task.id) | (WebTaskDependency.successor_task_id == task.id)
+        ).group_by(WebTaskDependency.project_id).all()
+        for project_id, count in rows:
+            deltas[(project_id, 'dependencies', '')] -= count
+        
+        increment_counters(deltas)
+    
+    def record_dependency(self, project_id, delta):
+        """
+        Sumar (1) o restar (-1) una dependencia del proyecto
+        """
+        if self.use_counters:
+            increment_counters({(project_id, 'dependencies', ''): delta})
+    
+    def remove_project(self, project_id):
+        """
+        Eliminar los contadores de un proyecto (por si la base no aplica ON DELETE CASCADE)
+        """
+        if self.use_counters:
+            from app.models.project import ProjectStatCounter
+            
+            ProjectStatCounter.query.filter_by(project_id=project_id).delete(synchronize_session=False)
+    
+    def rebuild(self):
+        """
+        Recalcular project_stat_counters desde web_tasks y web_task_dependencies
+        
+        Returns:
+            int: número de contadores escritos
+        """
+        from app.models.web_task import WebTask
+        from app.models.task_dependency import WebTaskDependency
+        from app.models.project import ProjectStatCounter
+        
+        rows = []
+        for project_id, status, count in db.session.query(
+            WebTask.project_id, WebTask.status, func.count(WebTask.id)
+        ).filter(WebTask.project_id.isnot(None)).group_by(WebTask.project_id, WebTask.status):
+            rows.append(ProjectStatCounter(project_id=project_id, counter='status', counter_key=status or '', value=count))
+        
+        for project_id, assigned_to, count in db.session.query(
+            WebTask.project_id, WebTask.assigned_to, func.count(WebTask.id)
+        ).filter(
+            WebTask.project_id.isnot(None), WebTask.assigned_to.isnot(None), WebTask.assigned_to != ''
+        ).group_by(WebTask.project_id, WebTask.assigned_to):
+            rows.append(ProjectStatCounter(project_id=project_id, counter='member', counter_key=assigned_to, value=count))
+        
+        for project_id, count in db.session.query(
+            WebTaskDependency.project_id, func.count(WebTaskDependency.id)
+        ).group_by(WebTaskDependency.project_id):
+            rows.append(ProjectStatCounter(project_id=project_id, counter='dependencies', counter_key='', value=count))
+        
+        try:
+            ProjectStatCounter.query.delete()
+            db.session.add_all(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        return len(rows)
+
+
+def query_counts(project_ids):
+    """
+    Conteos de una página de proyectos con una consulta agrupada por métrica
+    
+    Returns:
+        tuple ({project_id: {estado: tareas}}, {project_id: equipo}, {project_id: dependencias})
+    """
+    from app.models.web_task import WebTask
+    from app.models.task_dependency import WebTaskDependency
+    
+    status_counts = {}
+    for project_id, status, count in db.session.query(
+        WebTask.project_id, WebTask.status, func.count(WebTask.id)
+    ).filter(WebTask.project_id.in_(project_ids)).group_by(WebTask.project_id, WebTask.status):
+        status_counts.setdefault(project_id, {})[status] = count
+    
+    team_sizes = dict(db.session.query(
+        WebTask.project_id, func.count(func.distinct(WebTask.assigned_to))
+    ).filter(
+        WebTask.project_id.in_(project_ids), WebTask.assigned_to.isnot(None), WebTask.assigned_to != ''
+    ).group_by(WebTask.project_id).all())
+    
+    dependency_counts = dict(db.session.query(
+        WebTaskDependency.project_id, func.count(WebTaskDependency.id)
+    ).filter(WebTaskDependency.project_id.in_(project_ids)).group_by(WebTaskDependency.project_id).all())
+    
+    return status_counts, team_sizes, dependency_counts
+
+
+def read_counters(project_ids):
+    """
+    Los mismos conteos leídos de project_stat_counters en una sola consulta
+    """
+    from app.models.project import ProjectStatCounter
+    
+    status_counts = {}
+    team_sizes = Counter()
+    dependency_counts = {}
+    for project_id, counter, counter_key, value in db.session.query(
+        ProjectStatCounter.project_id, ProjectStatCounter.counter,
+        ProjectStatCounter.counter_key, ProjectStatCounter.value
+    ).filter(ProjectStatCounter.project_id.in_(project_ids), ProjectStatCounter.value > 0):
+        if counter == 'status':
+            status_counts.setdefault(project_id, {})[counter_key] = value
+        elif counter == 'member':
+            team_sizes[project_id] += 1
+        else:
+            dependency_counts[project_id] = value
+    
+    return status_counts, team_sizes, dependency_counts
+
+
+def build_stats(status_counts, team_size, dependencies_count):
+    """
+    Estadísticas de un proyecto a partir de sus conteos (formato de Project.to_dict)
+    """
+    total_tasks = sum(status_counts.values())
+    stats = {'total_tasks': total_tasks}
+    for field, status in STATUS_FIELDS:
+        stats[field] = status_counts.get(status, 0)
+    
+    stats['completion_percentage'] = round((stats['completed_tasks'] / total_tasks * 100), 2) if total_tasks > 0 else 0
+    stats['team_size'] = team_size
+    stats['dependencies_count'] = dependencies_count
+    return stats
+
+
+def task_counter_values(task):
+    """
+    Valores de una tarea que afectan a los contadores: (project_id, status, assigned_to)
+    """
+    return (task.project_id, task.status, task.assigned_to)
+
+
+def task_deltas(before, after):
+    """
+    Deltas {(project_id, contador, clave): cambio} entre dos estados de una tarea
+    """
+    deltas = Counter()
+    for sign, values in ((-1, before), (1, after)):
+        if values is None or values[0] is None:
+            continue
+        project_id, status, assigned_to = values
+        deltas[(project_id, 'status', status or '')] += sign
+        if assigned_to:
+            deltas[(project_id, 'member', assigned_to)] += sign
+    return deltas
+
+
+def increment_counters(deltas):
+    """
+    Sumar los deltas a project_stat_counters con un solo upsert (en la transacción actual)
+    """
+    from app.models.project import ProjectStatCounter
+    
+    rows = [
+        {'project_id': project_id, 'counter': counter, 'counter_key': counter_key, 'value': delta}
+        for (project_id, counter, counter_key), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+    
+    table = ProjectStatCounter.__table__
+    if db.session.get_bind().dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        
+        statement = insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(value=table.c.value + statement.inserted['value'])
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        
+        statement = insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=['project_id', 'counter', 'counter_key'],
+            set_={'value': table.c.value + statement.excluded['value']}
+        )
+    
+    db.session.execute(statement)
+
+
+# Instancia global
+project_stats_service = ProjectStatsService()
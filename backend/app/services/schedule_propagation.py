@@ -0,0 +1,370 @@
+"""
+Propagación Incremental del Cronograma
+Inicio/fin más tempranos de cada tarea mantenidos en memoria y actualizados por deltas
+
+Estado por proyecto (se arma una vez con la pasada hacia adelante del CPM,
+O(V + E)): duración (días, igual que la ruta crítica), inicio y fin más
+tempranos de cada tarea y sus fechas, en días desde el inicio del proyecto
+(Project.start_date, o su fecha de creación si no tiene):
+
+- start_date: la tarea no empieza antes de esa fecha
+- deadline: no mueve fechas, solo se informa la holgura contra el fin más temprano
+
+Cuando una transacción cambia estimated_hours, start_date o deadline de una o
+varias tareas, apply() recalcula esas tareas y luego, en orden topológico
+(posiciones que mantiene graph_store), solo los sucesores de las que movieron
+su inicio o fin. Si el inicio de un sucesor no cambia (otra dependencia lo fija
+o su holgura absorbe el cambio) la propagación se corta en esa rama.
+
+Antes de modificar las tareas se llama prepare(): si el grafo del proyecto o la
+versión de sus tareas (la misma que usa la ruta crítica) cambió por otras
+escrituras, el estado se reconstruye y las tareas afectadas se obtienen
+comparando con el estado anterior.
+"""
+import heapq
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from app.extensions import db
+from app.ml.model_registry import model_registry
+from app.services.graph_store import graph_store, EMPTY
+from app.services.critical_path import (
+    duration_version, edge_index, forward_pass, successor_start, task_durations, task_scope, SLACK_TOLERANCE
+)
+
+
+SCHEDULE_FIELDS = ('estimated_hours', 'start_date', 'deadline')
+
+
+class ProjectSchedule:
+    """
+    Fechas más tempranas de un proyecto calculadas sobre un snapshot de su grafo
+    """
+    
+    def __init__(self, project_id, graph, anchor, version, duration, release, deadline, incoming, start, finish):
+        self.project_id = project_id
+        self.graph = graph          # ProjectGraph con el que se calculó
+        self.anchor = anchor        # datetime del día 0
+        self.version = version      # duration_version de las tareas
+        self.duration = duration    # {tarea: días}
+        self.release = release      # {tarea: día mínimo de inicio (start_date)}
+        self.deadline = deadline    # {tarea: día de la fecha límite}
+        self.incoming = incoming    # {sucesor: [(predecesor, sucesor, tipo, lag_days)]}
+        self.start = start          # {tarea: inicio más temprano}
+        self.finish = finish        # {tarea: fin más temprano}
+        self.lock = threading.Lock()
+    
+    def describe(self, task_id):
+        """
+        Cronograma de una tarea para las respuestas de la API
+        """
+        start, finish = self.start[task_id], self.finish[task_id]
+        deadline = self.deadline.get(task_id)
+        return {
+            'task_id': task_id,
+            'duration_days': round(self.duration[task_id], 2),
+            'earliest_start': round(start, 2),
+            'earliest_finish': round(finish, 2),
+            'estimated_start_date': (self.anchor + timedelta(days=start)).isoformat(),
+            'estimated_end_date': (self.anchor + timedelta(days=finish)).isoformat(),
+            'deadline_slack': round(deadline - finish, 2) if deadline is not None else None
+        }
+
+
+class SchedulePropagator:
+    """
+    Estados ProjectSchedule por proyecto (LRU) con propagación de cambios por deltas
+    """
+    
+    def __init__(self, app=None):
+        self.max_entries = 128
+        self._states = OrderedDict()  # {project_id: ProjectSchedule}
+        self._lock = threading.Lock()
+        self._stats = {'builds': 0, 'propagations': 0, 'visited': 0, 'changed': 0, 'evictions': 0}
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Tomar el tamaño de la caché de la configuración de la app
+        """
+        with self._lock:
+            self.max_entries = app.config.get('SCHEDULE_PROPAGATION_CACHE_SIZE', self.max_entries)
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+    
+    def prepare(self, project_id):
+        """
+        Asegurar un estado vigente del proyecto antes de modificar sus tareas
+        (apply compara contra él)
+        
+        Raises:
+            DependencyCycleError: el grafo tiene ciclos
+        """
+        graph = graph_store.get(project_id)
+        state = self._get(project_id)
+        if state is not None and state.graph is graph and state.version == schedule_version(project_id, graph):
+            return state
+        return self._rebuild(project_id, graph, state)[0]
+    
+    def apply(self, project_id, task_ids):
+        """
+        Propagar los cambios (ya confirmados) de duración y fechas de varias tareas
+        
+        Args:
+            project_id: ID del proyecto
+            task_ids: tareas modificadas en la transacción
+        
+        Returns:
+            dict {changed_tasks: [cronograma de cada tarea que cambió], visited, rebuilt}
+        
+        Raises:
+            DependencyCycleError: el grafo tiene ciclos
+        """
+        graph = graph_store.get(project_id)
+        state = self._get(project_id)
+        
+        # Sin estado previo o con otro grafo: reconstruir y comparar con lo anterior
+        if state is None or state.graph is not graph:
+            state, changed = self._rebuild(project_id, graph, state)
+            if changed is None:
+                changed = {task for task in task_ids if task in state.start}
+            return self._result(state, changed, len(state.start), rebuilt=True)
+        
+        with state.lock:
+            seeds, deadline_changed = self._load_changes(state, [task for task in task_ids if task in state.start])
+            changed, visited = propagate_changes(state, seeds, graph.positions())
+            state.version = schedule_version(project_id, graph)
+        
+        with self._lock:
+            self._stats['propagations'] += 1
+            self._stats['visited'] += visited
+            self._stats['changed'] += len(changed)
+        
+        print(f"   📅 Cronograma {project_id}: {len(changed)} tareas cambiaron ({visited} revisadas)")
+        return self._result(state, changed | deadline_changed, visited, rebuilt=False)
+    
+    def invalidate(self, project_id=None):
+        """
+        Eliminar el estado de un proyecto (o todos)
+        """
+        with self._lock:
+            if project_id is None:
+                self._states.clear()
+            else:
+                self._states.pop(project_id, None)
+    
+    def stats(self):
+        """
+        Estadísticas de reconstrucciones y propagaciones
+        """
+        with self._lock:
+            propagations = self._stats['propagations']
+            return dict(
+                self._stats,
+                avg_visited=round(self._stats['visited'] / propagations, 2) if propagations else 0,
+                entries=len(self._states),
+                max_entries=self.max_entries
+            )
+    
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    
+    def _get(self, project_id):
+        with self._lock:
+            state = self._states.get(project_id)
+            if state is not None:
+                self._states.move_to_end(project_id)
+            return state
+    
+    def _rebuild(self, project_id, graph, previous):
+        """
+        Estado nuevo con una pasada completa; devuelve también las tareas que
+        cambiaron respecto del estado anterior (None si no había)
+        """
+        state = build_schedule(project_id, graph)
+        
+        changed = None
+        if previous is not None:
+            changed = {
+                task for task in state.start
+                if task not in previous.start
+                or abs(state.start[task] - previous.start[task]) > SLACK_TOLERANCE
+                or abs(state.finish[task] - previous.finish[task]) > SLACK_TOLERANCE
+                or state.deadline.get(task) != previous.deadline.get(task)
+            }
+        
+        with self._lock:
+            self._states[project_id] = state
+            self._states.move_to_end(project_id)
+            self._stats['builds'] += 1
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+                self._stats['evictions'] += 1
+        
+        return state, changed
+    
+    def _load_changes(self, state, task_ids):
+        """
+        Leer duración y fechas actuales de las tareas y actualizar el estado
+        
+        Returns:
+            tuple (tareas cuya duración o start_date cambió, tareas con otra deadline)
+        """
+        from app.models.web_task import WebTask
+        
+        rows = load_schedule_rows(WebTask.id.in_(task_ids)) if task_ids else []
+        durations, _ = task_durations([row[:3] for row in rows])
+        
+        seeds = set()
+        deadline_changed = set()
+        for task_id, _, _, start_date, deadline in rows:
+            release = day_offset(start_date, state.anchor)
+            if abs(durations[task_id] - state.duration[task_id]) > SLACK_TOLERANCE or release != state.release.get(task_id):
+                seeds.add(task_id)
+            set_or_drop(state.release, task_id, release)
+            state.duration[task_id] = durations[task_id]
+            
+            deadline_day = day_offset(deadline, state.anchor, clip=False)
+            if deadline_day != state.deadline.get(task_id):
+                deadline_changed.add(task_id)
+            set_or_drop(state.deadline, task_id, deadline_day)
+        
+        return seeds, deadline_changed
+    
+    def _result(self, state, changed, visited, rebuilt):
+        positions = state.graph.positions()
+        return {
+            'changed_tasks': [state.describe(task) for task in sorted(changed, key=positions.__getitem__)],
+            'visited': visited,
+            'rebuilt': rebuilt
+        }
+
+
+def propagate_changes(state, seeds, positions):
+    """
+    Recalcular las tareas semilla y, en orden topológico, los sucesores de las
+    que movieron su inicio o fin
+    
+    Cada tarea se recalcula una sola vez, con todos sus predecesores ya al día,
+    tomando el máximo de sus restricciones (así también se propagan los adelantos).
+    
+    Returns:
+        tuple (tareas cuyo inicio o fin cambió, tareas recalculadas)
+    """
+    heap = [(positions[task], task) for task in seeds]
+    heapq.heapify(heap)
+    queued = set(seeds)
+    changed = set()
+    visited = 0
+    
+    while heap:
+        _, task = heapq.heappop(heap)
+        visited += 1
+        
+        duration = state.duration[task]
+        start = state.release.get(task, 0.0)
+        for edge in state.incoming.get(task, ()):
+            predecessor = edge[0]
+            bound = successor_start(edge, state.start[predecessor], state.finish[predecessor], duration)
+            if bound > start:
+                start = bound
+        finish = start + duration
+        
+        if abs(start - state.start[task]) <= SLACK_TOLERANCE and abs(finish - state.finish[task]) <= SLACK_TOLERANCE:
+            continue
+        
+        state.start[task] = start
+        state.finish[task] = finish
+        changed.add(task)
+        for successor in state.graph.successors.get(task, EMPTY):
+            if successor not in queued:
+                queued.add(successor)
+                heapq.heappush(heap, (positions[successor], successor))
+    
+    return changed, visited
+
+
+def build_schedule(project_id, graph):
+    """
+    Estado del proyecto con una pasada hacia adelante completa
+    """
+    external = graph.nodes - graph.tasks
+    version = schedule_version(project_id, graph)
+    anchor = project_anchor(project_id)
+    rows = load_schedule_rows(task_scope(project_id, external))
+    
+    order = graph.topological_order()
+    loaded, _ = task_durations([row[:3] for row in rows])
+    duration = {task: float(loaded.get(task) or 0) for task in order}
+    
+    release = {}
+    deadline = {}
+    for task_id, _, _, start_date, task_deadline in rows:
+        set_or_drop(release, task_id, day_offset(start_date, anchor))
+        set_or_drop(deadline, task_id, day_offset(task_deadline, anchor, clip=False))
+    
+    outgoing, incoming = edge_index(graph.edges.values())
+    start, finish = forward_pass(order, outgoing, duration, release)
+    
+    return ProjectSchedule(project_id, graph, anchor, version, duration, release, deadline, incoming, start, finish)
+
+
+def schedule_version(project_id, graph):
+    """
+    Versión de las tareas del proyecto (la de la ruta crítica más el modelo si hay tareas sin estimación)
+    """
+    version = duration_version(project_id, graph.nodes - graph.tasks)
+    if version[-1]:
+        version += (model_registry.get('duration')['token'],)
+    return version
+
+
+def load_schedule_rows(condition):
+    """
+    Filas (id, estimated_hours, complexity_score, start_date, deadline) de web_tasks
+    """
+    from app.models.web_task import WebTask
+    
+    return db.session.query(
+        WebTask.id, WebTask.estimated_hours, WebTask.complexity_score, WebTask.start_date, WebTask.deadline
+    ).filter(condition).all()
+
+
+def project_anchor(project_id):
+    """
+    Día 0 del cronograma: inicio del proyecto, su fecha de creación o el día de hoy
+    """
+    from app.models.project import Project
+    
+    project = db.session.get(Project, project_id)
+    if project is not None and project.start_date:
+        return datetime.combine(project.start_date, datetime.min.time())
+    if project is not None and project.created_at:
+        return datetime.combine(project.created_at.date(), datetime.min.time())
+    return datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+
+def day_offset(value, anchor, clip=True):
+    """
+    Días (float) desde anchor hasta value; None si no hay fecha. Con clip, nunca antes del día 0
+    """
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    days = (value - anchor).total_seconds() / 86400
+    return max(days, 0.0) if clip else days
+
+
+def set_or_drop(values, key, value):
+    if value is None:
+        values.pop(key, None)
+    else:
+        values[key] = value
+
+
+# Instancia global
+schedule_propagator = SchedulePropagator()
@@ -0,0 +1,331 @@
+"""
+Simulación Monte Carlo del Cronograma de Proyectos
+Percentiles de fecha de término e índice de criticidad por tarea
+
+Cada tarea tiene una distribución lognormal de duración:
+- base: estimated_hours / 8 (días); sin estimación, la predicción del modelo
+  de duración (una sola llamada para todas las tareas)
+- factor: lognormal ajustada por momentos a la razón histórica
+  actual_hours / (estimated_hours / 8) de las tareas completadas del área
+  (o de todas si el área tiene menos de SCHEDULE_SIMULATION_MIN_SAMPLES).
+  Para duraciones del modelo, que ya predice la duración real, el factor
+  tiene media 1 y la misma dispersión.
+- las tareas completadas con actual_hours quedan fijas en su duración real
+
+Todas las corridas se propagan juntas: las duraciones, inicios y términos son
+matrices (tareas x corridas) y se recorren las tareas en orden topológico con
+operaciones de NumPy sobre la fila completa de corridas (mismas restricciones
+por tipo de dependencia y lag_days que la ruta crítica). Las corridas se
+procesan en bloques de SCHEDULE_SIMULATION_MAX_CELLS celdas para acotar la
+memoria en proyectos grandes.
+
+El índice de criticidad de una tarea es la fracción de corridas en las que
+queda sin holgura (pasada hacia atrás por corrida, igual que en CPM).
+"""
+import math
+import zlib
+import threading
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import func, and_
+
+from app.extensions import db
+from app.services.graph_store import graph_store
+from app.services.critical_path import task_scope, HOURS_PER_DAY, SLACK_TOLERANCE
+
+
+# Razón real/estimado cuando no hay suficiente historia (media, desviación)
+DEFAULT_RATIO = (1.25, 0.45)
+
+# Percentiles reportados de la fecha de término
+PERCENTILES = (50, 80, 95)
+
+
+class ScheduleSimulator:
+    """
+    Monte Carlo vectorizado sobre el grafo de dependencias de un proyecto
+    """
+    
+    def __init__(self, app=None):
+        self.default_trials = 10000
+        self.max_trials = 20000
+        self.max_cells = 4000000
+        self.min_samples = 10
+        self._lock = threading.Lock()
+        self._stats = {'simulations': 0, 'trials': 0}
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """
+        Tomar corridas por defecto, límites y mínimo de muestras de la configuración de la app
+        """
+        self.default_trials = app.config.get('SCHEDULE_SIMULATION_TRIALS', self.default_trials)
+        self.max_trials = app.config.get('SCHEDULE_SIMULATION_MAX_TRIALS', self.max_trials)
+        self.max_cells = app.config.get('SCHEDULE_SIMULATION_MAX_CELLS', self.max_cells)
+        self.min_samples = app.config.get('SCHEDULE_SIMULATION_MIN_SAMPLES', self.min_samples)
+    
+    def simulate(self, project_id, trials=None, seed=None, deadline_days=None):
+        """
+        Simular el término del proyecto
+        
+        Args:
+            project_id: ID del proyecto
+            trials: número de corridas (por defecto SCHEDULE_SIMULATION_TRIALS)
+            seed: semilla (por defecto derivada del proyecto: resultados reproducibles)
+            deadline_days: plazo en días desde el inicio (opcional, para on_time_probability)
+        
+        Returns:
+            dict con completion_days (p50/p80/p95, media, mínimo, máximo),
+            on_time_probability, criticality {task_id: índice} y datos de las
+            distribuciones usadas
+        
+        Raises:
+            ValueError: número de corridas fuera de rango
+            DependencyCycleError: el grafo tiene ciclos
+        """
+        trials = self.default_trials if trials is None else int(trials)
+        if trials < 1 or trials > self.max_trials:
+            raise ValueError(f'trials debe estar entre 1 y {self.max_trials}')
+        if seed is None:
+            seed = zlib.crc32(str(project_id).encode('utf-8'))
+        
+        graph = graph_store.get(project_id)
+        order = graph.topological_order()
+        n_tasks = len(order)
+        if n_tasks == 0:
+            return {'trials': trials, 'seed': seed, 'completion_days': None, 'on_time_probability': None,
+                    'criticality': {}, 'distributions': {}}
+        
+        base, mu, sigma, summary = self.task_distributions(project_id, graph, order)
+        incoming, outgoing = edge_lists(order, graph.edges.values())
+        
+        rng = np.random.default_rng(seed)
+        chunk = max(1, min(trials, self.max_cells // n_tasks))
+        completion = np.empty(trials)
+        critical_counts = np.zeros(n_tasks)
+        
+        for offset in range(0, trials, chunk):
+            size = min(chunk, trials - offset)
+            durations = base[:, None] * rng.lognormal(mu[:, None], sigma[:, None], size=(n_tasks, size))
+            finish, critical = propagate(durations, incoming, outgoing)
+            completion[offset:offset + size] = finish
+            critical_counts += critical
+        
+        with self._lock:
+            self._stats['simulations'] += 1
+            self._stats['trials'] += trials
+        
+        values = np.percentile(completion, PERCENTILES)
+        completion_days = {f'p{p}': round(float(value), 2) for p, value in zip(PERCENTILES, values)}
+        completion_days.update(
+            mean=round(float(completion.mean()), 2),
+            min=round(float(completion.min()), 2),
+            max=round(float(completion.max()), 2)
+        )
+        
+        return {
+            'trials': trials,
+            'seed': seed,
+            'completion_days': completion_days,
+            'on_time_probability': (
+                round(float(np.mean(completion <= deadline_days)), 4) if deadline_days is not None else None
+            ),
+            'criticality': {task: round(float(count / trials), 4) for task, count in zip(order, critical_counts)},
+            'distributions': summary
+        }
+    
+    def task_distributions(self, project_id, graph, order):
+        """
+        Duración base (días) y parámetros lognormales (mu, sigma) del factor de cada tarea
+        
+        Returns:
+            tuple (base, mu, sigma, resumen) con arrays alineados a order
+        """
+        from app.models.web_task import WebTask
+        from app.ml.duration_model import predict_task_durations
+        from app.ml.risk_model import complexity_level_from_score
+        
+        external = graph.nodes - graph.tasks
+        rows = db.session.query(
+            WebTask.id, WebTask.area, WebTask.status, WebTask.estimated_hours,
+            WebTask.actual_hours, WebTask.complexity_score
+        ).filter(task_scope(project_id, external)).all()
+        tasks = {row[0]: row for row in rows}
+        
+        ratios = load_ratio_stats()
+        index = {task: i for i, task in enumerate(order)}
+        base = np.zeros(len(order))
+        mu = np.zeros(len(order))
+        sigma = np.zeros(len(order))
+        pending = []
+        fixed = 0
+        
+        for task, i in index.items():
+            row = tasks.get(task)
+            if row is None:
+                continue  # Tarea de la dependencia ya eliminada: duración 0
+            _, area, status, estimated_hours, actual_hours, complexity_score = row
+            
+            if status == 'completada' and actual_hours:
+                base[i] = float(actual_hours)
+                fixed += 1
+                continue
+            
+            ratio_mu, ratio_sigma = self.ratio_parameters(ratios, area)
+            if estimated_hours and estimated_hours > 0:
+                base[i] = float(estimated_hours) / HOURS_PER_DAY
+                mu[i], sigma[i] = ratio_mu, ratio_sigma
+            else:
+                # El modelo ya estima la duración real: factor de media 1
+                mu[i], sigma[i] = -ratio_sigma ** 2 / 2, ratio_sigma
+                pending.append((i, {'complexity_level': complexity_level_from_score(complexity_score)}))
+        
+        if pending:
+            predicted = predict_task_durations([task_data for _, task_data in pending])
+            for (i, _), days in zip(pending, predicted):
+                base[i] = float(days)
+        
+        summary = {
+            'tasks': len(order),
+            'tasks_estimated_by_model': len(pending),
+            'tasks_completed_fixed': fixed,
+            'ratio_by_area': {
+                area: {'mean': round(mean, 3), 'std': round(std, 3), 'samples': count}
+                for area, (count, mean, std) in ratios.items() if area is not None
+            }
+        }
+        return base, mu, sigma, summary
+    
+    def ratio_parameters(self, ratios, area):
+        """
+        (mu, sigma) de la lognormal del factor real/estimado para un área
+        """
+        count, mean, std = ratios.get(area, (0, None, None))
+        if count < self.min_samples:
+            count, mean, std = ratios.get(None, (0, None, None))
+        if count < self.min_samples:
+            mean, std = DEFAULT_RATIO
+        
+        # Ajuste por momentos: media y varianza de la lognormal iguales a las observadas
+        sigma_squared = math.log(1 + (std / mean) ** 2)
+        return math.log(mean) - sigma_squared / 2, math.sqrt(sigma_squared)
+    
+    def stats(self):
+        """
+        Simulaciones y corridas ejecutadas
+        """
+        with self._lock:
+            return dict(self._stats, default_trials=self.default_trials, max_trials=self.max_trials)
+
+
+def edge_lists(order, edges):
+    """
+    Dependencias por fila (índice en order): entrantes y salientes como (otra fila, tipo, lag_days)
+    """
+    index = {task: i for i, task in enumerate(order)}
+    incoming = [[] for _ in order]
+    outgoing = [[] for _ in order]
+    for predecessor, successor, dependency_type, lag_days in edges:
+        p, s = index[predecessor], index[successor]
+        lag_days = float(lag_days or 0)
+        incoming[s].append((p, dependency_type, lag_days))
+        outgoing[p].append((s, dependency_type, lag_days))
+    return incoming, outgoing
+
+
+def propagate(durations, incoming, outgoing):
+    """
+    Pasadas del CPM para todas las corridas a la vez
+    
+    Args:
+        durations: matriz (tareas en orden topológico x corridas)
+        incoming, outgoing: listas de edge_lists
+    
+    Returns:
+        tuple (término del proyecto por corrida, corridas en las que cada tarea es crítica)
+    """
+    n_tasks, trials = durations.shape
+    start = np.zeros((n_tasks, trials))
+    finish = np.empty((n_tasks, trials))
+    
+    # Hacia adelante: inicio = máximo de las restricciones de los predecesores
+    for i in range(n_tasks):
+        row = start[i]
+        for p, dependency_type, lag_days in incoming[i]:
+            if dependency_type == 'start_to_start':
+                bound = start[p] + lag_days
+            elif dependency_type == 'finish_to_finish':
+                bound = finish[p] + (lag_days - durations[i])
+            elif dependency_type == 'start_to_finish':
+                bound = start[p] + (lag_days - durations[i])
+            else:
+                bound = finish[p] + lag_days
+            np.maximum(row, bound, out=row)
+        np.add(row, durations[i], out=finish[i])
+    
+    completion = finish.max(axis=0)
+    
+    # Hacia atrás: término más tardío = mínimo de las restricciones de los sucesores
+    latest_start = finish  # Se reutiliza la matriz: cada fila se sobrescribe después de leerla
+    critical = np.zeros(n_tasks)
+    for i in range(n_tasks - 1, -1, -1):
+        latest_finish = completion.copy()
+        for s, dependency_type, lag_days in outgoing[i]:
+            if dependency_type == 'start_to_start':
+                bound = latest_start[s] + (durations[i] - lag_days)
+            elif dependency_type == 'finish_to_finish':
+                bound = latest_start[s] + (durations[s] - lag_days)
+            elif dependency_type == 'start_to_finish':
+                bound = latest_start[s] + (durations[s] + durations[i] - lag_days)
+            else:
+                bound = latest_start[s] - lag_days
+            np.minimum(latest_finish, bound, out=latest_finish)
+        np.subtract(latest_finish, durations[i], out=latest_start[i])
+        critical[i] = np.count_nonzero(latest_start[i] - start[i] <= SLACK_TOLERANCE)
+    
+    return completion, critical
+
+
+def load_ratio_stats():
+    """
+    Razón actual_hours / (estimated_hours / 8) de las tareas completadas, por área (GROUP BY)
+    
+    Returns:
+        dict {área: (muestras, media, desviación)}; la clave None es el total
+    """
+    from app.models.web_task import WebTask
+    
+    ratio = WebTask.actual_hours * HOURS_PER_DAY / WebTask.estimated_hours
+    completed = and_(
+        WebTask.status == 'completada', WebTask.estimated_hours > 0, WebTask.actual_hours > 0
+    )
+    columns = (func.count(WebTask.id), func.avg(ratio), func.avg(ratio * ratio))
+    
+    rows = db.session.query(WebTask.area, *columns).filter(completed).group_by(WebTask.area).all()
+    rows.append((None,) + tuple(db.session.query(*columns).filter(completed).one()))
+    
+    stats = {}
+    for area, count, mean, mean_square in rows:
+        if not count or not mean:
+            continue
+        mean, mean_square = float(mean), float(mean_square)
+        stats[area] = (count, mean, math.sqrt(max(mean_square - mean * mean, 0.0)))
+    return stats
+
+
+def completion_dates(start_date, completion_days):
+    """
+    Fechas de término (inicio del proyecto + días, redondeado hacia arriba) por percentil
+    """
+    if start_date is None or not completion_days:
+        return None
+    return {
+        key: (start_date + timedelta(days=math.ceil(value))).isoformat()
+        for key, value in completion_days.items() if key.startswith('p')
+    }
+
+
+# Instancia global
+schedule_simulator = ScheduleSimulator()
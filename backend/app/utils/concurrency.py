@@ -0,0 +1,61 @@
+"""
+Ejecución Concurrente con Contexto de Aplicación
+================================================
+Pool de hilos acotado y compartido para ejecutar etapas independientes
+(p. ej. los modelos ML de la asignación inteligente) en paralelo.
+Cada tarea se ejecuta dentro de un app_context propio, de modo que puede
+usar db.session y current_app igual que en el hilo de la petición.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Obtener el pool de hilos compartido (se crea la primera vez que se usa)
+    
+    El tamaño se toma de ML_PARALLEL_MAX_WORKERS, lo que acota el número de
+    hilos sin importar cuántas peticiones lleguen a la vez.
+    """
+    global _executor
+    
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_workers = current_app.config.get('ML_PARALLEL_MAX_WORKERS', 4)
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ml-worker')
+    
+    return _executor
+
+
+def submit_with_app_context(fn, *args, **kwargs):
+    """
+    Enviar una función al pool ejecutándola dentro del contexto de la app actual
+    
+    Returns:
+        concurrent.futures.Future con el resultado de fn(*args, **kwargs)
+    """
+    app = current_app._get_current_object()
+    
+    def run():
+        # El app_context propio cierra la sesión de BD del hilo al terminar
+        with app.app_context():
+            return fn(*args, **kwargs)
+    
+    return get_executor().submit(run)
+
+
+def shutdown_executor(wait=True):
+    """
+    Detener el pool de hilos compartido (si fue creado)
+    """
+    global _executor
+    
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
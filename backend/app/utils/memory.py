@@ -0,0 +1,77 @@
+"""
+Uso de Memoria del Proceso
+==========================
+Memoria residente y compartida del proceso actual (worker de gunicorn o
+servidor de desarrollo). En Linux se lee /proc/self/smaps_rollup, que separa
+las páginas compartidas con el master (copy-on-write) de las privadas.
+"""
+import os
+import sys
+
+
+def _read_kb_fields(path):
+    """
+    Leer un archivo de /proc con líneas 'Campo:   123 kB' → {campo: kB}
+    """
+    fields = {}
+    with open(path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields
+
+
+def get_memory_usage():
+    """
+    Memoria del proceso actual en MB
+    
+    Returns:
+        dict {pid, rss_mb, pss_mb, shared_mb, private_mb, source}
+        - shared_mb: páginas compartidas con otros procesos (p. ej. modelos precargados en el master)
+        - pss_mb: memoria proporcional (las páginas compartidas se reparten entre quienes las usan)
+    """
+    usage = {'pid': os.getpid()}
+    
+    try:
+        fields = _read_kb_fields('/proc/self/smaps_rollup')
+        shared_kb = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+        private_kb = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+        
+        usage.update({
+            'rss_mb': round(fields.get('Rss', 0) / 1024, 1),
+            'pss_mb': round(fields.get('Pss', 0) / 1024, 1),
+            'shared_mb': round(shared_kb / 1024, 1),
+            'private_mb': round(private_kb / 1024, 1),
+            'source': 'smaps_rollup'
+        })
+        
+    except (OSError, ValueError):
+        usage.update({'rss_mb': None, 'pss_mb': None, 'shared_mb': None, 'private_mb': None, 'source': None})
+        
+        # Fuera de Linux solo está disponible el pico de memoria residente (y no en Windows)
+        try:
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            
+            # ru_maxrss está en bytes en macOS y en kB en Linux
+            max_rss_kb = max_rss / 1024 if sys.platform == 'darwin' else max_rss
+            usage.update({'rss_mb': round(max_rss_kb / 1024, 1), 'source': 'getrusage'})
+        except ImportError:
+            pass
+    
+    return usage
+
+
+def format_memory_usage(usage):
+    """
+    Texto de una línea para logs
+    """
+    if usage.get('rss_mb') is None:
+        return f"pid={usage['pid']} (memoria no disponible en esta plataforma)"
+    
+    if usage.get('shared_mb') is None:
+        return f"pid={usage['pid']} RSS(max)={usage['rss_mb']}MB"
+    
+    return (f"pid={usage['pid']} RSS={usage['rss_mb']}MB compartida={usage['shared_mb']}MB "
+            f"privada={usage['private_mb']}MB PSS={usage['pss_mb']}MB")
@@ -43,6 +43,94 @@ class Config:
     # Rutas de modelos ML
     ML_MODELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ml', 'models')
     
+    # Registro de modelos: precargar al crear la app, inferencia de calentamiento
+    # y cada cuántos segundos revisar la versión activa en ml_models (0 = desactivado)
+    ML_PRELOAD_MODELS = os.getenv('ML_PRELOAD_MODELS', 'True').lower() == 'true'
+    ML_MODEL_WARMUP = os.getenv('ML_MODEL_WARMUP', 'False').lower() == 'true'
+    ML_MODEL_WATCH_INTERVAL = int(os.getenv('ML_MODEL_WATCH_INTERVAL', '30'))
+    # True cuando gunicorn precarga la app (gunicorn.conf.py): el watcher se inicia en cada worker
+    ML_MODEL_WATCHER_POST_FORK = os.getenv('ML_MODEL_WATCHER_POST_FORK', 'False').lower() == 'true'
+    
+    # Scheduler de entrenamientos: True cuando gunicorn precarga la app (se inicia en post_fork);
+    # entre procesos solo ejecuta jobs el que obtiene el lock del archivo
+    TRAINING_SCHEDULER_POST_FORK = os.getenv('TRAINING_SCHEDULER_POST_FORK', 'False').lower() == 'true'
+    TRAINING_SCHEDULER_LOCK_FILE = os.getenv('TRAINING_SCHEDULER_LOCK_FILE', '')
+    TRAINING_SCHEDULER_SYNC_SECONDS = int(os.getenv('TRAINING_SCHEDULER_SYNC_SECONDS', '60'))
+    
+    # Máximo de tareas por solicitud en la predicción de riesgo por lotes
+    ML_RISK_BATCH_MAX_SIZE = int(os.getenv('ML_RISK_BATCH_MAX_SIZE', '1000'))
+    
+    # Hilos del pool compartido para ejecutar modelos ML en paralelo
+    ML_PARALLEL_MAX_WORKERS = int(os.getenv('ML_PARALLEL_MAX_WORKERS', '4'))
+    
+    # Micro-batching de inferencia: agrupa predicciones concurrentes del mismo modelo.
+    # Útil con workers de varios hilos (GUNICORN_THREADS > 1); con un hilo por worker no hay nada que agrupar
+    ML_INFERENCE_BATCHING = os.getenv('ML_INFERENCE_BATCHING', 'False').lower() == 'true'
+    ML_BATCH_WINDOW_MS = float(os.getenv('ML_BATCH_WINDOW_MS', '2'))  # Espera máxima para juntar un lote
+    ML_BATCH_MAX_ROWS = int(os.getenv('ML_BATCH_MAX_ROWS', '256'))  # Filas que cierran el lote antes de la ventana
+    ML_BATCH_MAX_QUEUE = int(os.getenv('ML_BATCH_MAX_QUEUE', '1000'))  # Profundidad máxima de la cola por modelo
+    ML_BATCH_SUBMIT_TIMEOUT_MS = float(os.getenv('ML_BATCH_SUBMIT_TIMEOUT_MS', '50'))  # Espera con la cola llena antes de rechazar (503)
+    ML_BATCH_RESULT_TIMEOUT_MS = float(os.getenv('ML_BATCH_RESULT_TIMEOUT_MS', '5000'))
+    
+    # Caché de predicciones por fila de features (se invalida al activar/recargar un modelo)
+    ML_PREDICTION_CACHE_ENABLED = os.getenv('ML_PREDICTION_CACHE_ENABLED', 'True').lower() == 'true'
+    ML_PREDICTION_CACHE_SIZE = int(os.getenv('ML_PREDICTION_CACHE_SIZE', '10000'))  # Filas máximas (LRU)
+    ML_PREDICTION_CACHE_TTL = int(os.getenv('ML_PREDICTION_CACHE_TTL', '600'))  # Segundos
+    
+    # Estadísticas de retraso por área/tipo/complejidad (ml_delay_stats) para las features de riesgo
+    ML_DELAY_STATS_REFRESH_SECONDS = int(os.getenv('ML_DELAY_STATS_REFRESH_SECONDS', '60'))  # Recarga del snapshot en memoria
+    ML_DELAY_STATS_PRIOR_WEIGHT = int(os.getenv('ML_DELAY_STATS_PRIOR_WEIGHT', '20'))  # Muestras equivalentes del prior histórico
+    
+    # Auditoría asíncrona de predicciones en ml_predictions (INSERT de varias filas en segundo plano)
+    ML_AUDIT_ENABLED = os.getenv('ML_AUDIT_ENABLED', 'True').lower() == 'true'
+    ML_AUDIT_QUEUE_SIZE = int(os.getenv('ML_AUDIT_QUEUE_SIZE', '10000'))  # Registros máximos en memoria
+    ML_AUDIT_BATCH_SIZE = int(os.getenv('ML_AUDIT_BATCH_SIZE', '200'))  # Filas por INSERT
+    ML_AUDIT_FLUSH_INTERVAL_MS = float(os.getenv('ML_AUDIT_FLUSH_INTERVAL_MS', '500'))  # Espera máxima antes de escribir
+    ML_AUDIT_OVERFLOW_POLICY = os.getenv('ML_AUDIT_OVERFLOW_POLICY', 'drop_oldest')  # drop_oldest, drop_newest o block
+    ML_AUDIT_BLOCK_TIMEOUT_MS = float(os.getenv('ML_AUDIT_BLOCK_TIMEOUT_MS', '10'))  # Solo con la política block
+    
+    # Barrido nocturno de riesgo de renuncia (ml_attrition_snapshots)
+    ML_ATTRITION_SWEEP_CHUNK_SIZE = int(os.getenv('ML_ATTRITION_SWEEP_CHUNK_SIZE', '1000'))  # Filas por INSERT
+    ML_ATTRITION_SNAPSHOT_RETENTION_DAYS = int(os.getenv('ML_ATTRITION_SNAPSHOT_RETENTION_DAYS', '90'))  # 0 = conservar todo
+    
+    # Análisis de desempeño por equipo (colaboradores evaluados por bloque antes de enviarlos)
+    ML_TEAM_ANALYSIS_CHUNK_SIZE = int(os.getenv('ML_TEAM_ANALYSIS_CHUNK_SIZE', '200'))
+    
+    # Process mining: tareas más recientes que entran al análisis de cuellos de botella (0 = sin límite)
+    ML_PROCESS_MINING_MAX_TASKS = int(os.getenv('ML_PROCESS_MINING_MAX_TASKS', '50000'))
+    
+    # Betweenness de process mining: exacta hasta N tareas por grupo de proyectos; por encima,
+    # muestreo de pivotes con error ≤ EPSILON (normalizado) con probabilidad 1 - DELTA
+    ML_BETWEENNESS_EXACT_MAX_NODES = int(os.getenv('ML_BETWEENNESS_EXACT_MAX_NODES', '2000'))
+    ML_BETWEENNESS_EPSILON = float(os.getenv('ML_BETWEENNESS_EPSILON', '0.05'))
+    ML_BETWEENNESS_DELTA = float(os.getenv('ML_BETWEENNESS_DELTA', '0.1'))
+    ML_BETWEENNESS_CACHE_SIZE = int(os.getenv('ML_BETWEENNESS_CACHE_SIZE', '256'))  # Grupos de proyectos (LRU)
+    
+    # Resultados de /analyze y /stats-by-area por proyecto, reutilizados mientras no cambien los datos
+    ML_ANALYSIS_CACHE_SIZE = int(os.getenv('ML_ANALYSIS_CACHE_SIZE', '64'))  # Proyectos (LRU)
+    
+    # Grafo de dependencias en memoria por proyecto; cada REFRESH_SECONDS se compara con la BD
+    # para ver cambios de otros workers (0 = no revalidar)
+    GRAPH_STORE_REFRESH_SECONDS = int(os.getenv('GRAPH_STORE_REFRESH_SECONDS', '30'))
+    GRAPH_STORE_MAX_PROJECTS = int(os.getenv('GRAPH_STORE_MAX_PROJECTS', '512'))  # Proyectos (LRU)
+    
+    # Ruta crítica (CPM) por proyecto, reutilizada mientras no cambien el grafo ni las duraciones
+    CRITICAL_PATH_CACHE_SIZE = int(os.getenv('CRITICAL_PATH_CACHE_SIZE', '128'))  # Proyectos (LRU)
+    
+    # Simulación Monte Carlo del cronograma: corridas por defecto/máximas, celdas
+    # (tareas x corridas) por bloque y muestras mínimas de un área para usar su razón real/estimado
+    SCHEDULE_SIMULATION_TRIALS = int(os.getenv('SCHEDULE_SIMULATION_TRIALS', '10000'))
+    SCHEDULE_SIMULATION_MAX_TRIALS = int(os.getenv('SCHEDULE_SIMULATION_MAX_TRIALS', '20000'))
+    SCHEDULE_SIMULATION_MAX_CELLS = int(os.getenv('SCHEDULE_SIMULATION_MAX_CELLS', '4000000'))
+    SCHEDULE_SIMULATION_MIN_SAMPLES = int(os.getenv('SCHEDULE_SIMULATION_MIN_SAMPLES', '10'))
+    
+    # Fechas más tempranas por proyecto actualizadas por deltas al editar duraciones y fechas de tareas
+    SCHEDULE_PROPAGATION_CACHE_SIZE = int(os.getenv('SCHEDULE_PROPAGATION_CACHE_SIZE', '128'))  # Proyectos (LRU)
+    
+    # Estadísticas de proyectos desde la tabla project_stat_counters (database/08_create_project_stat_counters.sql
+    # + rebuild_project_stats.py); si no, una consulta agrupada por métrica para cada página
+    PROJECT_STATS_COUNTERS = os.getenv('PROJECT_STATS_COUNTERS', 'False').lower() == 'true'
+    
     # Configuración de paginación
     TASKS_PER_PAGE = int(os.getenv('TASKS_PER_PAGE', '20'))
     
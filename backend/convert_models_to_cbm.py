@@ -0,0 +1,119 @@
+"""
+Script para convertir los modelos CatBoost guardados con joblib (.pkl) a formato nativo (.cbm)
+Escribe <nombre>.cbm y <nombre>.schema.json junto a cada pickle y verifica que
+ambos den las mismas predicciones. El servidor carga el .cbm en cuanto existe
+(ver app/ml/native_models.py); los .pkl se conservan para volver atrás.
+
+Uso:
+    python convert_models_to_cbm.py                 # artefactos por defecto
+    python convert_models_to_cbm.py ruta/modelo.pkl # artefactos específicos (p. ej. versiones)
+"""
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from catboost import CatBoost, Pool
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.ml.native_models import save_native, load_catboost_model
+
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ml', 'models')
+
+# Pickles de los modelos que sirve la API (el de attrition es XGBoost y se omite)
+DEFAULT_ARTIFACTS = [
+    os.path.join(MODELS_DIR, 'duration', 'model_catboost_rmse_numeric.pkl'),
+    os.path.join(MODELS_DIR, 'recommender', 'model_catboost_recommender.pkl'),
+    os.path.join(MODELS_DIR, 'mining', 'model_bottleneck_corregido.pkl'),
+    os.path.join(MODELS_DIR, 'attrition', 'model_performance_predictor_best.pkl')
+]
+
+# Filas sintéticas para comparar predicciones pickle vs nativo
+SAMPLE_ROWS = 200
+
+
+def sample_pool(model, n_rows=SAMPLE_ROWS, seed=42):
+    """
+    Pool aleatorio con las columnas y categóricas del modelo
+    """
+    rng = np.random.default_rng(seed)
+    feature_names = model.feature_names_
+    cat_indices = set(model.get_cat_feature_indices())
+    
+    data = {}
+    for i, name in enumerate(feature_names):
+        if i in cat_indices:
+            data[name] = rng.choice(['A', 'B', 'C', 'Unknown'], n_rows)
+        else:
+            data[name] = rng.normal(0, 50, n_rows)
+    
+    return Pool(pd.DataFrame(data, columns=feature_names), cat_features=sorted(cat_indices) or None)
+
+
+def convert(model_file):
+    """
+    Convertir un pickle y verificar la paridad de predicciones
+    
+    Returns:
+        bool: True si se convirtió (o no aplica) sin errores
+    """
+    print(f"\n📦 {os.path.relpath(model_file, MODELS_DIR)}")
+    
+    if not os.path.exists(model_file):
+        print("   ⚠ No existe, se omite")
+        return True
+    
+    try:
+        model = joblib.load(model_file)
+    except Exception as e:
+        print(f"   ❌ No se pudo leer el pickle: {e}")
+        return False
+    
+    if not isinstance(model, CatBoost):
+        print(f"   ⚠ {type(model).__name__} no es CatBoost, se mantiene el pickle")
+        return True
+    
+    cbm_file, schema_file = save_native(model, model_file, source=model_file)
+    native_model, _ = load_catboost_model(cbm_file)
+    
+    # Paridad: valores crudos y, en clasificadores, probabilidades
+    pool = sample_pool(model)
+    expected = model.predict(pool, prediction_type='RawFormulaVal')
+    actual = native_model.predict(pool, prediction_type='RawFormulaVal')
+    if hasattr(model, 'predict_proba'):
+        expected = np.column_stack([np.ravel(expected), model.predict_proba(pool)])
+        actual = np.column_stack([np.ravel(actual), native_model.predict_proba(pool)])
+    
+    max_diff = float(np.max(np.abs(np.asarray(expected) - np.asarray(actual))))
+    if max_diff > 1e-9:
+        print(f"   ❌ Las predicciones difieren (máx. {max_diff:.2e}); se eliminan los archivos generados")
+        os.remove(cbm_file)
+        os.remove(schema_file)
+        return False
+    
+    pickle_kb = os.path.getsize(model_file) / 1024
+    native_kb = os.path.getsize(cbm_file) / 1024
+    print(f"   ✅ {os.path.basename(cbm_file)} ({native_kb:.0f} KB, pickle {pickle_kb:.0f} KB)")
+    print(f"   ✅ {os.path.basename(schema_file)} ({type(native_model).__name__}, "
+          f"{len(model.feature_names_)} features, paridad máx. {max_diff:.1e})")
+    return True
+
+
+def main():
+    """Convierte los artefactos indicados (o los por defecto)"""
+    artifacts = [os.path.abspath(path) for path in sys.argv[1:]] or DEFAULT_ARTIFACTS
+    
+    results = [convert(model_file) for model_file in artifacts]
+    
+    print(f"\n{'✅' if all(results) else '⚠️'} {sum(results)}/{len(results)} artefactos procesados sin errores")
+    return all(results)
+
+
+if __name__ == '__main__':
+    print("\n Convirtiendo modelos CatBoost a formato nativo (.cbm)...")
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,117 @@
+"""
+Configuración de Gunicorn (producción) con modelos ML compartidos entre workers
+
+Uso:
+    gunicorn -c gunicorn.conf.py
+
+(La app se crea con la factory 'app:create_app()': el paquete app/ oculta al
+módulo app.py, por lo que 'app:app' no es importable por gunicorn.)
+
+Modo preload (por defecto): el master crea la app una sola vez, lo que carga
+todos los modelos del registro (y hace la inferencia de calentamiento) antes
+de hacer fork. Los workers heredan esas páginas copy-on-write en lugar de
+cargar cada uno su propia copia de CatBoost/pandas y de los modelos.
+
+Para que las páginas sigan compartidas:
+- gc.freeze() en el master mueve todos los objetos ya creados a la generación
+  permanente; el GC de los workers no los recorre ni escribe en sus cabeceras.
+- Los workers solo leen los modelos. El watcher de versiones compara metadatos
+  (versión y mtime) y únicamente crea objetos nuevos cuando hay una versión
+  nueva; esa versión sí queda privada en cada worker hasta el próximo reinicio.
+- Las conexiones a la BD abiertas por el master se descartan en cada worker.
+
+El scheduler de entrenamientos no se inicia en el master (su hilo no sobrevive
+al fork): cada worker lo inicia en post_fork y solo ejecuta jobs el que obtiene
+el lock de TRAINING_SCHEDULER_LOCK_FILE; los demás quedan en pausa y comparten
+los jobs programados desde la API a través de la tabla apscheduler_jobs.
+
+Variables de entorno:
+    GUNICORN_BIND (0.0.0.0:5000), GUNICORN_WORKERS (2 * CPU + 1),
+    GUNICORN_THREADS (1), GUNICORN_TIMEOUT (120), GUNICORN_PRELOAD (true)
+"""
+import gc
+import os
+import multiprocessing
+
+wsgi_app = 'app:create_app()'
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+accesslog = '-'
+errorlog = '-'
+
+if preload_app:
+    # Estas variables se leen al importar config.py, que ocurre después de este archivo
+    # - El watcher de modelos se inicia en cada worker (post_fork), no en el master
+    # - El scheduler de entrenamientos también (su hilo no sobrevive al fork); solo
+    #   ejecuta jobs el worker que obtiene el lock
+    # - La inferencia de calentamiento se hace una vez en el master y la heredan todos
+    os.environ.setdefault('ML_MODEL_WATCHER_POST_FORK', 'True')
+    os.environ.setdefault('TRAINING_SCHEDULER_POST_FORK', 'True')
+    os.environ.setdefault('ML_MODEL_WARMUP', 'True')
+
+
+def _get_flask_app(server):
+    """
+    App Flask ya cargada por el master (solo en modo preload)
+    """
+    return server.app.wsgi()
+
+
+def when_ready(server):
+    """
+    Master listo, antes del primer fork: congelar el heap para compartirlo con los workers
+    """
+    if not preload_app:
+        return
+    
+    from app.utils.memory import get_memory_usage, format_memory_usage
+    
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Modelos precargados y heap congelado ({gc.get_freeze_count()} objetos) - master {format_memory_usage(get_memory_usage())}")
+
+
+def post_fork(server, worker):
+    """
+    Dentro de cada worker recién creado
+    """
+    if not preload_app:
+        return
+    
+    flask_app = _get_flask_app(server)
+    
+    from app.extensions import db
+    from app.ml.model_registry import model_registry
+    
+    with flask_app.app_context():
+        # No reutilizar los sockets de BD del master (close=False: no cerrarlos para el master)
+        db.engine.dispose(close=False)
+    
+    model_registry.start_watcher()
+    
+    if flask_app.config.get('TRAINING_SCHEDULER_POST_FORK', False):
+        from app.scheduler import training_scheduler
+        
+        training_scheduler.init_app(flask_app)
+
+
+def post_worker_init(worker):
+    """
+    Worker inicializado: reportar memoria residente y compartida
+    """
+    from app.utils.memory import get_memory_usage, format_memory_usage
+    
+    worker.log.info(f"Worker listo {format_memory_usage(get_memory_usage())}")
+
+
+def worker_exit(server, worker):
+    """
+    Worker saliendo: escribir las predicciones que siguen en la cola de auditoría
+    """
+    from app.ml.prediction_audit import prediction_audit
+    
+    prediction_audit.shutdown()
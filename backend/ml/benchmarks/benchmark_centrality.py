@@ -0,0 +1,112 @@
+"""
+Benchmark: betweenness de process mining
+nx.betweenness_centrality vs CentralityService (exacto, aproximado y desde caché)
+
+Uso (desde backend/):
+    python ml/benchmarks/benchmark_centrality.py [tamaños] [epsilon]
+    python ml/benchmarks/benchmark_centrality.py 1000,5000,10000 0.05
+
+Un solo proyecto por tamaño, con la misma forma que benchmark_reachability.py
+(cada tarea depende de 1-2 de las 10 anteriores). Para la aproximación se
+reporta el error absoluto frente al exacto y cuántas tareas cruzan algún umbral
+de betweenness del modelo de cuellos de botella (los únicos cambios que pueden
+alterar su predicción). nx solo se mide hasta NX_MAX_NODES tareas.
+"""
+import os
+import sys
+import time
+import random
+
+import numpy as np
+import networkx as nx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.ml.graph_centrality import CentralityService
+from app.ml.native_models import load_catboost_model
+
+
+NX_MAX_NODES = 3000
+MODEL_FILE = os.path.join(BACKEND_DIR, 'ml', 'models', 'mining', 'model_bottleneck_corregido.cbm')
+
+
+def build_graph(n_nodes, seed=42):
+    """Tareas y dependencias de un proyecto de n_nodes tareas"""
+    rnd = random.Random(seed)
+    edges = set()
+    for i in range(1, n_nodes):
+        for _ in range(rnd.randint(1, 2)):
+            edges.add((rnd.randint(max(0, i - 10), i - 1), i))
+    return list(range(n_nodes)), sorted(edges)
+
+
+def timed(fn):
+    """(resultado, segundos)"""
+    started_at = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started_at
+
+
+def betweenness_borders():
+    """Umbrales del modelo de cuellos de botella sobre 'betweenness' (None si no hay modelo)"""
+    model, _ = load_catboost_model(MODEL_FILE)
+    if model is None:
+        return None
+    return np.asarray(model.get_borders().get(model.feature_names_.index('betweenness'), []))
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [1000, 5000, 10000]
+    epsilon = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    borders = betweenness_borders()
+    
+    print(f"\n{'=' * 96}\n Betweenness (ε={epsilon}, δ=0.1)\n{'=' * 96}")
+    print(f" {'Tareas':>7}{'nx':>10}{'Exacto':>10}{'k':>7}{'Aprox.':>10}{'Caché':>10}"
+          f"{'Err. máx':>11}{'Err. p99':>11}{'Máx. exacto':>13}{'Cruces':>8}")
+    
+    for n_nodes in sizes:
+        nodes, edges = build_graph(n_nodes)
+        projects = ['P'] * n_nodes
+        
+        exact_service = CentralityService()
+        exact_service.exact_max_nodes = n_nodes
+        exact, exact_s = timed(lambda: exact_service.betweenness(nodes, projects, edges))
+        
+        nx_text = f"{'-':>10}"
+        if n_nodes <= NX_MAX_NODES:
+            G = nx.DiGraph()
+            G.add_nodes_from(nodes)
+            G.add_edges_from(edges)
+            expected, nx_s = timed(lambda: nx.betweenness_centrality(G))
+            if max(abs(expected[node] - exact[node]) for node in nodes) > 1e-9:
+                print(f" ❌ El cálculo exacto difiere de networkx con {n_nodes} tareas")
+                return False
+            nx_text = f"{nx_s:>9.2f}s"
+        
+        approx_service = CentralityService()
+        approx_service.exact_max_nodes = 0
+        approx_service.epsilon = epsilon
+        approx, approx_s = timed(lambda: approx_service.betweenness(nodes, projects, edges))
+        _, cached_s = timed(lambda: approx_service.betweenness(nodes, projects, edges))
+        
+        exact_values = np.array([exact[node] for node in nodes])
+        approx_values = np.array([approx[node] for node in nodes])
+        error = np.abs(exact_values - approx_values)
+        
+        if borders is None:
+            crossings = '-'
+        else:
+            crossings = int((np.searchsorted(borders, exact_values) != np.searchsorted(borders, approx_values)).sum())
+        
+        print(f" {n_nodes:>7,}{nx_text}{exact_s:>9.2f}s{approx_service.sample_size(n_nodes):>7}{approx_s:>9.2f}s"
+              f"{cached_s:>9.3f}s{error.max():>11.5f}{np.percentile(error, 99):>11.5f}"
+              f"{exact_values.max():>13.5f}{crossings:>8}")
+    
+    if borders is not None:
+        print(f"\n Umbrales del modelo sobre betweenness: {len(borders)}")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
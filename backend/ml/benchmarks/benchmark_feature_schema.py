@@ -0,0 +1,96 @@
+"""
+Micro-benchmark: preparación de features e inferencia de una sola fila
+DataFrame de pandas (camino anterior) vs FeatureSchema compilado (Pool / ndarray)
+
+Uso (desde backend/):
+    python ml/benchmarks/benchmark_feature_schema.py [repeticiones]
+
+No requiere base de datos: carga los artefactos directamente desde ml/models.
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+# Añadir el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.ml.feature_schema import model_input
+from app.ml import risk_model, duration_model, recommender_model
+
+
+def time_per_call(fn, repetitions):
+    """Microsegundos promedio por llamada (tras una llamada de calentamiento)"""
+    fn()
+    started_at = time.perf_counter()
+    for _ in range(repetitions):
+        fn()
+    return (time.perf_counter() - started_at) / repetitions * 1e6
+
+
+def benchmark_model(name, artifacts, feature_dict, method, repetitions):
+    """Compara ambos caminos para un modelo y verifica que la salida sea idéntica"""
+    model = artifacts['model']
+    schema = artifacts['schema']
+    columns = list(schema.columns)
+    predict = getattr(model, method)
+    
+    def pandas_prepare():
+        return pd.DataFrame([feature_dict])[columns]
+    
+    def schema_prepare():
+        return model_input(schema.rows([feature_dict]))
+    
+    pandas_output = predict(pandas_prepare())
+    schema_output = predict(schema_prepare())
+    identical = np.allclose(np.asarray(pandas_output, dtype=float), np.asarray(schema_output, dtype=float))
+    
+    results = {
+        'pandas_prepare': time_per_call(pandas_prepare, repetitions),
+        'schema_prepare': time_per_call(schema_prepare, repetitions),
+        'pandas_total': time_per_call(lambda: predict(pandas_prepare()), repetitions),
+        'schema_total': time_per_call(lambda: predict(schema_prepare()), repetitions)
+    }
+    
+    print(f"\n {name} ({len(columns)} features, {len(schema.cat_indices)} categóricas) - salida idéntica: {'sí' if identical else 'NO'}")
+    print(f"   Preparación      pandas {results['pandas_prepare']:8.1f} µs   esquema {results['schema_prepare']:8.1f} µs   ({results['pandas_prepare'] / results['schema_prepare']:.1f}x)")
+    print(f"   Prep + inferencia pandas {results['pandas_total']:8.1f} µs   esquema {results['schema_total']:8.1f} µs   ({results['pandas_total'] / results['schema_total']:.1f}x)")
+    print(f"   Ahorro por petición: {results['pandas_total'] - results['schema_total']:.1f} µs")
+    
+    return identical
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    
+    task_data = {
+        'area': 'TI', 'task_type': 'Desarrollo', 'complexity_level': 'Alta', 'priority': 'Alta',
+        'duration_est': 12, 'assignees_count': 2, 'dependencies': 3
+    }
+    # Persona con los campos de WebUser que usan las features (sin ORM ni BD)
+    person = SimpleNamespace(id=1, full_name='Benchmark', area='TI', experience_years=5, availability_hours_week=40.0,
+                             current_load=3, performance_index=82.0, rework_rate=0.1, skills='Python, SQL')
+    
+    cases = [
+        ('Riesgo (CatBoost, Pool)', risk_model.load_artifacts(), risk_model.build_feature_dict(task_data), 'predict_proba'),
+        ('Duración (CatBoost, ndarray)', duration_model.load_artifacts(), duration_model.build_feature_dict(task_data, person), 'predict'),
+        ('Recomendación (CatBoost, Pool)', recommender_model.load_artifacts(), recommender_model.build_feature_dict(person, task_data), 'predict_proba')
+    ]
+    
+    print(f"\n{'=' * 70}\n Micro-benchmark de features de una fila ({repetitions} repeticiones)\n{'=' * 70}")
+    
+    all_identical = True
+    for name, artifacts, feature_dict, method in cases:
+        if not artifacts or artifacts.get('model') is None:
+            print(f"\n {name}: modelo no disponible, se omite")
+            continue
+        all_identical &= benchmark_model(name, artifacts, feature_dict, method, repetitions)
+    
+    return all_identical
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
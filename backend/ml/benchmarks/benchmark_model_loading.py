@@ -0,0 +1,125 @@
+"""
+Benchmark: carga de modelos CatBoost
+joblib.load del pickle vs .cbm nativo por ruta vs .cbm desde buffer en memoria
+
+Uso (desde backend/):
+    python convert_models_to_cbm.py                        # genera los .cbm
+    python ml/benchmarks/benchmark_model_loading.py [repeticiones]
+
+Cada medición corre en un proceso nuevo para que la memoria no se mezcle:
+- primera carga (ms) y promedio de las siguientes
+- RSS tras la carga y pico de RSS durante la carga, ambos respecto al proceso
+  antes de cargar (catboost y joblib ya importados)
+"""
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODELS_DIR = os.path.join(BACKEND_DIR, 'ml', 'models')
+
+# (nombre, pickle, .cbm)
+MODELS = [
+    ('Duración', 'duration/model_catboost_rmse_numeric.pkl', 'duration/model_catboost_rmse_numeric.cbm'),
+    ('Recomendación', 'recommender/model_catboost_recommender.pkl', 'recommender/model_catboost_recommender.cbm'),
+    ('Cuellos de botella', 'mining/model_bottleneck_corregido.pkl', 'mining/model_bottleneck_corregido.cbm'),
+    ('Riesgo', None, 'risk/model_binary_task_risk.cbm')
+]
+
+METHODS = ('pickle', 'cbm_file', 'cbm_blob')
+
+
+def rss_kb():
+    """RSS actual del proceso en kB (Linux)"""
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def child(method, path, repetitions):
+    """Medición dentro del proceso hijo; imprime un JSON con los resultados"""
+    sys.path.insert(0, BACKEND_DIR)
+    import joblib
+    from catboost import CatBoost
+    from app.ml.native_models import load_catboost_model
+    
+    def load():
+        if method == 'pickle':
+            return joblib.load(path)
+        if method == 'cbm_file':
+            model = CatBoost()
+            model.load_model(path)
+            return model
+        return load_catboost_model(path)[0]
+    
+    rss_before = rss_kb()
+    peak_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    started_at = time.perf_counter()
+    model = load()
+    first_ms = (time.perf_counter() - started_at) * 1000
+    
+    rss_after = rss_kb()
+    peak_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    started_at = time.perf_counter()
+    for _ in range(repetitions):
+        load()
+    warm_ms = (time.perf_counter() - started_at) / repetitions * 1000
+    
+    print(json.dumps({
+        'first_ms': first_ms,
+        'warm_ms': warm_ms,
+        'rss_mb': (rss_after - rss_before) / 1024,
+        'peak_mb': (peak_after - peak_before) / 1024,
+        'trees': model.tree_count_
+    }))
+
+
+def measure(method, path, repetitions):
+    """Lanzar el proceso hijo y leer su resultado"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', method, path, str(repetitions)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    
+    print(f"\n{'=' * 78}\n Carga de modelos CatBoost ({repetitions} repeticiones en caliente)\n{'=' * 78}")
+    print(f" {'Modelo':<20}{'Formato':<10}{'KB':>8}{'1ª carga':>11}{'Promedio':>11}{'RSS':>9}{'Pico':>9}")
+    
+    for name, pickle_file, native_file in MODELS:
+        files = {
+            'pickle': os.path.join(MODELS_DIR, pickle_file) if pickle_file else None,
+            'cbm_file': os.path.join(MODELS_DIR, native_file),
+            'cbm_blob': os.path.join(MODELS_DIR, native_file)
+        }
+        
+        for method in METHODS:
+            path = files[method]
+            if not path or not os.path.exists(path):
+                continue
+            
+            result = measure(method, path, repetitions)
+            print(f" {name:<20}{method:<10}{os.path.getsize(path) / 1024:>8.0f}"
+                  f"{result['first_ms']:>9.1f}ms{result['warm_ms']:>9.1f}ms"
+                  f"{result['rss_mb']:>7.1f}MB{result['peak_mb']:>7.1f}MB")
+            name = ''
+    
+    print("\n pickle: joblib.load | cbm_file: load_model(ruta) | cbm_blob: load_catboost_model (buffer en memoria)")
+    return True
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        sys.exit(0)
+    sys.exit(0 if main() else 1)
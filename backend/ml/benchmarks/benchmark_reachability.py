@@ -0,0 +1,103 @@
+"""
+Benchmark: conteo de descendientes (impact_count) en grafos de dependencias
+nx.descendants por cada nodo (camino anterior) vs descendant_counts (SCC + bitsets)
+
+Uso (desde backend/):
+    python ml/benchmarks/benchmark_reachability.py [tamaños] [tareas por proyecto]
+    python ml/benchmarks/benchmark_reachability.py 1000,10000,50000 500
+
+Grafos sintéticos con la forma de web_task_dependencies: cada tarea depende de
+1-2 de las 10 anteriores de su proyecto, más un 1% de aristas hacia atrás que
+forman ciclos. El camino anterior solo se mide hasta BASELINE_MAX_NODES nodos;
+cuando se mide, se verifica que ambos resultados sean idénticos. El tiempo y el
+pico de memoria se miden en pasadas separadas (tracemalloc ralentiza la ejecución).
+"""
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+import networkx as nx
+
+# Añadir el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.ml.graph_reachability import descendant_counts
+
+
+BASELINE_MAX_NODES = 10000
+
+
+def build_graph(n_nodes, project_size, seed=42):
+    """Nodos y aristas de proyectos de project_size tareas"""
+    rnd = random.Random(seed)
+    nodes = list(range(n_nodes))
+    edges = []
+    
+    for start in range(0, n_nodes, project_size):
+        tasks = nodes[start:start + project_size]
+        for i in range(1, len(tasks)):
+            for _ in range(rnd.randint(1, 2)):
+                edges.append((tasks[rnd.randint(max(0, i - 10), i - 1)], tasks[i]))
+            if rnd.random() < 0.01:
+                edges.append((tasks[i], tasks[rnd.randint(max(0, i - 50), i - 1)]))
+    
+    return nodes, edges
+
+
+def measure(fn):
+    """(resultado, segundos)"""
+    started_at = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started_at
+
+
+def peak_memory_mb(fn):
+    """Pico de memoria reservada durante fn (tracemalloc)"""
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return peak
+
+
+def baseline(nodes, edges):
+    """Camino anterior: un recorrido del grafo por nodo"""
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from(edges)
+    return {node: len(nx.descendants(G, node)) for node in G.nodes()}
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [1000, 10000, 50000]
+    project_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    
+    print(f"\n{'=' * 78}\n Conteo de descendientes ({project_size} tareas por proyecto)\n{'=' * 78}")
+    print(f" {'Nodos':>8}{'Aristas':>9}{'nx.descendants':>18}{'SCC + bitsets':>18}{'Pico':>10}{'Aceleración':>13}")
+    
+    for n_nodes in sizes:
+        nodes, edges = build_graph(n_nodes, project_size)
+        counts, fast_s = measure(lambda: descendant_counts(nodes, edges))
+        fast_mb = peak_memory_mb(lambda: descendant_counts(nodes, edges))
+        
+        if n_nodes <= BASELINE_MAX_NODES:
+            expected, slow_s = measure(lambda: baseline(nodes, edges))
+            if counts != expected:
+                print(f" ❌ Resultados distintos con {n_nodes} nodos")
+                return False
+            slow_text = f"{slow_s:>16.3f}s"
+            speedup = f"{slow_s / fast_s:>12.1f}x"
+        else:
+            slow_text = f"{'(omitido)':>17}"
+            speedup = f"{'-':>13}"
+        
+        print(f" {n_nodes:>8,}{len(edges):>9,}{slow_text}{fast_s:>16.3f}s{fast_mb:>8.1f}MB{speedup}")
+    
+    print(f"\n Pico: memoria reservada por descendant_counts (tracemalloc)")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -21,6 +21,7 @@ Fecha: 1/12/2025
 import os
 import json
 import warnings
+from datetime import datetime
 warnings.filterwarnings("ignore")
 
 import pandas as pd
@@ -38,6 +39,7 @@ from sklearn.metrics import (
     roc_auc_score, roc_curve
 )
 
+import catboost
 from catboost import CatBoostClassifier
 from imblearn.over_sampling import SMOTE
 import optuna
@@ -381,6 +383,22 @@ model_path = os.path.join(ARTIFACTS_DIR, 'model_binary_task_risk.cbm')
 model.save_model(model_path)
 print(f"   [OK] Modelo: {model_path}")
 
+# Esquema del modelo nativo (ver app/ml/native_models.py)
+schema_info = {
+    'format': 'cbm',
+    'model_class': 'CatBoostClassifier',
+    'catboost_version': catboost.__version__,
+    'feature_names': list(model.feature_names_),
+    'cat_features': [model.feature_names_[i] for i in model.get_cat_feature_indices()],
+    'class_names': [c.item() if hasattr(c, 'item') else c for c in model.classes_],
+    'source': os.path.basename(model_path),
+    'created_at': datetime.now().isoformat()
+}
+schema_path = os.path.join(ARTIFACTS_DIR, 'model_binary_task_risk.schema.json')
+with open(schema_path, 'w') as f:
+    json.dump(schema_info, f, indent=2)
+print(f"   [OK] Esquema: {schema_path}")
+
 # Columnas
 columns_info = {
     'categorical': categorical_features,
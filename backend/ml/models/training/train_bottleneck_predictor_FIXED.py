@@ -30,6 +30,7 @@ MODELO 5 CORREGIDO: PREDICTOR DE CUELLOS DE BOTELLA (SIN OVERFITTING)
 """
 
 import os
+import sys
 import json
 import warnings
 warnings.filterwarnings("ignore")
@@ -54,12 +55,17 @@ from sklearn.metrics import (
     roc_auc_score, roc_curve, auc,
     precision_recall_curve, average_precision_score
 )
+import catboost
 from catboost import CatBoostClassifier, Pool
 import joblib
 
 # Graph Analysis
 import networkx as nx
 
+# Utilidades compartidas con la API (backend/app)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from app.ml.graph_reachability import descendant_counts
+
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
@@ -95,6 +101,25 @@ def save_json(data, filepath):
         json.dump(data, f, indent=2, ensure_ascii=False, default=str)
     print(f"    Guardado: {filepath}")
 
+def save_native_model(model, model_path):
+    """Guarda el modelo en formato nativo CatBoost (.cbm) con su esquema JSON (ver app/ml/native_models.py)."""
+    model_path = Path(model_path)
+    cbm_path = model_path.with_suffix('.cbm')
+    model.save_model(str(cbm_path), format='cbm')
+    feature_names = list(model.feature_names_ or [])
+    classes = getattr(model, 'classes_', None) if type(model).__name__ == 'CatBoostClassifier' else None
+    save_json({
+        'format': 'cbm',
+        'model_class': type(model).__name__,
+        'catboost_version': catboost.__version__,
+        'feature_names': feature_names,
+        'cat_features': [feature_names[i] for i in model.get_cat_feature_indices()],
+        'class_names': [c.item() if hasattr(c, 'item') else c for c in classes] if classes is not None else None,
+        'source': model_path.name,
+        'created_at': datetime.now().isoformat()
+    }, model_path.with_name(model_path.stem + '.schema.json'))
+    print(f"    Modelo nativo guardado: {cbm_path}")
+
 # ============================================================================
 # 1. CARGA DE DATOS
 # ============================================================================
@@ -345,14 +370,11 @@ def build_graph_and_centrality(df_input):
     else:
         centrality_metrics['betweenness'] = [0] * len(G.nodes())
     
-    def count_descendants(G, node):
-        try:
-            return len(nx.descendants(G, node))
-        except:
-            return 0
+    # Descendientes de todas las tareas en una sola pasada (mismo cálculo que el endpoint)
+    impact = descendant_counts(G.nodes(), G.edges())
     
     centrality_df = pd.DataFrame(centrality_metrics)
-    centrality_df['impact_count'] = centrality_df['task_id'].apply(lambda x: count_descendants(G, x))
+    centrality_df['impact_count'] = centrality_df['task_id'].map(impact)
     
     return centrality_df
 
@@ -597,6 +619,7 @@ print(f"      {'Real: Bottleneck':>20}  {cm[1, 0]:>11}  {cm[1, 1]:>16}")
 model_path = ARTIFACT_DIR / 'model_bottleneck_corregido.pkl'
 joblib.dump(model, model_path)
 print(f"\n    Modelo guardado: {model_path}")
+save_native_model(model, model_path)
 
 # Guardar métricas
 metrics = {
@@ -60,6 +60,7 @@ from sklearn.metrics import (
     roc_curve, precision_recall_curve, average_precision_score
 )
 
+import catboost
 from catboost import CatBoostClassifier
 import joblib
 
@@ -100,6 +101,25 @@ def save_json(data, filepath):
         json.dump(data, f, indent=2, ensure_ascii=False)
     print(f"    Guardado: {filepath}")
 
+def save_native_model(model, model_path):
+    """Guarda el modelo en formato nativo CatBoost (.cbm) con su esquema JSON (ver app/ml/native_models.py)."""
+    model_path = Path(model_path)
+    cbm_path = model_path.with_suffix('.cbm')
+    model.save_model(str(cbm_path), format='cbm')
+    feature_names = list(model.feature_names_ or [])
+    classes = getattr(model, 'classes_', None) if type(model).__name__ == 'CatBoostClassifier' else None
+    save_json({
+        'format': 'cbm',
+        'model_class': type(model).__name__,
+        'catboost_version': catboost.__version__,
+        'feature_names': feature_names,
+        'cat_features': [feature_names[i] for i in model.get_cat_feature_indices()],
+        'class_names': [c.item() if hasattr(c, 'item') else c for c in classes] if classes is not None else None,
+        'source': model_path.name,
+        'created_at': datetime.now().isoformat()
+    }, model_path.with_name(model_path.stem + '.schema.json'))
+    print(f"    Modelo nativo guardado: {cbm_path}")
+
 def calculate_ranking_metrics(y_true, y_pred_proba, task_ids, top_k=5):
     """
     Calcula métricas de ranking para sistema de recomendación.
@@ -640,6 +660,7 @@ print("\n[12/12] Guardando modelo y métricas...")
 model_path = ARTIFACT_DIR / "model_catboost_recommender.pkl"
 joblib.dump(model, model_path)
 print(f"    Modelo guardado: {model_path}")
+save_native_model(model, model_path)
 
 # Guardar métricas
 metrics_data = {
@@ -61,6 +61,7 @@ from sklearn.metrics import (
 )
 from sklearn.linear_model import LinearRegression
 
+import catboost
 from catboost import CatBoostRegressor
 import joblib
 from scipy import stats
@@ -106,6 +107,25 @@ def save_json(data, filepath):
         json.dump(data, f, indent=2, ensure_ascii=False)
     print(f"    Guardado: {filepath}")
 
+def save_native_model(model, model_path):
+    """Guarda el modelo en formato nativo CatBoost (.cbm) con su esquema JSON (ver app/ml/native_models.py)."""
+    model_path = Path(model_path)
+    cbm_path = model_path.with_suffix('.cbm')
+    model.save_model(str(cbm_path), format='cbm')
+    feature_names = list(model.feature_names_ or [])
+    classes = getattr(model, 'classes_', None) if type(model).__name__ == 'CatBoostClassifier' else None
+    save_json({
+        'format': 'cbm',
+        'model_class': type(model).__name__,
+        'catboost_version': catboost.__version__,
+        'feature_names': feature_names,
+        'cat_features': [feature_names[i] for i in model.get_cat_feature_indices()],
+        'class_names': [c.item() if hasattr(c, 'item') else c for c in classes] if classes is not None else None,
+        'source': model_path.name,
+        'created_at': datetime.now().isoformat()
+    }, model_path.with_name(model_path.stem + '.schema.json'))
+    print(f"    Modelo nativo guardado: {cbm_path}")
+
 def calculate_regression_metrics(y_true, y_pred, name="", y_pred_samples=None):
     """Calcula métricas completas de regresión con intervalos de confianza."""
     mae = mean_absolute_error(y_true, y_pred)
@@ -611,6 +631,7 @@ for metric in ['mae', 'rmse', 'r2']:
 # Guardar modelo
 joblib.dump(catboost_rmse, ARTIFACT_DIR / "model_catboost_rmse_numeric.pkl")
 print(f"\n    Modelo guardado: {ARTIFACT_DIR / 'model_catboost_rmse_numeric.pkl'}")
+save_native_model(catboost_rmse, ARTIFACT_DIR / "model_catboost_rmse_numeric.pkl")
 
 plot_predictions_vs_actual(
     y_test_original, cb_rmse_y_pred,
@@ -0,0 +1,44 @@
+"""
+Script para recalcular la tabla ml_delay_stats desde las tareas completadas de web_tasks
+Usar después de crear la tabla (database/06_create_ml_delay_stats.sql) o si se
+editaron horas de tareas ya completadas; el resto del tiempo la API la mantiene
+de forma incremental.
+"""
+import os
+import sys
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.models.ml_models import MLDelayStat
+from app.ml.delay_stats import delay_stats_store
+
+
+def rebuild_delay_stats():
+    """Recalcula las estadísticas y muestra el resultado por dimensión"""
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            processed = delay_stats_store.rebuild()
+        except Exception as e:
+            print(f"❌ Error recalculando estadísticas de retraso: {e}")
+            return False
+        
+        print(f"✅ {processed} tareas completadas procesadas\n")
+        
+        rows = MLDelayStat.query.order_by(MLDelayStat.dimension, MLDelayStat.dimension_value).all()
+        for row in rows:
+            stats = row.to_dict()
+            print(f"   {row.dimension:<11} {row.dimension_value:<20} n={row.sample_count:<6} "
+                  f"media={stats['mean_delay']:.2f} std={stats['std_delay']:.2f} "
+                  f"mediana={(stats['median_delay'] or 0):.2f}")
+        
+        return True
+
+
+if __name__ == '__main__':
+    print("\n Recalculando estadísticas de retraso...\n")
+    success = rebuild_delay_stats()
+    sys.exit(0 if success else 1)
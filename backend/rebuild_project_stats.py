@@ -0,0 +1,57 @@
+"""
+Script para recalcular la tabla project_stat_counters desde web_tasks y web_task_dependencies
+Usar después de crear la tabla (database/08_create_project_stat_counters.sql), antes
+de activar PROJECT_STATS_COUNTERS, o si se modificaron tareas fuera de la API; el
+resto del tiempo la API la mantiene de forma incremental.
+"""
+import os
+import sys
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.services.project_stats import project_stats_service
+from app.models.project import Project
+
+
+def rebuild_project_stats():
+    """Recalcula los contadores y verifica que coincidan con las consultas agrupadas"""
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            written = project_stats_service.rebuild()
+        except Exception as e:
+            print(f"❌ Error recalculando contadores de proyectos: {e}")
+            return False
+        
+        print(f"✅ {written} contadores escritos\n")
+        
+        project_ids = [project_id for (project_id,) in Project.query.with_entities(Project.project_id)]
+        use_counters = project_stats_service.use_counters
+        try:
+            project_stats_service.use_counters = True
+            from_counters = project_stats_service.get_many(project_ids)
+            project_stats_service.use_counters = False
+            from_queries = project_stats_service.get_many(project_ids)
+        finally:
+            project_stats_service.use_counters = use_counters
+        
+        mismatched = [project_id for project_id in project_ids if from_counters[project_id] != from_queries[project_id]]
+        for project_id in project_ids:
+            stats = from_counters[project_id]
+            print(f"   {project_id:<20} tareas={stats['total_tasks']:<6} completadas={stats['completed_tasks']:<6} "
+                  f"equipo={stats['team_size']:<4} dependencias={stats['dependencies_count']}")
+        
+        if mismatched:
+            print(f"\n⚠️ {len(mismatched)} proyectos no coinciden con las consultas agrupadas: {mismatched[:10]}")
+            return False
+        
+        return True
+
+
+if __name__ == '__main__':
+    print("\n Recalculando contadores de proyectos...\n")
+    success = rebuild_project_stats()
+    sys.exit(0 if success else 1)
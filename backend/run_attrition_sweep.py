@@ -0,0 +1,44 @@
+"""
+Script del barrido nocturno de riesgo de renuncia de toda la plantilla
+Pensado para cron (una sola ejecución por noche, no un job por worker de gunicorn):
+
+    0 2 * * * cd /ruta/backend && python run_attrition_sweep.py
+
+Requiere la tabla ml_attrition_snapshots (database/07_create_ml_attrition_snapshots.sql).
+"""
+import os
+import sys
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.ml.attrition_model import run_attrition_sweep
+
+
+def main():
+    """Ejecuta el barrido y muestra el resumen"""
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            summary = run_attrition_sweep()
+        except Exception as e:
+            print(f"❌ Error en el barrido de renuncia: {e}")
+            return False
+        
+        print(f"   Corrida:   {summary['run_id']}")
+        print(f"   Personas:  {summary['total_persons']}")
+        print(f"   Modelo:    {summary['model_used']}")
+        print(f"   Riesgo:    alto={summary['by_risk']['alto']} medio={summary['by_risk']['medio']} "
+              f"bajo={summary['by_risk']['bajo']}")
+        print(f"   Eliminados (retención): {summary['deleted_snapshots']}")
+        print(f"   Tiempo:    {summary['elapsed_seconds']}s")
+        
+        return True
+
+
+if __name__ == '__main__':
+    print("\n Ejecutando barrido de riesgo de renuncia...\n")
+    success = main()
+    sys.exit(0 if success else 1)
@@ -26,9 +26,9 @@ def get_model_file_info(model_dir):
         'file_date': None
     }
     
-    # Buscar archivo de modelo (.pkl o .cbm)
-    for file in os.listdir(model_dir):
-        if file.endswith('.pkl') or file.endswith('.cbm'):
+    # Buscar archivo de modelo (.cbm nativo con prioridad sobre .pkl)
+    for file in sorted(os.listdir(model_dir), key=lambda name: not name.endswith('.cbm')):
+        if (file.endswith('.pkl') or file.endswith('.cbm')) and not info['model_file']:
             info['model_file'] = os.path.join(model_dir, file)
             info['file_date'] = datetime.fromtimestamp(os.path.getmtime(info['model_file']))
         elif file.endswith('_metrics.json'):
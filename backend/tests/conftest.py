@@ -0,0 +1,8 @@
+"""
+Configuración de pytest: importar el paquete app desde backend/
+Ejecutar desde backend/: python -m pytest -q tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
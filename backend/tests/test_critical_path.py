@@ -0,0 +1,78 @@
+"""
+Pruebas de la ruta crítica (CPM): pasadas hacia adelante y hacia atrás con
+dependencias FS/SS/FF/SF y lag_days
+"""
+import pytest
+
+from app.ml.risk_model import complexity_level_from_score
+from app.services.critical_path import compute_schedule, edge_index, forward_pass, task_durations
+
+
+def test_compute_schedule_with_dependency_types_and_lag():
+    order = [1, 2, 3, 4, 5]
+    edges = [
+        (1, 2, 'finish_to_start', 1),
+        (1, 3, 'start_to_start', 1),
+        (2, 4, 'finish_to_finish', 0),
+        (3, 5, 'start_to_finish', 2)
+    ]
+    durations = {1: 2, 2: 3, 3: 4, 4: 1, 5: 2}
+    
+    result = compute_schedule(order, edges, durations)
+    tasks = result['tasks']
+    
+    # Pasada hacia adelante
+    assert [(tasks[t]['earliest_start'], tasks[t]['earliest_finish']) for t in order] == [
+        (0, 2), (3, 6), (1, 5), (5, 6), (1, 3)
+    ]
+    # Pasada hacia atrás
+    assert [(tasks[t]['latest_start'], tasks[t]['latest_finish']) for t in order] == [
+        (0, 2), (3, 6), (2, 6), (5, 6), (4, 6)
+    ]
+    assert [tasks[t]['slack'] for t in order] == [0, 0, 1, 0, 3]
+    assert result['project_duration_days'] == 6
+    assert result['critical_path'] == [1, 2, 4]
+
+
+def test_negative_lag_overlaps_tasks():
+    result = compute_schedule([1, 2], [(1, 2, 'finish_to_start', -1)], {1: 3, 2: 2})
+    
+    assert result['tasks'][2]['earliest_start'] == 2
+    assert result['project_duration_days'] == 4
+    assert result['critical_path'] == [1, 2]
+
+
+def test_strongest_predecessor_sets_the_start():
+    edges = [(1, 3, 'finish_to_start', 0), (2, 3, 'finish_to_start', 0)]
+    result = compute_schedule([1, 2, 3], edges, {1: 1, 2: 5, 3: 1})
+    
+    assert result['tasks'][3]['earliest_start'] == 5
+    assert result['tasks'][1]['slack'] == 4
+    assert result['critical_path'] == [2, 3]
+
+
+def test_missing_durations_count_as_zero():
+    result = compute_schedule([1, 2], [(1, 2, 'finish_to_start', 0)], {2: 4})
+    
+    assert result['tasks'][1]['duration_days'] == 0
+    assert result['project_duration_days'] == 4
+
+
+def test_forward_pass_respects_release_days():
+    outgoing, _ = edge_index([(1, 2, 'finish_to_start', 0)])
+    start, finish = forward_pass([1, 2], outgoing, {1: 2.0, 2: 1.0}, release={2: 5.0})
+    
+    assert start == {1: 0.0, 2: 5.0}
+    assert finish == {1: 2.0, 2: 6.0}
+
+
+def test_task_durations_from_estimated_hours():
+    durations, predicted = task_durations([(1, 16, 5), (2, 4, None)])
+    
+    assert durations == {1: 2.0, 2: 0.5}
+    assert predicted == 0
+
+
+@pytest.mark.parametrize('score, level', [(None, 'Media'), (1, 'Baja'), (3, 'Baja'), (5, 'Media'), (8, 'Alta')])
+def test_complexity_level_from_score(score, level):
+    assert complexity_level_from_score(score) == level
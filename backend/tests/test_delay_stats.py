@@ -0,0 +1,58 @@
+"""
+Pruebas de las actualizaciones en línea de delay_stats: momentos de Welford
+y mediana por el estimador P²
+"""
+import json
+import random
+import statistics
+
+import pytest
+
+from app.ml.delay_stats import welford_update, p2_update, p2_estimate
+
+
+def test_welford_matches_mean_and_variance():
+    rng = random.Random(3)
+    values = [rng.gauss(10, 4) for _ in range(500)]
+    
+    count, mean, m2 = 0, 0.0, 0.0
+    for value in values:
+        count, mean, m2 = welford_update(count, mean, m2, value)
+    
+    assert count == 500
+    assert mean == pytest.approx(statistics.fmean(values))
+    assert m2 / (count - 1) == pytest.approx(statistics.variance(values))
+
+
+def test_p2_is_exact_with_few_values():
+    state = None
+    assert p2_estimate(state) is None
+    
+    for value in (7, 1, 4, 10):
+        state = p2_update(state, value)
+    
+    assert state == {'values': [1, 4, 7, 10]}
+    assert p2_estimate(state) == 5.5
+
+
+def test_p2_state_survives_json_round_trip():
+    state = None
+    for value in range(1, 21):
+        state = json.loads(json.dumps(p2_update(state, value)))
+    
+    assert set(state) == {'q', 'n', 'np'}
+    assert state['n'][-1] == 20
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_p2_median_close_to_exact(seed):
+    rng = random.Random(seed)
+    values = [rng.lognormvariate(2, 0.6) for _ in range(2000)]
+    
+    state = None
+    for value in values:
+        state = p2_update(state, value)
+    
+    q = state['q']
+    assert q == sorted(q)
+    assert p2_estimate(state) == pytest.approx(statistics.median(values), rel=0.05)
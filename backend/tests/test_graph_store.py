@@ -0,0 +1,102 @@
+"""
+Pruebas del orden topológico incremental (Pearce–Kelly) y la detección de
+ciclos de graph_store
+"""
+import random
+
+import pytest
+
+from app.services.graph_store import ProjectGraph, DependencyCycleError, reorder
+
+
+def build(edges, tasks=()):
+    rows = [(i, predecessor, successor, 'finish_to_start', 0) for i, (predecessor, successor) in enumerate(edges, 1)]
+    return ProjectGraph.build('P1', tasks, rows)
+
+
+def assert_topological(graph):
+    positions = graph.positions()
+    assert len(set(positions.values())) == len(positions)
+    for predecessor, successor in graph.edge_pairs():
+        assert positions[predecessor] < positions[successor]
+
+
+def test_reorder_moves_only_the_affected_region():
+    state = ({1: 0, 2: 1, 3: 2, 4: 3}, 4)
+    successors = {3: frozenset({2})}
+    predecessors = {2: frozenset({3})}
+    
+    positions, next_position = reorder(state, 3, 2, successors, predecessors)
+    
+    assert positions[3] < positions[2]
+    assert positions[1] == 0 and positions[4] == 3
+    assert next_position == 4
+
+
+def test_reorder_detects_cycle():
+    state = ({1: 0, 2: 1}, 2)
+    successors = {1: frozenset({2}), 2: frozenset({1})}
+    predecessors = {2: frozenset({1}), 1: frozenset({2})}
+    
+    assert reorder(state, 2, 1, successors, predecessors) is None
+
+
+def test_reorder_adds_new_tasks_at_the_end():
+    positions, next_position = reorder(({1: 0}, 1), 1, 5, {1: frozenset({5})}, {5: frozenset({1})})
+    
+    assert positions == {1: 0, 5: 1}
+    assert next_position == 2
+
+
+def test_with_edge_keeps_a_topological_order():
+    rng = random.Random(7)
+    graph = build([], tasks=range(40))
+    graph.positions()
+    
+    dependency_id = 0
+    for _ in range(300):
+        predecessor, successor = rng.sample(range(40), 2)
+        if graph.find_cycle(predecessor, successor):
+            continue
+        dependency_id += 1
+        graph = graph.with_edge(dependency_id, predecessor, successor)
+        assert_topological(graph)
+    
+    assert dependency_id > 50
+    order = graph.topological_order()
+    assert sorted(order) == list(range(40))
+
+
+def test_find_cycle_returns_the_closing_path():
+    graph = build([(1, 2), (2, 3), (3, 4)])
+    
+    assert graph.find_cycle(4, 1) == [1, 2, 3, 4]
+    assert graph.find_cycle(1, 4) is None
+    assert graph.find_cycle(2, 2) == [2]
+
+
+def test_find_cycle_ignores_other_branches():
+    graph = build([(1, 2), (1, 3), (3, 4), (5, 2)])
+    
+    assert graph.find_cycle(4, 1) == [1, 3, 4]
+    assert graph.find_cycle(2, 5) == [5, 2]
+    assert graph.find_cycle(4, 5) is None
+
+
+def test_find_cycle_with_task_without_dependencies():
+    graph = build([(1, 2)], tasks=[1, 2, 3])
+    
+    assert graph.find_cycle(3, 1) is None
+    assert graph.find_cycle(1, 99) is None
+
+
+def test_cyclic_graph_raises_with_only_the_cycle_tasks():
+    graph = build([(1, 2), (2, 3), (3, 1), (3, 4), (5, 1)])
+    
+    with pytest.raises(DependencyCycleError) as error:
+        graph.topological_order()
+    assert error.value.tasks == [1, 2, 3]
+    
+    # Sin orden topológico find_cycle recorre todos los sucesores
+    assert graph.find_cycle(5, 4) is None
+    assert graph.find_cycle(4, 5) == [5, 1, 2, 3, 4]
@@ -0,0 +1,95 @@
+"""
+Pruebas de la propagación incremental del cronograma: propagate_changes debe
+dejar las mismas fechas que una pasada hacia adelante completa
+"""
+import random
+from datetime import datetime
+
+import pytest
+
+from app.services.critical_path import edge_index, forward_pass
+from app.services.graph_store import ProjectGraph
+from app.services.schedule_propagation import ProjectSchedule, propagate_changes
+
+DEPENDENCY_TYPES = ('finish_to_start', 'start_to_start', 'finish_to_finish', 'start_to_finish')
+
+
+def make_schedule(rows, duration, release=None):
+    graph = ProjectGraph.build('P1', duration, rows)
+    order = graph.topological_order()
+    outgoing, incoming = edge_index(graph.edges.values())
+    release = dict(release or {})
+    start, finish = forward_pass(order, outgoing, duration, release)
+    return ProjectSchedule('P1', graph, datetime(2026, 1, 1), None, dict(duration), release, {}, incoming, start, finish)
+
+
+def full_pass(state):
+    outgoing, _ = edge_index(state.graph.edges.values())
+    return forward_pass(state.graph.topological_order(), outgoing, state.duration, state.release)
+
+
+def test_longer_duration_moves_only_the_successors():
+    rows = [(1, 1, 2, 'finish_to_start', 0), (2, 2, 3, 'finish_to_start', 1), (3, 4, 5, 'finish_to_start', 0)]
+    state = make_schedule(rows, {1: 2.0, 2: 1.0, 3: 1.0, 4: 1.0, 5: 1.0})
+    
+    state.duration[1] = 4.0
+    changed, visited = propagate_changes(state, {1}, state.graph.positions())
+    
+    assert changed == {1, 2, 3}
+    assert visited == 3
+    assert (state.start[3], state.finish[3]) == (6.0, 7.0)
+    assert (state.start[4], state.start[5]) == (0.0, 1.0)
+
+
+def test_propagation_stops_where_another_predecessor_holds_the_start():
+    rows = [(1, 1, 3, 'finish_to_start', 0), (2, 2, 3, 'finish_to_start', 0), (3, 3, 4, 'finish_to_start', 0)]
+    state = make_schedule(rows, {1: 1.0, 2: 5.0, 3: 1.0, 4: 1.0})
+    
+    state.duration[1] = 3.0
+    changed, visited = propagate_changes(state, {1}, state.graph.positions())
+    
+    assert changed == {1}
+    assert visited == 2
+    assert state.start[3] == 5.0
+
+
+def test_earlier_start_pulls_successors_forward():
+    rows = [(1, 1, 2, 'start_to_finish', 0), (2, 2, 3, 'finish_to_finish', 2)]
+    state = make_schedule(rows, {1: 3.0, 2: 2.0, 3: 1.0}, release={1: 4.0})
+    
+    state.release.pop(1)
+    changed, _ = propagate_changes(state, {1}, state.graph.positions())
+    
+    assert changed == {1, 2, 3}
+    assert (state.start[1], state.start[2], state.start[3]) == (0.0, 0.0, 3.0)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_a_full_forward_pass(seed):
+    rng = random.Random(seed)
+    tasks = list(range(30))
+    rows = []
+    for i in range(60):
+        predecessor, successor = sorted(rng.sample(tasks, 2))
+        rows.append((i, predecessor, successor, rng.choice(DEPENDENCY_TYPES), rng.choice((-1, 0, 0, 2))))
+    duration = {task: float(rng.randint(0, 5)) for task in tasks}
+    state = make_schedule(rows, duration, release={task: float(rng.randint(0, 8)) for task in rng.sample(tasks, 5)})
+    before = dict(state.start), dict(state.finish)
+    
+    seeds = set(rng.sample(tasks, 3))
+    for task in seeds:
+        state.duration[task] = float(rng.randint(0, 5))
+        if rng.random() < 0.5:
+            state.release[task] = float(rng.randint(0, 8))
+        else:
+            state.release.pop(task, None)
+    
+    changed, _ = propagate_changes(state, seeds, state.graph.positions())
+    
+    start, finish = full_pass(state)
+    assert state.start == pytest.approx(start)
+    assert state.finish == pytest.approx(finish)
+    assert changed == {
+        task for task in tasks
+        if abs(start[task] - before[0][task]) > 1e-6 or abs(finish[task] - before[1][task]) > 1e-6
+    }
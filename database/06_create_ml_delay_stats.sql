@@ -0,0 +1,24 @@
+-- Crear tabla de estadísticas de retraso incrementales
+-- Fecha: 17 de octubre de 2026
+-- Descripción: Media, varianza (momentos de Welford) y mediana (estimador P²) del
+--              retraso en días por área, tipo de tarea y complejidad. La API la
+--              actualiza al completar cada tarea y la usa en las features de riesgo.
+--              Para recalcularla desde web_tasks: python backend/rebuild_delay_stats.py
+
+USE sb_production;
+
+CREATE TABLE IF NOT EXISTS `ml_delay_stats` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `dimension` ENUM('area', 'task_type', 'complexity') NOT NULL,
+  `dimension_value` VARCHAR(100) NOT NULL COMMENT 'Área, tipo de tarea o nivel de complejidad',
+  `sample_count` INT NOT NULL DEFAULT 0 COMMENT 'Tareas completadas acumuladas',
+  `mean_delay` DOUBLE NOT NULL DEFAULT 0 COMMENT 'Retraso promedio (días)',
+  `m2_delay` DOUBLE NOT NULL DEFAULT 0 COMMENT 'Suma de cuadrados de desviaciones (Welford)',
+  `median_delay` DOUBLE DEFAULT NULL COMMENT 'Mediana estimada (días)',
+  `median_state` JSON DEFAULT NULL COMMENT 'Marcadores del estimador P²',
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  UNIQUE KEY uq_delay_stats_dimension (dimension, dimension_value)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+COMMENT='Estadísticas de retraso incrementales para features del modelo de riesgo';
+
+SELECT 'Tabla ml_delay_stats creada exitosamente' as resultado;
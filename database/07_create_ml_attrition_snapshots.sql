@@ -0,0 +1,33 @@
+-- Crear tabla de snapshots del barrido de riesgo de renuncia
+-- Fecha: 17 de octubre de 2026
+-- Descripción: Resultado del scoring masivo de attrition de toda la plantilla
+--              (una fila por persona y corrida). Lo escribe el barrido nocturno
+--              (python backend/run_attrition_sweep.py o POST /api/ml/renuncia/barrido)
+--              y lo leen los dashboards de RRHH (GET /api/ml/renuncia/snapshot).
+
+USE sb_production;
+
+CREATE TABLE IF NOT EXISTS `ml_attrition_snapshots` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `run_id` VARCHAR(32) NOT NULL COMMENT 'Identificador de la corrida',
+  `person_id` VARCHAR(64) NOT NULL COMMENT 'people.person_id',
+  `area` VARCHAR(64) DEFAULT NULL,
+  `role` VARCHAR(64) DEFAULT NULL,
+  `performance_class` VARCHAR(30) NOT NULL COMMENT 'at_risk, high_performer o resignation_risk',
+  `prob_at_risk` DOUBLE DEFAULT NULL,
+  `prob_high_performer` DOUBLE DEFAULT NULL,
+  `prob_resignation_risk` DOUBLE DEFAULT NULL,
+  `attrition_probability` DOUBLE NOT NULL,
+  `attrition_risk` ENUM('bajo', 'medio', 'alto') NOT NULL,
+  `total_tasks` INT DEFAULT 0,
+  `avg_delay_ratio` DOUBLE DEFAULT NULL,
+  `success_rate` DOUBLE DEFAULT NULL,
+  `model_used` VARCHAR(50) DEFAULT NULL COMMENT 'Modelo o heurística usada',
+  `scored_at` DATETIME NOT NULL,
+  INDEX idx_attrition_run (run_id),
+  INDEX idx_attrition_person (person_id, scored_at),
+  INDEX idx_attrition_risk (run_id, attrition_risk)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+COMMENT='Snapshots del barrido masivo de riesgo de renuncia';
+
+SELECT 'Tabla ml_attrition_snapshots creada exitosamente' as resultado;
@@ -0,0 +1,23 @@
+-- Crear tabla de contadores incrementales de estadísticas por proyecto
+-- Fecha: 17 de octubre de 2026
+-- Descripción: Tareas por estado, tareas por persona asignada (tamaño del equipo)
+--              y dependencias de cada proyecto. La API los actualiza en la misma
+--              transacción que crea/edita/elimina tareas y dependencias, y el listado
+--              de proyectos los lee con una sola consulta si PROJECT_STATS_COUNTERS=true.
+--              Para recalcularlos desde web_tasks: python backend/rebuild_project_stats.py
+
+USE sb_production;
+
+CREATE TABLE IF NOT EXISTS `project_stat_counters` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `project_id` VARCHAR(64) NOT NULL,
+  `counter` ENUM('status', 'member', 'dependencies') NOT NULL,
+  `counter_key` VARCHAR(64) NOT NULL DEFAULT '' COMMENT 'Estado, person_id asignado o vacío (dependencias)',
+  `value` INT NOT NULL DEFAULT 0,
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  UNIQUE KEY uq_project_stat_counter (project_id, counter, counter_key),
+  FOREIGN KEY (project_id) REFERENCES projects(project_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+COMMENT='Contadores de tareas por estado, equipo y dependencias por proyecto';
+
+SELECT 'Tabla project_stat_counters creada exitosamente' as resultado;
@@ -0,0 +1,18 @@
+-- Crear tabla del job store compartido del scheduler de entrenamientos
+-- Fecha: 18 de octubre de 2026
+-- Descripción: Reentrenamientos programados desde la API (APScheduler SQLAlchemyJobStore).
+--              Cualquier worker de gunicorn puede crearlos, listarlos o eliminarlos; solo
+--              los ejecuta el worker que tiene el lock del scheduler. El backend crea la
+--              tabla si no existe; este script la deja lista antes del primer arranque.
+
+USE sb_production;
+
+CREATE TABLE IF NOT EXISTS `apscheduler_jobs` (
+  `id` VARCHAR(191) NOT NULL PRIMARY KEY,
+  `next_run_time` DOUBLE NULL,
+  `job_state` BLOB NOT NULL,
+  INDEX ix_apscheduler_jobs_next_run_time (next_run_time)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+COMMENT='Jobs de reentrenamiento programados (APScheduler)';
+
+SELECT 'Tabla apscheduler_jobs creada exitosamente' as resultado;